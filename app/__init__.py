@@ -1,15 +1,39 @@
 from flask import Flask
 from .config import Config
 from .extensions import db, migrate
+from .db_routing import init_replicas
+from .instrumentation import init_instrumentation
 
 def create_app(config_object=Config):
     app = Flask(__name__)
     app.config.from_object(config_object)
 
     db.init_app(app)
+    init_replicas(app)
+    init_instrumentation(app)
     migrate.init_app(app, db)
 
+    from .cli import register_commands
+    register_commands(app)
+
+    from .services.catalog_cache import init_catalog_cache
+    init_catalog_cache(app)
+    from .services.response_cache import init_response_cache
+    init_response_cache(app)
+    from .services.idempotency import init_idempotency
+    init_idempotency(app)
+
     from .routes.health import health_bp
+    from .routes.customers import customers_bp
+    from .routes.invoices import invoices_bp
+    from .routes.products import products_bp
+    from .routes.analytics import analytics_bp
+    from .routes.payments import payments_bp
     app.register_blueprint(health_bp)
+    app.register_blueprint(customers_bp)
+    app.register_blueprint(invoices_bp)
+    app.register_blueprint(products_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(payments_bp)
 
     return app
@@ -0,0 +1,103 @@
+'''
+Async serving mode for the read heavy dashboard endpoints.
+
+uvicorn app.async_main:app --workers 4 --port 5001
+
+- starlette app on sqlalchemy's asyncio extension, same models and config as the flask app
+- DATABASE_URL is reused with the async driver swapped in: mysql+pymysql -> mysql+aiomysql,
+  sqlite -> sqlite+aiosqlite. pool options come from SQLALCHEMY_ENGINE_OPTIONS
+- the handlers run the functions of app/services/read_api.py through AsyncSession.run_sync(),
+  the sync routes call the same functions, so the payloads match. a worker waits on the
+  database without blocking, other requests keep being served meanwhile
+
+routes: /health, /customers/{customer_id}, /invoices/{public_invoice_id}, /products,
+/products/{public_product_id}. the ETag response cache (app/services/response_cache.py) is flask only.
+writes, exports and jobs stay on the flask app, so does the sql instrumentation.
+'''
+
+from contextlib import asynccontextmanager
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.config import Config
+from app.serialization import dumps
+from app.services.read_api import customer_detail, invoice_detail, product_detail, product_page
+
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_uri(uri: str) -> str:
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver for {backend}, supported: {', '.join(ASYNC_DRIVERS)}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _json(body, status_code=200):
+    return Response(dumps(body), status_code=status_code, media_type="application/json")
+
+
+def _not_found():
+    return _json({"error": "not found"}, status_code=404)
+
+
+async def health(request):
+    return _json({"status": "ok"})
+
+
+async def get_customer(request):
+    async with request.app.state.sessions() as session:
+        body = await session.run_sync(customer_detail, request.path_params["customer_id"])
+    return _not_found() if body is None else _json(body)
+
+
+async def get_invoice(request):
+    async with request.app.state.sessions() as session:
+        body = await session.run_sync(invoice_detail, request.path_params["public_invoice_id"])
+    return _not_found() if body is None else _json(body)
+
+
+async def list_products(request):
+    async with request.app.state.sessions() as session:
+        try:
+            body = await session.run_sync(product_page, request.query_params)
+        except ValueError as exc:
+            return _json({"error": str(exc)}, status_code=400)
+    return _json(body)
+
+
+async def get_product(request):
+    async with request.app.state.sessions() as session:
+        body = await session.run_sync(product_detail, request.path_params["public_product_id"])
+    return _not_found() if body is None else _json(body)
+
+
+ROUTES = [
+    Route("/health", health),
+    Route("/customers/{customer_id}", get_customer),
+    Route("/invoices/{public_invoice_id}", get_invoice),
+    Route("/products", list_products),
+    Route("/products/{public_product_id}", get_product),
+]
+
+
+def create_async_app(config_object=Config):
+    engine = create_async_engine(
+        async_database_uri(config_object.SQLALCHEMY_DATABASE_URI),
+        **(getattr(config_object, "SQLALCHEMY_ENGINE_OPTIONS", None) or {}),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(routes=ROUTES, lifespan=lifespan)
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    return app
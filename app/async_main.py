@@ -0,0 +1,8 @@
+from app.asgi import create_async_app
+
+app = create_async_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=5001)
@@ -0,0 +1,215 @@
+'''
+Flask CLI commands. run from the project root, e.g.
+
+flask --app app.main aging rebuild
+'''
+
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.services.ar_aging import rebuild_aging
+from app.services.bulk_import import FORMATS as IMPORT_FORMATS, import_file
+from app.services.idempotency import purge_expired
+from app.services.index_advisor import CANONICAL_QUERIES, advise
+from app.services.invoice_archive import add_archive_partitions, archive_closed_invoices
+from app.services.invoice_export import FORMATS as EXPORT_FORMATS, export_invoices
+from app.services.overdue_sweeper import sweep_overdue
+from app.services.payment_application import apply_settlement_file
+from app.services.sales_rollups import catch_up, rebuild_rollups
+
+aging_cli = AppGroup("aging", help="Accounts receivable aging summary.")
+invoices_cli = AppGroup("invoices", help="Invoice maintenance jobs.")
+payments_cli = AppGroup("payments", help="Payment application.")
+import_cli = AppGroup("import", help="Streaming CSV/NDJSON imports.")
+indexes_cli = AppGroup("indexes", help="Query plan checks.")
+sales_cli = AppGroup("sales", help="Daily sales rollups.")
+idempotency_cli = AppGroup("idempotency", help="Idempotency keys of the write endpoints.")
+
+
+@aging_cli.command("rebuild")
+@click.option(
+    "--as-of", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+    help="Day to age against (default: today, UTC).",
+)
+def rebuild_aging_command(as_of):
+    '''Recompute customer_ar_aging for every customer.'''
+    count = rebuild_aging(as_of=as_of.date() if as_of else None)
+    click.echo(f"aging rebuilt, {count} customers with an open balance")
+
+
+@invoices_cli.command("sweep-overdue")
+@click.option("--chunk-size", type=int, default=5000, show_default=True, help="Ids per UPDATE.")
+@click.option(
+    "--time-budget", type=float, default=None,
+    help="Stop after this many seconds, the next run resumes from the checkpoint.",
+)
+def sweep_overdue_command(chunk_size, time_budget):
+    '''Mark pending invoices past their due date as overdue.'''
+    report = sweep_overdue(chunk_size=chunk_size, time_budget=time_budget)
+    state = "pass complete" if report.completed else f"stopped at id {report.position}, will resume"
+    click.echo(
+        f"{report.rows_updated} invoices marked overdue in {report.chunks} chunks, "
+        f"{report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s), {state}"
+    )
+
+
+@invoices_cli.command("export")
+@click.argument("path", type=click.Path())
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="ndjson", show_default=True,
+              help="csv writes a directory with one file per table.")
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Invoices per fetch.")
+@click.option("--from", "date_from", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="First invoice_date included.")
+@click.option("--to", "date_to", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="invoice_date upper bound, excluded.")
+@click.option("--status", default=None, help="Only invoices with this status.")
+def export_invoices_command(path, fmt, chunk_size, date_from, date_to, status):
+    '''Stream invoices with their items and taxes to a file.'''
+    report = export_invoices(
+        path, fmt=fmt, chunk_size=chunk_size, date_from=date_from, date_to=date_to, status=status,
+    )
+    click.echo(
+        f"{report.invoices} invoices, {report.items} items, {report.taxes} taxes "
+        f"in {report.chunks} chunks, {report.seconds:.2f}s ({report.rows_per_second:.0f} invoices/s)"
+    )
+
+
+@invoices_cli.command("archive")
+@click.option("--retention-days", type=int, default=None,
+              help="Archive invoices closed longer ago (default: ARCHIVE_RETENTION_DAYS).")
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Invoices per transaction.")
+@click.option(
+    "--time-budget", type=float, default=None,
+    help="Stop after this many seconds, the next run archives the rest.",
+)
+def archive_invoices_command(retention_days, chunk_size, time_budget):
+    '''Move closed invoices and their children to the archive tables.'''
+    if retention_days is None:
+        retention_days = current_app.config["ARCHIVE_RETENTION_DAYS"]
+    report = archive_closed_invoices(
+        retention_days=retention_days, chunk_size=chunk_size, time_budget=time_budget,
+    )
+    state = "pass complete" if report.completed else "stopped by the time budget, run again for the rest"
+    click.echo(
+        f"{report.invoices} invoices archived with {report.items} items, {report.taxes} taxes, "
+        f"{report.payments} payments in {report.chunks} chunks, "
+        f"{report.seconds:.2f}s ({report.rows_per_second:.0f} invoices/s), {state}"
+    )
+
+
+@invoices_cli.command("archive-partitions")
+@click.option("--through", "through_year", type=int, required=True, help="Last year that gets its own partition.")
+def archive_partitions_command(through_year):
+    '''mysql: add yearly partitions to invoices_archive.'''
+    added = add_archive_partitions(through_year)
+    click.echo(f"partitions added: {', '.join(added)}" if added else "no partitions added")
+
+
+@payments_cli.command("apply")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", type=int, default=5000, show_default=True, help="Payments per transaction.")
+def apply_payments_command(path, batch_size):
+    '''Apply a bank settlement CSV to the invoices it pays.'''
+    start = perf_counter()
+    result = apply_settlement_file(path, batch_size=batch_size)
+    seconds = perf_counter() - start
+    rows = len(result.applied) + len(result.duplicates) + len(result.failures)
+    click.echo(
+        f"{len(result.applied)} payments applied, {len(result.duplicates)} duplicates, "
+        f"{len(result.failures)} rejected, {result.invoices_updated} invoice balances refreshed, "
+        f"{seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)"
+    )
+    for failure in result.failures[:20]:
+        click.echo(f"  row {failure.index}: {failure.public_payment_id}: {failure.reason}")
+
+
+@sales_cli.command("rollup")
+@click.option("--rebuild", is_flag=True, help="Recompute every day instead of catching up.")
+@click.option("--chunk-days", type=int, default=31, show_default=True, help="Days per transaction.")
+@click.option(
+    "--time-budget", type=float, default=None,
+    help="Stop after this many seconds, the days left stay queued for the next run.",
+)
+def sales_rollup_command(rebuild, chunk_days, time_budget):
+    '''Bring the daily sales rollups up to date with the invoices.'''
+    if rebuild:
+        click.echo(f"rollups rebuilt, {rebuild_rollups()} days with sales")
+        return
+    report = catch_up(chunk_days=chunk_days, time_budget=time_budget)
+    state = "up to date" if report.completed else "stopped by the time budget, days left queued"
+    click.echo(
+        f"{report.days_queued} days queued, {report.days} days recomputed in {report.chunks} chunks, "
+        f"{report.seconds:.2f}s, {state}"
+    )
+
+
+@idempotency_cli.command("purge")
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Keys per DELETE.")
+def purge_idempotency_command(chunk_size):
+    '''Delete the idempotency keys past IDEMPOTENCY_TTL.'''
+    click.echo(f"{purge_expired(chunk_size=chunk_size)} expired idempotency keys deleted")
+
+
+def _import_command(kind):
+    @import_cli.command(kind, help=f"Upsert {kind} from a CSV or NDJSON file, resuming from its checkpoint.")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default=None,
+                  help="File format (default: from the extension, .ndjson/.jsonl or csv).")
+    @click.option("--rejects", "rejects_path", type=click.Path(dir_okay=False), default=None,
+                  help="Where rejected rows go (default: PATH.rejects.ndjson).")
+    @click.option("--chunk-size", type=int, default=1000, show_default=True, help="Rows per transaction.")
+    @click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first row.")
+    def command(path, fmt, rejects_path, chunk_size, restart):
+        report = import_file(
+            kind, path, fmt=fmt, rejects_path=rejects_path, chunk_size=chunk_size, restart=restart,
+        )
+        click.echo(
+            f"{report.rows_read} rows read, {report.rows_written} {kind} written, "
+            f"{report.rejected} rejected in {report.chunks} chunks, "
+            f"{report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)"
+        )
+        for stage in report.stages:
+            click.echo(f"  {stage.name:<9} {stage.rows:>9} rows {stage.seconds:>8.2f}s "
+                       f"{stage.rows_per_second:>10.0f} rows/s")
+
+    return command
+
+
+import_customers_command = _import_command("customers")
+import_products_command = _import_command("products")
+
+
+@indexes_cli.command("advise")
+@click.option("--only", multiple=True, type=click.Choice(sorted(CANONICAL_QUERIES)),
+              help="Check this canonical query only, repeatable.")
+@click.option("--plans", is_flag=True, help="Print every plan, not only the flagged ones.")
+def advise_indexes_command(only, plans):
+    '''EXPLAIN the canonical queries, exit 1 when one does a full scan or a filesort.'''
+    results = advise(only or None)
+    for advice in results:
+        state = "ok" if advice.ok else "FLAGGED"
+        click.echo(f"{advice.query.name:<28} {state:<8} {advice.query.description}")
+        for finding in advice.findings:
+            click.echo(f"  {finding.kind}: {finding.detail}")
+        for finding in advice.allowed:
+            click.echo(f"  {finding.kind} (allowed): {finding.detail}")
+        if plans or not advice.ok:
+            for line in advice.plan:
+                click.echo(f"    | {line}")
+    flagged = sum(not advice.ok for advice in results)
+    click.echo(f"{len(results)} queries checked, {flagged} flagged")
+    if flagged:
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(aging_cli)
+    app.cli.add_command(invoices_cli)
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(sales_cli)
+    app.cli.add_command(idempotency_cli)
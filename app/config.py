@@ -1,11 +1,76 @@
 import os
 
+from sqlalchemy.pool import NullPool
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def engine_options_from_env(database_uri, environ=os.environ):
+    '''
+    SQLALCHEMY_ENGINE_OPTIONS for the pool, read from environment variables.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds to wait for a connection),
+    DB_POOL_RECYCLE (seconds, keep it below mysql wait_timeout to avoid stale connections),
+    DB_POOL_PRE_PING (test a connection before handing it out),
+    DB_NULLPOOL (no pooling, for pre-fork workers that must not share sockets)
+    '''
+    if _env_bool(environ, "DB_NULLPOOL", False):
+        return {"poolclass": NullPool}
+
+    options = {
+        "pool_pre_ping": _env_bool(environ, "DB_POOL_PRE_PING", True),
+        "pool_recycle": _env_int(environ, "DB_POOL_RECYCLE", 1800),
+    }
+    # sqlite file/memory databases do not use a QueuePool, size options do not apply
+    if not database_uri.startswith("sqlite"):
+        options.update(
+            pool_size=_env_int(environ, "DB_POOL_SIZE", 10),
+            max_overflow=_env_int(environ, "DB_MAX_OVERFLOW", 20),
+            pool_timeout=_env_int(environ, "DB_POOL_TIMEOUT", 30),
+        )
+    return options
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL", # use the environment variable or the below line of code
         "mysql+pymysql://erp:erp@db:3306/erp"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options_from_env(SQLALCHEMY_DATABASE_URI)
+    # optional read replicas for reporting queries, comma separated. see app/db_routing.py
+    SQLALCHEMY_REPLICA_URIS = [
+        uri.strip() for uri in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if uri.strip()
+    ]
+    # in-process product catalog cache (app/services/catalog_cache.py)
+    CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "10000"))
+    CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+    # ETag response cache of invoice and product documents (app/services/response_cache.py), lru or shared
+    RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "lru")
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # Idempotency-Key of POST /invoices and /payments (app/services/idempotency.py), seconds
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+    IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "5"))
+    # front store of the completed responses, lru or shared
+    IDEMPOTENCY_CACHE = os.getenv("IDEMPOTENCY_CACHE", "lru")
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    # sql instrumentation (app/instrumentation.py), statements slower than SLOW_QUERY_MS are logged
+    SQL_INSTRUMENTATION = _env_bool(os.environ, "SQL_INSTRUMENTATION", True)
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+    # paid/cancelled invoices closed longer ago move to the archive tables (flask invoices archive)
+    ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "730"))
 
 '''
 username: erp
@@ -13,4 +78,4 @@ password: erp
 host: db
 port: 3306
 database: erp
-'''
\ No newline at end of file
+'''
@@ -0,0 +1,87 @@
+'''
+Read replica routing for db.session.
+
+- replica URIs (SQLALCHEMY_REPLICA_URIS) get their own engines, stored in app.extensions["db_replicas"]
+- plain SELECTs go to a replica, round robin
+- flushes, INSERT/UPDATE/DELETE, SELECT .. FOR UPDATE and raw connections go to the primary
+- once the session has written, every read stays on the primary (read your writes) until
+  the end of the request, commits included: a replica may not have the write yet
+- use_primary() / use_replica() override the routing for a block, or a view as a decorator
+
+without replicas configured the session behaves exactly like the default flask-sqlalchemy one
+'''
+
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.sql import Select
+
+_route: ContextVar = ContextVar("db_route", default=None)
+_round_robin = itertools.count()
+
+
+def init_replicas(app):
+    '''Create an engine per configured replica URI, with the same pool options as the primary.'''
+    # not flask-sqlalchemy binds: a bind key would also register an empty metadata on db
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    app.extensions["db_replicas"] = [
+        create_engine(uri, **options)
+        for uri in app.config.get("SQLALCHEMY_REPLICA_URIS") or ()
+    ]
+
+    @app.teardown_request
+    def _reset_wrote(exc):
+        session = app.extensions["sqlalchemy"].session
+        if session.registry.has():
+            session().wrote = False
+
+
+@contextmanager
+def use_primary():
+    '''Send every query of the block (or decorated view) to the primary.'''
+    token = _route.set("primary")
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+@contextmanager
+def use_replica():
+    '''Send reads of the block to a replica even after the transaction wrote. writes still go to the primary.'''
+    token = _route.set("replica")
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def _is_read(clause):
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.wrote = False # written to the primary in the current request
+
+    def replica_engines(self):
+        return current_app.extensions.get("db_replicas", ())
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            # bound to a connection, e.g. joined to an outer transaction in tests
+            return self.bind
+        if bind is None:
+            route = _route.get()
+            if self._flushing or not _is_read(clause):
+                self.wrote = True
+            elif route == "replica" or (route is None and not self.wrote):
+                replicas = self.replica_engines()
+                if replicas:
+                    return replicas[next(_round_robin) % len(replicas)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
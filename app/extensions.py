@@ -1,14 +1,38 @@
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import String, BigInteger, Numeric, Text, Boolean, DateTime
+from sqlalchemy.ext.compiler import compiles
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy.orm import mapped_column, Mapped, WriteOnlyMapped
 from flask_migrate import Migrate
 
+from .db_routing import RoutingSession
+
+
+def include_in_migrations(object_, name, type_, reflected, compare_to):
+    '''
+    alembic include_object, what autogenerate (flask db migrate / check) leaves alone:
+    - products_search and its FTS5 shadow tables, sqlite only (app/models/products.py)
+    - dialect specific indexes (Index.ddl_if), their migrations are written by hand
+    '''
+    if type_ == "table" and name.startswith("products_search"):
+        return False
+    if type_ == "index" and not reflected and getattr(object_, "_ddl_if", None) is not None:
+        return False
+    return True
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+migrate = Migrate(include_object=include_in_migrations)
+
+
+# biginteger does not increment automatically in sqlite. only INTEGER PRIMARY KEY is a rowid alias
+# sqlite integers are 64 bit anyway, so render BIGINT as INTEGER there (local runs and benchmarks)
+@compiles(BigInteger, "sqlite")
+def _sqlite_biginteger(type_, compiler, **kw):
+    return "INTEGER"
 
-db = SQLAlchemy()
-migrate = Migrate()
 
 class TimeStampModel(db.Model):
     __abstract__ = True
@@ -18,4 +42,4 @@ class TimeStampModel(db.Model):
     updated: Mapped[datetime] = mapped_column(
         default=lambda: datetime.now(timezone.utc), 
         onupdate=lambda: datetime.now(timezone.utc)
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,225 @@
+'''
+SQL instrumentation: what the app sends to the database and how long it takes.
+
+listens to before_cursor_execute / after_cursor_execute on every engine of the app
+(the primary db engine and the read replicas, see app/db_routing.py) and records
+
+- per request: number of statements and total database time. sent back in the
+  Server-Timing and X-Query-Count response headers
+- per statement fingerprint (literals and IN lists collapsed): count, total and max time,
+  latency histogram. served at /health/queries
+- statements slower than SLOW_QUERY_MS are logged with their fingerprint on the
+  app.instrumentation logger
+
+capture_queries() records the statements of a block, tests use it through the
+max_queries fixture (tests/conftest.py) to catch N+1 loaders.
+'''
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Iterator, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# histogram upper bounds, the last bucket is everything above
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+BUCKETS_QUERIES = (1, 2, 5, 10, 20, 50, 100)
+MAX_FINGERPRINTS = 500
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+_TRANSACTION = re.compile(r"\s*(BEGIN|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    '''The statement with literals replaced by ? and placeholder lists collapsed to (...).'''
+    text = _STRING.sub("?", statement)
+    text = _NUMBER.sub("?", text)
+    text = _PLACEHOLDER_LIST.sub("(...)", text)
+    text = _VALUES_LIST.sub(r"\1", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    seconds: float
+    executemany: bool
+
+
+class Histogram:
+    __slots__ = ("bounds", "unit", "count", "total", "max", "buckets")
+
+    def __init__(self, bounds=BUCKETS_MS, unit="ms"):
+        self.bounds = bounds
+        self.unit = unit
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(bounds) + 1)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.buckets[bisect_left(self.bounds, value)] += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"le_{bound}{self.unit}" for bound in self.bounds] + [f"gt_{self.bounds[-1]}{self.unit}"]
+        return {
+            "count": self.count,
+            f"total_{self.unit}": round(self.total, 3),
+            f"mean_{self.unit}": round(self.total / self.count, 3) if self.count else 0.0,
+            f"max_{self.unit}": round(self.max, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class QueryStats:
+    '''Process wide aggregates, shared by every request thread.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._all = Histogram()
+            self._statements: dict[str, Histogram] = {}
+            self._requests: dict[str, tuple[Histogram, Histogram]] = {}
+
+    def record_statement(self, statement_fingerprint: str, ms: float) -> None:
+        with self._lock:
+            self._all.add(ms)
+            histogram = self._statements.get(statement_fingerprint)
+            if histogram is None:
+                if len(self._statements) >= MAX_FINGERPRINTS:
+                    statement_fingerprint = "<other>"
+                    histogram = self._statements.get(statement_fingerprint)
+                if histogram is None:
+                    histogram = self._statements[statement_fingerprint] = Histogram()
+            histogram.add(ms)
+
+    def record_request(self, endpoint: str, queries: int, db_ms: float) -> None:
+        with self._lock:
+            counts, times = self._requests.get(endpoint) or self._requests.setdefault(
+                endpoint, (Histogram(BUCKETS_QUERIES, "queries"), Histogram())
+            )
+            counts.add(queries)
+            times.add(db_ms)
+
+    def snapshot(self, top: int = 50, order: str = "total_ms") -> dict:
+        with self._lock:
+            statements = [
+                dict(histogram.to_dict(), fingerprint=key) for key, histogram in self._statements.items()
+            ]
+            requests = {
+                endpoint: {"queries": counts.to_dict(), "db_time": times.to_dict()}
+                for endpoint, (counts, times) in self._requests.items()
+            }
+            overall = self._all.to_dict()
+        statements.sort(key=lambda item: item[order], reverse=True)
+        return {
+            "statements": overall,
+            "fingerprints": len(statements),
+            "top": statements[:top],
+            "requests": requests,
+        }
+
+
+query_stats = QueryStats()
+
+# active capture_queries() blocks of the current thread/task
+_captures: ContextVar[tuple[list, ...]] = ContextVar("query_captures", default=())
+
+
+@contextmanager
+def capture_queries() -> Iterator[list[QueryRecord]]:
+    '''Collect the statements executed inside the block (on instrumented engines), BEGIN/SAVEPOINT excluded.'''
+    records: list[QueryRecord] = []
+    token = _captures.set(_captures.get() + (records,))
+    try:
+        yield records
+    finally:
+        _captures.reset(token)
+
+
+class _Settings:
+    slow_query_ms: Optional[float] = 200.0
+
+
+_settings = _Settings()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the statement's own context: a statement that raises never reaches after_cursor_execute
+    context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = perf_counter() - context._query_started
+    ms = seconds * 1000
+    key = fingerprint(statement)
+    query_stats.record_statement(key, ms)
+
+    captures = _captures.get()
+    if captures and not _TRANSACTION.match(statement):
+        record = QueryRecord(statement, seconds, executemany)
+        for records in captures:
+            records.append(record)
+
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+        g.db_seconds = g.get("db_seconds", 0.0) + seconds
+
+    if _settings.slow_query_ms is not None and ms >= _settings.slow_query_ms:
+        logger.warning("slow query %.1f ms: %s", ms, key)
+
+
+def _after_request(response):
+    # streamed responses (export.ndjson) query after this point, only the statement stats see them
+    queries = g.get("query_count", 0)
+    db_ms = g.get("db_seconds", 0.0) * 1000
+    query_stats.record_request(request.endpoint or "<unmatched>", queries, db_ms)
+    response.headers["X-Query-Count"] = str(queries)
+    response.headers.add("Server-Timing", f"db;dur={db_ms:.2f}")
+    return response
+
+
+def instrument_engine(engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_instrumentation(app) -> None:
+    '''
+    Instrument the app's engines. SQL_INSTRUMENTATION=False turns it off,
+    SLOW_QUERY_MS sets the slow query log threshold (None disables the log).
+    '''
+    if not app.config.get("SQL_INSTRUMENTATION", True):
+        return
+    _settings.slow_query_ms = app.config.get("SLOW_QUERY_MS", 200.0)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+    for engine in app.extensions.get("db_replicas", ()):
+        instrument_engine(engine)
+    app.after_request(_after_request)
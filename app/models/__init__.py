@@ -3,6 +3,11 @@ from app.models.customers import Customer
 from app.models.products import Product, ProductVariant
 from app.models.invoice import Invoice, InvoiceItem, InvoiceTax, InvoiceStatus
 from app.models.payments import Payment
+from app.models.aging import CustomerAging
+from app.models.jobs import JobCheckpoint
+from app.models.sales import SalesDailyCustomer, SalesDailyProduct, SalesDailyTaxRate, SalesStaleDay
+from app.models.idempotency import IdempotencyKey
+from app.models.archive import ArchivedInvoice, ArchivedInvoiceItem, ArchivedInvoiceTax, ArchivedPayment
 
 __all__ = [
     'User',
@@ -14,4 +19,15 @@ __all__ = [
     'InvoiceStatus',
     'InvoiceTax',
     'Payment',
+    'CustomerAging',
+    'JobCheckpoint',
+    'ArchivedInvoice',
+    'ArchivedInvoiceItem',
+    'ArchivedInvoiceTax',
+    'ArchivedPayment',
+    'SalesDailyProduct',
+    'SalesDailyCustomer',
+    'SalesDailyTaxRate',
+    'SalesStaleDay',
+    'IdempotencyKey',
 ]
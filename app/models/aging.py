@@ -0,0 +1,42 @@
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal
+
+from app.extensions import (
+    db,
+    Mapped,
+    mapped_column,
+    BigInteger,
+    Numeric,
+    TimeStampModel,
+)
+
+
+class CustomerAging(TimeStampModel):
+    '''
+    Materialized accounts receivable aging, one row per customer with an open balance.
+    maintained by app/services/ar_aging.py, never written by hand.
+    '''
+    __tablename__ = 'customer_ar_aging'
+    # one row per customer, reading the aging is a primary key lookup
+    customer_fk_id: Mapped[int] = mapped_column(
+        BigInteger, db.ForeignKey('customers.id'), primary_key=True, autoincrement=False
+    )
+
+    # outstanding balance of pending/overdue invoices by days past invoice_due_date
+    current_amount: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    days_1_30: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    days_31_60: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    days_61_90: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    days_over_90: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    total_outstanding: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    open_invoices: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    # the day the buckets were computed for. buckets shift every day, rebuild daily
+    as_of: Mapped[date] = mapped_column(nullable=False)
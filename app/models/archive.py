@@ -0,0 +1,91 @@
+'''
+Archive tables for closed invoices: invoices_archive, invoice_items_archive,
+invoice_taxes_archive and payments_archive. rows are moved here by
+app/services/invoice_archive.py and keep their ids.
+
+- the columns are copied from the live tables, a column added there shows up here in
+  the next migration
+- no foreign keys: the archiver writes an invoice and its children in one transaction,
+  and mysql cannot partition a table that has or is referenced by a foreign key
+- invoices_archive has primary key (id, invoice_date) and a plain index on
+  public_invoice_id, every unique key of a partitioned mysql table must contain the
+  partition column (see migrations/versions/0005)
+'''
+
+from sqlalchemy import Column, DateTime
+from sqlalchemy.orm import foreign
+
+from app.extensions import db
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+
+
+def _archive_table(source, name, primary_key=("id",), indexes=()):
+    '''Same columns as source, without defaults, keys or indexes, plus the archived timestamp.'''
+    columns = [
+        Column(column.name, column.type, nullable=column.nullable, primary_key=True, autoincrement=False)
+        if column.name in primary_key else Column(column.name, column.type, nullable=column.nullable)
+        for column in source.columns
+    ]
+    columns.append(Column("archived", DateTime, nullable=False))
+    table = db.Table(name, *columns)
+    for index_name, *index_columns in indexes:
+        db.Index(index_name, *(table.c[column] for column in index_columns))
+    return table
+
+
+class ArchivedInvoiceItem(db.Model):
+    __table__ = _archive_table(
+        InvoiceItem.__table__, "invoice_items_archive",
+        indexes=[("ix_invoice_items_archive_invoice_fk_id", "invoice_fk_id")],
+    )
+
+
+class ArchivedInvoiceTax(db.Model):
+    __table__ = _archive_table(
+        InvoiceTax.__table__, "invoice_taxes_archive",
+        indexes=[("ix_invoice_taxes_archive_invoice_fk_id", "invoice_fk_id")],
+    )
+
+
+class ArchivedPayment(db.Model):
+    __table__ = _archive_table(
+        Payment.__table__, "payments_archive",
+        indexes=[
+            ("ix_payments_archive_invoice_fk_id", "invoice_fk_id"),
+            ("ix_payments_archive_public_payment_id", "public_payment_id"),
+        ],
+    )
+
+
+class ArchivedInvoice(db.Model):
+    __table__ = _archive_table(
+        Invoice.__table__, "invoices_archive", primary_key=("id", "invoice_date"),
+        indexes=[
+            ("ix_invoices_archive_public_invoice_id", "public_invoice_id"),
+            ("ix_invoices_archive_customer_invoice_date", "customer_fk_id", "invoice_date"),
+            ("ix_invoices_archive_invoice_date", "invoice_date"),
+        ],
+    )
+
+    # read only, same attribute names as Invoice so callers can treat both alike
+    items = db.relationship(
+        ArchivedInvoiceItem, primaryjoin=lambda: ArchivedInvoice.id == foreign(ArchivedInvoiceItem.invoice_fk_id),
+        viewonly=True, lazy='select',
+    )
+    taxes = db.relationship(
+        ArchivedInvoiceTax, primaryjoin=lambda: ArchivedInvoice.id == foreign(ArchivedInvoiceTax.invoice_fk_id),
+        viewonly=True, lazy='select',
+    )
+    payments = db.relationship(
+        ArchivedPayment, primaryjoin=lambda: ArchivedInvoice.id == foreign(ArchivedPayment.invoice_fk_id),
+        viewonly=True, lazy='select',
+    )
+
+
+ARCHIVE_MODELS = {
+    Invoice: ArchivedInvoice,
+    InvoiceItem: ArchivedInvoiceItem,
+    InvoiceTax: ArchivedInvoiceTax,
+    Payment: ArchivedPayment,
+}
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING
 from app.extensions import (
     db,
     Mapped,
+    WriteOnlyMapped,
     mapped_column,
     String,
     BigInteger,
@@ -35,9 +36,19 @@ class Customer(TimeStampModel):
     customer_address: Mapped[str] = mapped_column(Text, nullable=False)
     additional_notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     # one customer can have many invoices
-    # use list in the many side of a relationship only
-    invoices: Mapped[list["Invoice"]] = db.relationship(
+    # write only: large accounts have tens of thousands of invoices, never load them all.
+    # filter and paginate with customer.invoices.select(), add with customer.invoices.add(invoice)
+    invoices: WriteOnlyMapped["Invoice"] = db.relationship(
         'Invoice',
         back_populates='customer',
-        lazy='selectin',
+        lazy='write_only',
+    )
+
+    # read only view of the unpaid invoices. eager load it through a query profile (app/models/loading.py)
+    open_invoices: Mapped[list["Invoice"]] = db.relationship(
+        'Invoice',
+        primaryjoin="and_(Customer.id == Invoice.customer_fk_id, "
+                    "Invoice.status.in_(['pending', 'overdue']))",
+        viewonly=True,
+        lazy='select',
     )
\ No newline at end of file
@@ -0,0 +1,38 @@
+from __future__ import annotations
+from datetime import datetime
+
+from sqlalchemy import Integer, LargeBinary
+
+from app.extensions import (
+    db,
+    Mapped,
+    mapped_column,
+    String,
+    DateTime,
+    Optional,
+    TimeStampModel,
+)
+
+
+class IdempotencyKey(TimeStampModel):
+    '''
+    One Idempotency-Key of a write endpoint and the response it got.
+    written by app/services/idempotency.py, purged after expires (flask idempotency purge).
+    '''
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_expires', 'expires'),
+    )
+    # endpoint, e.g. 'invoices.create'. the same key may be used on two endpoints
+    scope: Mapped[str] = mapped_column(String(50), primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    # hash of the request body, a key reused with another body is rejected
+    request_hash: Mapped[str] = mapped_column(String(32), nullable=False)
+    # None while the first request is running
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # mediumblob on mysql, an invoice with many lines outgrows a 64k blob
+    response_body: Mapped[Optional[bytes]] = mapped_column(LargeBinary(2**24 - 1), nullable=True)
+    # a running request past this time is taken for dead, a retry may run it again
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires: Mapped[datetime] = mapped_column(DateTime, nullable=False)
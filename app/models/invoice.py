@@ -34,15 +34,27 @@ class InvoiceStatus(PyEnum):
 
 class Invoice(TimeStampModel):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # overdue sweeper and the collections worklist: open invoices by due date
+        db.Index("ix_invoices_status_due_date", "status", "invoice_due_date"),
+        # a customer's invoices by status (open_invoices, /invoices?customer=&status=, aging refresh)
+        db.Index("ix_invoices_customer_status", "customer_fk_id", "status"),
+        # a customer's latest invoices (customer.invoices.select() pages)
+        db.Index("ix_invoices_customer_invoice_date", "customer_fk_id", "invoice_date"),
+        # sales rollups (app/services/sales_rollups.py): the invoices of a range of days,
+        # and the days of the invoices changed since the watermark
+        db.Index("ix_invoices_invoice_date", "invoice_date"),
+        db.Index("ix_invoices_updated", "updated"),
+    )
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
 
     public_invoice_id: Mapped[str] = mapped_column(
         String(50), unique=True, nullable=False, index=True
     )
     
-    # from customers table
+    # from customers table. indexed through the composite indexes above, customer_fk_id leads both
     customer_fk_id: Mapped[int] = mapped_column(
-        BigInteger, db.ForeignKey('customers.id'), nullable=False, index=True
+        BigInteger, db.ForeignKey('customers.id'), nullable=False
     )
     
     # a relationship with annotations does not have nullable=False
@@ -89,15 +101,16 @@ class Invoice(TimeStampModel):
     ) # cascade to delete if invoice is deleted everything
     
     
+    # lazy by default. eager loading is chosen per call site with a query profile (app/models/loading.py)
     payments: Mapped[list["Payment"]] = db.relationship(
         "Payment", back_populates="invoice",
-        lazy='selectin',
+        lazy='select',
         cascade='all, delete-orphan' # delete an invoice to delete all payments
     )
     
     # see invoicetaxes relationship annotated mapping
     taxes: Mapped[list["InvoiceTax"]] = db.relationship(
-        "InvoiceTax", back_populates="invoice", cascade="all, delete-orphan", lazy="selectin"
+        "InvoiceTax", back_populates="invoice", cascade="all, delete-orphan", lazy="select"
     )
 
     additional_notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
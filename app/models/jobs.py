@@ -0,0 +1,15 @@
+from app.extensions import (
+    Mapped,
+    mapped_column,
+    String,
+    BigInteger,
+    TimeStampModel,
+)
+
+
+class JobCheckpoint(TimeStampModel):
+    '''Where a resumable batch job stopped. one row per job name.'''
+    __tablename__ = 'job_checkpoints'
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # last primary key (or row number) the job finished, 0 means start from the beginning
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,62 @@
+'''
+Named query profiles: which relationships a call site loads, and how.
+
+- summary: the row itself. any relationship access raises instead of emitting a query
+- with_open_invoices: customers with their unpaid invoices, one extra SELECT .. IN
+- full: open invoices with their items, payments and taxes, one SELECT .. IN per relationship
+
+Customer.invoices is write only and is never loaded by a profile,
+page through it with customer.invoices.select().
+
+usage:
+    db.session.scalars(customer_query("with_open_invoices").where(...))
+'''
+
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload, selectinload
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice
+
+CUSTOMER_PROFILES = {
+    "summary": (raiseload("*"),),
+    "with_open_invoices": (
+        selectinload(Customer.open_invoices).raiseload("*"),
+    ),
+    "full": (
+        selectinload(Customer.open_invoices).options(
+            selectinload(Invoice.items),
+            selectinload(Invoice.payments),
+            selectinload(Invoice.taxes),
+            raiseload("*"),
+        ),
+    ),
+}
+
+INVOICE_PROFILES = {
+    "summary": (raiseload("*"),),
+    "with_payments": (selectinload(Invoice.payments), raiseload("*")),
+    "full": (
+        selectinload(Invoice.items),
+        selectinload(Invoice.payments),
+        selectinload(Invoice.taxes),
+        selectinload(Invoice.customer).raiseload("*"),
+    ),
+}
+
+PROFILES = {Customer: CUSTOMER_PROFILES, Invoice: INVOICE_PROFILES}
+
+
+def profile_options(model, profile):
+    try:
+        return PROFILES[model][profile]
+    except KeyError:
+        raise ValueError(f"unknown query profile {profile!r} for {model.__name__}") from None
+
+
+def customer_query(profile="summary"):
+    return select(Customer).options(*profile_options(Customer, profile))
+
+
+def invoice_query(profile="summary"):
+    return select(Invoice).options(*profile_options(Invoice, profile))
@@ -22,6 +22,10 @@ if TYPE_CHECKING:
 
 class Payment(TimeStampModel):
     __tablename__ = 'payments'
+    __table_args__ = (
+        # payments of an invoice by date, also serves lookups by invoice_fk_id alone
+        db.Index("ix_payments_invoice_payment_date", "invoice_fk_id", "payment_date"),
+    )
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
 
     # external systems stripe. requires strings
@@ -32,7 +36,6 @@ class Payment(TimeStampModel):
         BigInteger,
         db.ForeignKey('invoices.id'),
         nullable=False,
-        index=True,
     )
 
     payment_amount: Mapped[Decimal] = mapped_column(
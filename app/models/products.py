@@ -1,5 +1,7 @@
 from decimal import Decimal
 
+from sqlalchemy import DDL, event
+
 from app.extensions import (
     db,
     Mapped,
@@ -14,8 +16,16 @@ from app.extensions import (
 )
 
 
+SEARCH_COLUMNS = ("product_name", "brand", "product_category", "product_description")
+
+
 class Product(TimeStampModel):
     __tablename__ = 'products'
+    __table_args__ = (
+        # full text search on mysql (app/services/product_search.py). sqlite uses the
+        # products_search FTS5 table below, other databases get neither
+        db.Index("ft_products_search", *SEARCH_COLUMNS, mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     public_product_id: Mapped[str] = mapped_column(
         String(50), index=True, unique=True, nullable=False
@@ -31,7 +41,7 @@ class Product(TimeStampModel):
         Boolean, default=True, nullable=False
     )
     product_description: Mapped[str] = mapped_column(Text, nullable=False)
-    # text cannot be indexed
+    # text cannot be indexed, except by the full text index above
     # If a column is unique=True or index=True, it must be String(n) in MySQL.
     # 3072 bytes = 768 characters in utf8mb4
     url: Mapped[str] = mapped_column(
@@ -53,9 +63,13 @@ class Product(TimeStampModel):
 
 class ProductVariant(TimeStampModel):
     __tablename__ = 'product_variants'
+    __table_args__ = (
+        # active variants of a product, also serves lookups by product_fk_id alone
+        db.Index("ix_product_variants_product_active", "product_fk_id", "is_active"),
+    )
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     product_fk_id: Mapped[int] = mapped_column(
-        BigInteger, db.ForeignKey("products.id"), nullable=False, index=True
+        BigInteger, db.ForeignKey("products.id"), nullable=False
     )
     is_active: Mapped[bool] = mapped_column(
         Boolean, default=True, nullable=False
@@ -66,4 +80,29 @@ class ProductVariant(TimeStampModel):
     has_stock: Mapped[bool] = mapped_column(default=False, nullable=False)
     inventory_stock: Mapped[int] = mapped_column(BigInteger, nullable=False)
 
-    parent = db.relationship('Product', back_populates='children_variants')
\ No newline at end of file
+    parent = db.relationship('Product', back_populates='children_variants')
+
+
+# sqlite: FTS5 index over the search columns, an external content table that reads the
+# text from products and is kept in sync by triggers, bulk writes included.
+# prefix='2 3' keeps prefix indexes, a 2 or 3 letter prefix query does not walk every term.
+# also created by migration 0006, autogenerate leaves it alone (app/extensions.py)
+_columns = ", ".join(SEARCH_COLUMNS)
+_new = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+_old = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE products_search USING fts5({_columns}, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER products_search_insert AFTER INSERT ON products BEGIN "
+    f"INSERT INTO products_search(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER products_search_delete AFTER DELETE ON products BEGIN "
+    f"INSERT INTO products_search(products_search, rowid, {_columns}) VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER products_search_update AFTER UPDATE OF {_columns} ON products BEGIN "
+    f"INSERT INTO products_search(products_search, rowid, {_columns}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO products_search(rowid, {_columns}) VALUES (new.id, {_new}); END",
+)
+
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+# the triggers go with the products table, the virtual table does not
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_search").execute_if(dialect="sqlite"))
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal
+
+from app.extensions import (
+    db,
+    Mapped,
+    mapped_column,
+    BigInteger,
+    Numeric,
+    TimeStampModel,
+)
+
+
+class SalesDailyProduct(TimeStampModel):
+    '''
+    Sales per day and product, from the invoice lines of the invoices dated that day.
+    maintained by app/services/sales_rollups.py, never written by hand.
+    '''
+    __tablename__ = 'sales_daily_product'
+    __table_args__ = (
+        # one product over a date range. ranges over every product use the primary key
+        db.Index('ix_sales_daily_product_product_day', 'product_fk_id', 'day'),
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    product_fk_id: Mapped[int] = mapped_column(
+        BigInteger, db.ForeignKey('products.id'), primary_key=True, autoincrement=False
+    )
+
+    quantity: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # sum of line_total
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal('0.00'))
+    lines: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    invoices: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class SalesDailyCustomer(TimeStampModel):
+    '''Sales and tax per day and customer. maintained by app/services/sales_rollups.py.'''
+    __tablename__ = 'sales_daily_customer'
+    __table_args__ = (
+        db.Index('ix_sales_daily_customer_customer_day', 'customer_fk_id', 'day'),
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    customer_fk_id: Mapped[int] = mapped_column(
+        BigInteger, db.ForeignKey('customers.id'), primary_key=True, autoincrement=False
+    )
+
+    invoices: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # sum of line_total
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal('0.00'))
+    # sum of the invoice_taxes amounts
+    tax_amount: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal('0.00'))
+
+
+class SalesDailyTaxRate(TimeStampModel):
+    '''Taxable sales and tax per day and tax rate. maintained by app/services/sales_rollups.py.'''
+    __tablename__ = 'sales_daily_tax_rate'
+    day: Mapped[date] = mapped_column(primary_key=True)
+    tax_rate_percent: Mapped[Decimal] = mapped_column(Numeric(5, 2), primary_key=True)
+
+    invoices: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # line totals of the invoices taxed at the rate
+    taxable_amount: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal('0.00'))
+    tax_amount: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal('0.00'))
+
+
+class SalesStaleDay(TimeStampModel):
+    '''
+    Days whose rollups are out of date, the work queue of the rollup catch up.
+    filled from the invoices.updated watermark and by the session events of
+    app/services/sales_rollups.py (deletes, invoices moved to another day, line and tax edits).
+    '''
+    __tablename__ = 'sales_stale_days'
+    day: Mapped[date] = mapped_column(primary_key=True)
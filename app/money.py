@@ -0,0 +1,270 @@
+'''
+Money as integer minor units (cents), for arithmetic on many amounts.
+
+the amount columns stay Numeric(10, 2) and map to Decimal. Decimal construction and
+arithmetic is slow when totalling large invoices, Money is a plain int plus a currency:
+
+- Money(1998, "USD") is 19.98 USD. immutable, __slots__, hashable
+- + and - need the same currency (CurrencyMismatchError), * takes an int quantity
+- sum(amounts) works, Money.total(amounts) is the fast path for long lists
+- one Money operation is a python call and is not faster than the C decimal module.
+  the gain is in bulk work on the ints: Money.total(), tax_minor() on .minor, which is
+  what the totals engine does (benchmarks/bench_money.py)
+- from_decimal() / to_decimal() round-trip exactly with the Numeric(.., 2) columns,
+  more precision than the currency has minor units raises unless a rounding is given
+
+tax rules: tax is computed on the invoice subtotal, once per InvoiceTax row, from
+tax_rate_percent (two decimals), rounded half up to the minor unit (TAX_ROUNDING).
+rounding modes are the decimal module's constants, implemented on ints by round_div().
+
+MoneyType reads a Numeric column as Money and writes Money (or Decimal) back:
+    select(type_coerce(Invoice.total_amount, MoneyType()))
+'''
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+from typing import Iterable, Union
+
+from sqlalchemy import Numeric
+from sqlalchemy.types import TypeDecorator
+
+ROUNDINGS = (ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN)
+TAX_ROUNDING = ROUND_HALF_UP
+RATE_SCALE = 100 # tax_rate_percent is Numeric(5, 2), rates are handled in hundredths of a percent
+
+
+class CurrencyMismatchError(ValueError):
+    '''Raised when amounts in different currencies are combined.'''
+
+
+@dataclass(frozen=True)
+class Currency:
+    code: str
+    exponent: int # minor units per major unit, as a power of ten
+
+    @property
+    def scale(self) -> int:
+        return 10 ** self.exponent
+
+
+CURRENCIES = {
+    currency.code: currency
+    for currency in (
+        Currency("USD", 2), Currency("CAD", 2), Currency("EUR", 2), Currency("GBP", 2),
+        Currency("MXN", 2), Currency("JPY", 0),
+    )
+}
+DEFAULT_CURRENCY = "USD"
+
+
+def get_currency(currency: Union[str, Currency]) -> Currency:
+    '''The registered Currency for a code. a new Currency is registered on first use.'''
+    if isinstance(currency, Currency):
+        known = CURRENCIES.setdefault(currency.code, currency)
+        if known != currency:
+            raise ValueError(f"{currency.code} is registered with exponent {known.exponent}")
+        return known
+    try:
+        return CURRENCIES[currency]
+    except KeyError:
+        raise ValueError(f"unknown currency {currency!r}, known: {', '.join(CURRENCIES)}") from None
+
+
+def round_div(numerator: int, denominator: int, rounding: str = ROUND_HALF_UP) -> int:
+    '''numerator / denominator rounded to an int. half up and down are symmetric around zero.'''
+    sign = -1 if (numerator < 0) != (denominator < 0) else 1
+    quotient, remainder = divmod(abs(numerator), abs(denominator))
+    if rounding == ROUND_HALF_UP:
+        quotient += 2 * remainder >= abs(denominator)
+    elif rounding == ROUND_HALF_EVEN:
+        twice = 2 * remainder
+        quotient += twice > abs(denominator) or (twice == abs(denominator) and quotient % 2 == 1)
+    elif rounding != ROUND_DOWN:
+        raise ValueError(f"rounding must be one of {', '.join(ROUNDINGS)}, got {rounding!r}")
+    return sign * quotient
+
+
+@lru_cache(maxsize=256)
+def rate_hundredths(rate_percent) -> int:
+    '''8.5 (%) -> 850. the rate must fit tax_rate_percent, two decimals.'''
+    value = Decimal(str(rate_percent)) * RATE_SCALE
+    if value != value.to_integral_value():
+        raise ValueError(f"tax rate {rate_percent!r} has more than two decimals")
+    return int(value)
+
+
+def tax_minor(amount_minor: int, rate: int, rounding: str = TAX_ROUNDING) -> int:
+    '''Tax in minor units of an amount in minor units, for a rate in hundredths of a percent.'''
+    return round_div(amount_minor * rate, 100 * RATE_SCALE, rounding)
+
+
+class Money:
+    __slots__ = ("minor", "currency")
+
+    minor: int
+    currency: Currency
+
+    def __init__(self, minor: int, currency: Union[str, Currency] = DEFAULT_CURRENCY):
+        if type(minor) is not int:
+            raise TypeError(f"minor units must be an int, got {type(minor).__name__}")
+        _set_minor(self, minor)
+        _set_currency(self, get_currency(currency))
+
+    @classmethod
+    def zero(cls, currency: Union[str, Currency] = DEFAULT_CURRENCY) -> "Money":
+        return _make(0, get_currency(currency))
+
+    @classmethod
+    def from_decimal(cls, value, currency: Union[str, Currency] = DEFAULT_CURRENCY, rounding=None) -> "Money":
+        '''Exact conversion, raises on sub-minor precision unless rounding is given.'''
+        currency = get_currency(currency)
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        if not value.is_finite():
+            raise ValueError(f"not a finite amount: {value!r}")
+        minor = value.scaleb(currency.exponent)
+        whole = int(minor)
+        if whole != minor:
+            if rounding is None:
+                raise ValueError(f"{value} has more precision than {currency.code} minor units")
+            whole = int(minor.to_integral_value(rounding=rounding))
+        return _make(whole, currency)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.minor).scaleb(-self.currency.exponent)
+
+    @staticmethod
+    def total(amounts: Iterable["Money"], currency: Union[str, Currency] = DEFAULT_CURRENCY) -> "Money":
+        '''Sum of many amounts, one int addition per amount.'''
+        currency = get_currency(currency)
+        minor = 0
+        for amount in amounts:
+            if amount.currency is not currency:
+                raise CurrencyMismatchError(f"cannot add {amount.currency.code} to {currency.code}")
+            minor += amount.minor
+        return _make(minor, currency)
+
+    def tax(self, rate_percent, rounding: str = TAX_ROUNDING) -> "Money":
+        '''Tax on this amount for a rate in percent (8.5 for 8.5%), see TAX_ROUNDING.'''
+        return _make(tax_minor(self.minor, rate_hundredths(rate_percent), rounding), self.currency)
+
+    def _other(self, other) -> int:
+        if type(other) is Money:
+            if other.currency is not self.currency:
+                raise CurrencyMismatchError(f"cannot combine {self.currency.code} and {other.currency.code}")
+            return other.minor
+        return NotImplemented
+
+    def __add__(self, other):
+        minor = self._other(other)
+        if minor is NotImplemented:
+            return NotImplemented
+        return _make(self.minor + minor, self.currency)
+
+    def __radd__(self, other):
+        if type(other) is int and other == 0: # sum() starts from 0
+            return self
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        minor = self._other(other)
+        if minor is NotImplemented:
+            return NotImplemented
+        return _make(self.minor - minor, self.currency)
+
+    def __mul__(self, quantity):
+        if type(quantity) is not int:
+            return NotImplemented
+        return _make(self.minor * quantity, self.currency)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return _make(-self.minor, self.currency)
+
+    def __abs__(self):
+        return _make(abs(self.minor), self.currency)
+
+    def __bool__(self):
+        return self.minor != 0
+
+    def __eq__(self, other):
+        if type(other) is not Money:
+            return NotImplemented
+        return self.minor == other.minor and self.currency is other.currency
+
+    def __hash__(self):
+        return hash((self.minor, self.currency.code))
+
+    def __lt__(self, other):
+        minor = self._other(other)
+        return minor if minor is NotImplemented else self.minor < minor
+
+    def __le__(self, other):
+        minor = self._other(other)
+        return minor if minor is NotImplemented else self.minor <= minor
+
+    def __gt__(self, other):
+        minor = self._other(other)
+        return minor if minor is NotImplemented else self.minor > minor
+
+    def __ge__(self, other):
+        minor = self._other(other)
+        return minor if minor is NotImplemented else self.minor >= minor
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return (Money, (self.minor, self.currency.code))
+
+    def __repr__(self):
+        return f"Money('{self.to_decimal()}', '{self.currency.code}')"
+
+    def __str__(self):
+        return f"{self.to_decimal()} {self.currency.code}"
+
+
+# the slot descriptors write past the __setattr__ guard, cheaper than object.__setattr__
+_new = object.__new__
+_set_minor = Money.minor.__set__
+_set_currency = Money.currency.__set__
+
+
+def _make(minor: int, currency: Currency) -> Money:
+    '''Money without the checks of __init__, for results of arithmetic on checked values.'''
+    money = _new(Money)
+    _set_minor(money, minor)
+    _set_currency(money, currency)
+    return money
+
+
+class MoneyType(TypeDecorator):
+    '''Numeric(precision, scale) column read as Money. binds Money of the same currency, or Decimal.'''
+
+    impl = Numeric
+    cache_ok = True
+
+    def __init__(self, currency: Union[str, Currency] = DEFAULT_CURRENCY, precision: int = 10, scale: int = 2):
+        super().__init__(precision=precision, scale=scale, asdecimal=True)
+        self.currency = get_currency(currency)
+        if self.currency.exponent > scale:
+            raise ValueError(f"{self.currency.code} needs scale {self.currency.exponent}, column has {scale}")
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, Money):
+            if value.currency is not self.currency:
+                raise CurrencyMismatchError(f"{value.currency.code} amount for a {self.currency.code} column")
+            return value.to_decimal()
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Money.from_decimal(value, self.currency)
@@ -0,0 +1,66 @@
+from datetime import date
+
+from flask import Blueprint, abort, request
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.products import Product
+from app.routes.listing import json_response
+from app.serialization import row_encoder
+from app.services.sales_rollups import DAY_COLUMNS, SUMMARY_COLUMNS, sales_by_day, sales_summary
+
+analytics_bp = Blueprint("analytics", __name__)
+
+MAX_LIMIT = 1000
+# public id of the rollup keys that are foreign keys
+PUBLIC_IDS = {
+    "product": (Product.id, Product.public_product_id),
+    "customer": (Customer.id, Customer.customer_id),
+}
+
+
+def _date_range():
+    '''?from= and ?to= as dates, both included.'''
+    try:
+        date_from = date.fromisoformat(request.args["from"])
+        date_to = date.fromisoformat(request.args["to"])
+    except KeyError:
+        abort(400, description="from and to are required, YYYY-MM-DD")
+    except ValueError:
+        abort(400, description="from and to must be dates, YYYY-MM-DD")
+    if date_from > date_to:
+        abort(400, description="from is after to")
+    return date_from, date_to
+
+
+@analytics_bp.route("/analytics/sales")
+def sales():
+    '''Sales totals over a date range by product, customer or tax_rate, from the daily rollups. ?by= ?from= ?to= ?limit='''
+    by = request.args.get("by", "product")
+    if by not in SUMMARY_COLUMNS:
+        abort(400, description=f"by must be one of {', '.join(SUMMARY_COLUMNS)}")
+    date_from, date_to = _date_range()
+    try:
+        limit = int(request.args.get("limit", 100))
+    except ValueError:
+        abort(400, description="limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        abort(400, description=f"limit must be between 1 and {MAX_LIMIT}")
+
+    rows = sales_summary(by, date_from, date_to, limit=limit, session=db.session)
+    items = row_encoder(SUMMARY_COLUMNS[by]).dumpable(rows)
+    if by in PUBLIC_IDS:
+        key, public_id = PUBLIC_IDS[by]
+        public_ids = dict(db.session.execute(select(key, public_id).where(key.in_([row[0] for row in rows]))).all())
+        for row, item in zip(rows, items):
+            item[public_id.key] = public_ids.get(row[0])
+    return json_response({"by": by, "from": date_from.isoformat(), "to": date_to.isoformat(), "items": items})
+
+
+@analytics_bp.route("/analytics/sales/daily")
+def sales_daily():
+    '''Invoices, revenue and tax per day over a date range. ?from= ?to='''
+    date_from, date_to = _date_range()
+    rows = sales_by_day(date_from, date_to, session=db.session)
+    return json_response({"items": row_encoder(DAY_COLUMNS).dumpable(rows)})
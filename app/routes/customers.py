@@ -0,0 +1,74 @@
+from flask import Blueprint, abort
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.aging import CustomerAging
+from app.models.customers import Customer
+from app.routes.listing import json_response, keyset_page, ndjson_response, page_args, page_response
+from app.serialization import row_encoder
+from app.services.read_api import customer_detail
+
+customers_bp = Blueprint("customers", __name__)
+
+# columns only, selecting the entity would pull in the invoices relationship
+CUSTOMER_COLUMNS = (
+    Customer.id,
+    Customer.customer_id,
+    Customer.customer_name,
+    Customer.customer_email,
+    Customer.customer_phone,
+    Customer.customer_address,
+    Customer.created,
+    Customer.updated,
+)
+
+ORDERINGS = {"id": Customer.id, "customer_id": Customer.customer_id}
+
+
+@customers_bp.route("/customers")
+def list_customers():
+    column, after, limit = page_args(ORDERINGS)
+    rows, next_after = keyset_page(select(*CUSTOMER_COLUMNS), column, after, limit)
+    return page_response(rows, next_after, CUSTOMER_COLUMNS)
+
+
+@customers_bp.route("/customers/export.ndjson")
+def export_customers():
+    return ndjson_response(select(*CUSTOMER_COLUMNS).order_by(Customer.id), CUSTOMER_COLUMNS)
+
+
+@customers_bp.route("/customers/<customer_id>")
+def get_customer(customer_id):
+    body = customer_detail(db.session, customer_id)
+    if body is None:
+        abort(404)
+    return json_response(body)
+
+
+AGING_COLUMNS = (
+    CustomerAging.current_amount,
+    CustomerAging.days_1_30,
+    CustomerAging.days_31_60,
+    CustomerAging.days_61_90,
+    CustomerAging.days_over_90,
+    CustomerAging.total_outstanding,
+    CustomerAging.open_invoices,
+    CustomerAging.as_of,
+)
+encode_aging = row_encoder((Customer.customer_id, *AGING_COLUMNS))
+
+
+@customers_bp.route("/customers/<customer_id>/aging")
+def customer_aging(customer_id):
+    # unique customer_id index + primary key of the materialized aging row, no invoice scan
+    row = db.session.execute(
+        select(Customer.customer_id, *AGING_COLUMNS)
+        .outerjoin(CustomerAging, CustomerAging.customer_fk_id == Customer.id)
+        .where(Customer.customer_id == customer_id)
+    ).first()
+    if row is None:
+        abort(404)
+    if row.as_of is None:
+        # no open balance, no aging row
+        return json_response({"customer_id": customer_id, "total_outstanding": "0.00", "open_invoices": 0})
+    return json_response(encode_aging(row))
@@ -1,7 +1,87 @@
-from flask import Blueprint, jsonify
+from time import perf_counter
+
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.instrumentation import query_stats
+from app.services.catalog_cache import catalog_cache
+from app.services.idempotency import idempotency
+from app.services.response_cache import response_cache
 
 health_bp = Blueprint("health", __name__)
 
+
+def pool_stats(pool):
+    '''Live numbers of a QueuePool. other pools (NullPool, sqlite pools) only report their class.'''
+    stats = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
 @health_bp.route("/health")
 def health():
     return jsonify(status="ok")
+
+
+@health_bp.route("/health/db")
+def health_db():
+    engine = db.engine
+    start = perf_counter()
+    try:
+        with engine.connect() as connection:
+            # time spent waiting for the pool to hand out a connection
+            wait_ms = (perf_counter() - start) * 1000
+            query_start = perf_counter()
+            connection.execute(text("SELECT 1"))
+            query_ms = (perf_counter() - query_start) * 1000
+    except SQLAlchemyError as exc:
+        return jsonify(
+            status="error", error=type(exc).__name__, **pool_stats(engine.pool)
+        ), 503
+
+    return jsonify(
+        status="ok",
+        wait_ms=round(wait_ms, 3),
+        query_ms=round(query_ms, 3),
+        **pool_stats(engine.pool),
+    )
+
+
+@health_bp.route("/health/catalog-cache")
+def health_catalog_cache():
+    return jsonify(status="ok", **catalog_cache.stats())
+
+
+@health_bp.route("/health/response-cache")
+def health_response_cache():
+    return jsonify(status="ok", **response_cache.stats())
+
+
+@health_bp.route("/health/idempotency")
+def health_idempotency():
+    return jsonify(status="ok", **idempotency.stats())
+
+
+QUERY_ORDERS = ("total_ms", "count", "max_ms", "mean_ms")
+
+
+@health_bp.route("/health/queries", methods=["GET", "DELETE"])
+def health_queries():
+    '''Latency histograms per statement fingerprint and per endpoint. DELETE resets them.'''
+    if request.method == "DELETE":
+        query_stats.reset()
+        return jsonify(status="ok")
+
+    order = request.args.get("order", "total_ms")
+    if order not in QUERY_ORDERS:
+        abort(400, description=f"order must be one of {', '.join(QUERY_ORDERS)}")
+    try:
+        top = int(request.args.get("top", 50))
+    except ValueError:
+        abort(400, description="top must be an integer")
+    return jsonify(status="ok", **query_stats.snapshot(top=top, order=order))
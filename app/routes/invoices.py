@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from flask import Blueprint, abort, request
+from sqlalchemy import select
+
+from app.extensions import db
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice
+from app.routes.listing import keyset_page, ndjson_response, page_args, page_response
+from app.services.idempotency import idempotent
+from app.services.invoice_ingest import bulk_create_invoices
+from app.services.read_api import invoice_detail
+from app.services.response_cache import INVOICE, response_cache
+
+invoices_bp = Blueprint("invoices", __name__)
+
+INVOICE_COLUMNS = (
+    Invoice.id,
+    Invoice.public_invoice_id,
+    Customer.customer_id,
+    Invoice.status,
+    Invoice.subtotal,
+    Invoice.tax_amount,
+    Invoice.shipping_amount,
+    Invoice.total_amount,
+    Invoice.outstanding_balance,
+    Invoice.invoice_date,
+    Invoice.invoice_due_date,
+    Invoice.date_fully_paid,
+)
+
+ORDERINGS = {"id": Invoice.id, "public_invoice_id": Invoice.public_invoice_id}
+
+
+def _invoice_query():
+    '''Invoice columns joined to the public customer id, filtered by ?customer= and ?status=.'''
+    query = select(*INVOICE_COLUMNS).join(Customer, Invoice.customer_fk_id == Customer.id)
+    if request.args.get("customer"):
+        query = query.where(Customer.customer_id == request.args["customer"])
+    if request.args.get("status"):
+        query = query.where(Invoice.status == request.args["status"])
+    return query
+
+
+@invoices_bp.route("/invoices")
+def list_invoices():
+    column, after, limit = page_args(ORDERINGS)
+    rows, next_after = keyset_page(_invoice_query(), column, after, limit)
+    return page_response(rows, next_after, INVOICE_COLUMNS)
+
+
+@invoices_bp.route("/invoices/export.ndjson")
+def export_invoices():
+    return ndjson_response(_invoice_query().order_by(Invoice.id), INVOICE_COLUMNS)
+
+
+@invoices_bp.route("/invoices/<public_invoice_id>")
+def get_invoice(public_invoice_id):
+    '''Invoice with items, taxes and payments, ETag and If-None-Match (app/services/response_cache.py).'''
+    return response_cache.respond(INVOICE, db.session, public_invoice_id)
+
+
+@invoices_bp.route("/invoices", methods=["POST"])
+@idempotent("invoices.create")
+def create_invoice():
+    '''One invoice payload as bulk_create_invoices() takes it, dates as ISO strings. honours Idempotency-Key.'''
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        abort(400, description="the body must be a JSON object")
+    for name in ("invoice_date", "invoice_due_date"):
+        if isinstance(payload.get(name), str):
+            try:
+                payload[name] = datetime.fromisoformat(payload[name])
+            except ValueError:
+                abort(400, description=f"{name} is not an ISO datetime")
+
+    result = bulk_create_invoices([payload], session=db.session, commit=False)
+    if result.duplicates:
+        return {"error": "public_invoice_id already exists"}, 409
+    if result.failures:
+        return {"error": result.failures[0].reason}, 422
+    return invoice_detail(db.session, result.created[0]), 201
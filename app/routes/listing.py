@@ -0,0 +1,53 @@
+'''
+Shared helpers for the list endpoints.
+
+keyset (seek) pagination: WHERE column > :after ORDER BY column LIMIT n
+the cost of a page does not grow with its depth, unlike OFFSET which scans every skipped row.
+the column must be unique and indexed (id, customer_id, public_invoice_id).
+
+rows are turned into JSON by the encoder compiled for their column tuple (app/serialization.py).
+'''
+
+from flask import Response, abort, request, stream_with_context
+
+from app.extensions import db
+from app.serialization import dumps, dumps_lines, row_encoder
+from app.services.read_api import keyset_page as _keyset_page, parse_page_args
+
+EXPORT_CHUNK = 1000
+
+
+def json_response(body, status=200):
+    return Response(dumps(body), status=status, mimetype="application/json")
+
+
+def page_args(orderings):
+    '''Read limit, order and after from the query string. orderings maps order name to column.'''
+    try:
+        return parse_page_args(request.args, orderings)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+
+
+def keyset_page(query, column, after, limit, session=None):
+    '''One page of rows after the cursor value, plus the cursor of the next page (None on the last page).'''
+    return _keyset_page(session or db.session, query, column, after, limit)
+
+
+def page_response(rows, next_after, columns):
+    '''A keyset page as JSON, rows encoded for select(*columns).'''
+    return json_response({"items": row_encoder(columns).dumpable(rows), "next_after": next_after})
+
+
+def ndjson_response(query, columns, session=None):
+    '''Stream every row of select(*columns) as one JSON object per line, from a server side cursor.'''
+    session = session or db.session
+    encoder = row_encoder(columns)
+
+    def generate():
+        # yield_per streams the result instead of buffering it, memory stays flat
+        result = session.execute(query.execution_options(yield_per=EXPORT_CHUNK))
+        for rows in result.partitions():
+            yield dumps_lines(encoder.dumpable(rows))
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
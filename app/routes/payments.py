@@ -0,0 +1,41 @@
+from flask import Blueprint, abort, request
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.invoice import Invoice
+from app.models.payments import Payment
+from app.serialization import row_encoder
+from app.services.idempotency import idempotent
+from app.services.payment_application import apply_payments
+
+payments_bp = Blueprint("payments", __name__)
+
+# the invoice the payment settled, as it is after the payment
+SETTLED_COLUMNS = (
+    Payment.public_payment_id,
+    Invoice.public_invoice_id,
+    Invoice.status,
+    Invoice.outstanding_balance,
+    Invoice.date_fully_paid,
+)
+
+
+@payments_bp.route("/payments", methods=["POST"])
+@idempotent("payments.create")
+def create_payment():
+    '''One payment payload as apply_payments() takes it. honours Idempotency-Key.'''
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        abort(400, description="the body must be a JSON object")
+
+    result = apply_payments([payload], session=db.session, commit=False)
+    if result.duplicates:
+        return {"error": "payment already recorded"}, 409
+    if result.failures:
+        return {"error": result.failures[0].reason}, 422
+    row = db.session.execute(
+        select(*SETTLED_COLUMNS)
+        .join(Invoice, Payment.invoice_fk_id == Invoice.id)
+        .where(Payment.public_payment_id == result.applied[0])
+    ).one()
+    return row_encoder(SETTLED_COLUMNS).encode(row), 201
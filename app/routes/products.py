@@ -0,0 +1,49 @@
+from flask import Blueprint, abort, request
+
+from app.extensions import db
+from app.routes.listing import json_response
+from app.services.product_search import search_products
+from app.services.read_api import product_page
+from app.services.response_cache import PRODUCT, response_cache
+
+products_bp = Blueprint("products", __name__)
+
+
+@products_bp.route("/products")
+def list_products():
+    '''Active products with their active variants, keyset paginated, ?category= ?brand=.'''
+    try:
+        return json_response(product_page(db.session, request.args))
+    except ValueError as exc:
+        abort(400, description=str(exc))
+
+
+ACTIVE_FILTERS = {"true": True, "false": False, "all": None}
+
+
+@products_bp.route("/products/search")
+def search():
+    '''Ranked full text search, ?q= ?color= ?size= ?active=true|false|all ?limit= ?offset=.'''
+    active = request.args.get("active", "true")
+    if active not in ACTIVE_FILTERS:
+        abort(400, description="active must be one of true, false, all")
+    try:
+        limit = int(request.args.get("limit", 20))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        abort(400, description="limit and offset must be integers")
+    try:
+        items = search_products(
+            db.session, request.args.get("q", ""), active=ACTIVE_FILTERS[active],
+            color=request.args.get("color") or None, size=request.args.get("size") or None,
+            limit=limit, offset=offset,
+        )
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return json_response({"items": items})
+
+
+@products_bp.route("/products/<public_product_id>")
+def get_product(public_product_id):
+    '''Product with all its variants, ETag and If-None-Match (app/services/response_cache.py).'''
+    return response_cache.respond(PRODUCT, db.session, public_product_id)
@@ -0,0 +1,227 @@
+'''
+JSON serialization of models and Core rows, compiled once per shape.
+
+the naive way, {attr.key: convert(getattr(obj, attr.key)) for attr in mapper.column_attrs},
+looks up every attribute by name and checks the type of every value, row after row.
+here the field list and the converter of each field are worked out once from the mapper
+(or from the columns of a select) and turned into one generated function per shape:
+
+- encoder_for(Invoice, include={"items": encoder_for(InvoiceItem)}): dicts of ORM instances.
+  loaded attributes are read straight from the instance __dict__, an unloaded one falls back
+  to plain attribute access (lazy load or refresh)
+- row_encoder(columns): dicts of Core rows by position, for select(*columns). no ORM instance
+  is built, the fastest way for lists and exports
+- converters by column type: Numeric -> str (exact, "12.50"), Money -> str of its decimal,
+  DateTime/Date/Time -> isoformat, enums (sqlalchemy Enum, or a String column annotated
+  with an Enum like Invoice.status: Mapped[InvoiceStatus]) -> value. the rest as is
+- dumps() / dumps_lines(): JSON bytes, with orjson when it is installed (pip install orjson),
+  else the standard library. encoder.many() emits JSON types only. encoder.dumpable() is for
+  dumps(): with orjson the datetimes stay datetimes, orjson writes the same text as isoformat()
+  at a fraction of the cost (isoformat is the most expensive conversion of an invoice row)
+
+python -m benchmarks.bench_serialization compares them with the naive way.
+'''
+
+from __future__ import annotations
+
+import json
+import sys
+import typing
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import Date, DateTime, Enum as SAEnum, Numeric, Time, inspect
+from sqlalchemy.types import TypeDecorator
+
+from app.money import Money, MoneyType
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(value: Any) -> bytes:
+    '''JSON bytes of dicts and lists made by the encoders.'''
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _json_encoder.encode(value).encode()
+
+
+def dumps_lines(values: Iterable[Any]) -> bytes:
+    '''NDJSON: one JSON document per line.'''
+    if orjson is not None:
+        return b''.join([orjson.dumps(value) + b'\n' for value in values])
+    encode = _json_encoder.encode
+    return ''.join([encode(value) + '\n' for value in values]).encode()
+
+
+def _isoformat(value) -> str:
+    return value.isoformat()
+
+
+def _enum_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def _money(value) -> str:
+    return str(value.to_decimal()) if isinstance(value, Money) else str(value)
+
+
+def _annotated_enum(cls, key) -> Optional[type]:
+    '''The Enum in the Mapped[...] annotation of cls.key, if any (string annotations included).'''
+    for klass in getattr(cls, '__mro__', ()):
+        annotation = vars(klass).get('__annotations__', {}).get(key)
+        if annotation is None:
+            continue
+        if isinstance(annotation, str):
+            try:
+                annotation = eval(annotation, vars(sys.modules[klass.__module__]))
+            except Exception:
+                return None
+        pending = [annotation]
+        while pending:
+            candidate = pending.pop()
+            if isinstance(candidate, type) and issubclass(candidate, Enum):
+                return candidate
+            pending.extend(typing.get_args(candidate))
+        return None
+    return None
+
+
+def converter_for(type_, cls=None, key=None, native=False) -> Optional[Callable]:
+    '''How to turn a value of the column type into JSON, None when it already is (or when orjson
+    formats it itself, native=True: datetime, date and time, same text as isoformat()).'''
+    if isinstance(type_, MoneyType):
+        return _money
+    if isinstance(type_, TypeDecorator):
+        type_ = type_.impl_instance
+    if isinstance(type_, SAEnum) or (cls is not None and _annotated_enum(cls, key) is not None):
+        return _enum_value
+    if isinstance(type_, Numeric):
+        return str if type_.asdecimal else None
+    if isinstance(type_, (DateTime, Date, Time)):
+        return None if native else _isoformat
+    return None
+
+
+def _compile(name: str, argument: str, fields: Sequence[tuple[str, str, Optional[Callable]]], prologue=()):
+    '''def name(argument): return {key: converter(expression), ..}, None passes through.'''
+    namespace: dict[str, Any] = {}
+    entries = []
+    for index, (key, expression, convert) in enumerate(fields):
+        if convert is None:
+            entries.append(f"        {key!r}: {expression},")
+        else:
+            namespace[f'_c{index}'] = convert
+            entries.append(f"        {key!r}: None if (_v{index} := {expression}) is None else _c{index}(_v{index}),")
+    source = '\n'.join([f"def {name}({argument}):", *prologue, "    return {", *entries, "    }"])
+    exec(compile(source, f"<serialization {name}>", 'exec'), namespace)
+    return namespace[name]
+
+
+class _Encoder:
+    '''encode() gives JSON types. dumpable() is for dumps(), datetimes are left to orjson when it is the backend.'''
+
+    encode: Callable
+    _native: Callable
+
+    def __call__(self, value) -> dict:
+        return self.encode(value)
+
+    def many(self, values: Iterable) -> list[dict]:
+        encode = self.encode
+        return [encode(value) for value in values]
+
+    def for_dumps(self) -> Callable:
+        return self._native if orjson is not None else self.encode
+
+    def dumpable(self, values: Iterable) -> list[dict]:
+        encode = self.for_dumps()
+        return [encode(value) for value in values]
+
+
+def _nested(encoder, uselist, native):
+    encode = encoder._native if native else encoder.encode
+    if uselist:
+        return lambda values: [encode(value) for value in values]
+    return encode
+
+
+class ModelEncoder(_Encoder):
+    '''Encoder of one model: its column attributes, minus exclude, plus the relationships in include.'''
+
+    def __init__(self, model, fields=None, exclude=(), include: Optional[Mapping[str, 'ModelEncoder']] = None):
+        mapper = inspect(model)
+        self.model = model
+        self._columns = [
+            attr for attr in mapper.column_attrs
+            if (fields is None or attr.key in fields) and attr.key not in exclude
+        ]
+        self._include = {key: (encoder, mapper.relationships[key].uselist) for key, encoder in (include or {}).items()}
+        self.keys = [attr.key for attr in self._columns] + list(self._include)
+        self.encode = self._build(mapper, native=False)
+        self._native = self._build(mapper, native=True)
+
+    def _build(self, mapper, native):
+        converters = [
+            (attr.key, converter_for(attr.columns[0].type, mapper.class_, attr.key, native))
+            for attr in self._columns
+        ]
+        converters += [(key, _nested(encoder, uselist, native)) for key, (encoder, uselist) in self._include.items()]
+
+        name = f"encode_{mapper.class_.__name__}"
+        fast_encode = _compile(
+            name, 'obj', [(key, f"d[{key!r}]", convert) for key, convert in converters],
+            prologue=["    d = obj.__dict__"],
+        )
+        slow_encode = _compile(name, 'obj', [(key, f"obj.{key}", convert) for key, convert in converters])
+
+        def encode(obj):
+            try:
+                return fast_encode(obj)
+            except KeyError:  # an attribute is not loaded, attribute access loads it
+                return slow_encode(obj)
+
+        return encode
+
+
+@lru_cache(maxsize=None)
+def _cached_model_encoder(model, fields, exclude, include):
+    return ModelEncoder(model, fields, exclude, dict(include) if include else None)
+
+
+def encoder_for(model, fields=None, exclude=(), include=None) -> ModelEncoder:
+    '''Compiled encoder of model, one per distinct set of arguments.'''
+    return _cached_model_encoder(
+        model,
+        tuple(fields) if fields is not None else None,
+        tuple(exclude),
+        tuple(include.items()) if include else None,
+    )
+
+
+class RowEncoder(_Encoder):
+    '''Encoder of the rows of select(*columns): row[i] under the key of column i.'''
+
+    def __init__(self, columns):
+        self.keys = [getattr(column, 'key', None) or column.name for column in columns]
+        self.encode = self._build(columns, native=False)
+        self._native = self._build(columns, native=True)
+
+    def _build(self, columns, native):
+        return _compile('encode_row', 'row', [
+            (key, f"row[{index}]", converter_for(column.type, getattr(column, 'class_', None), key, native))
+            for index, (key, column) in enumerate(zip(self.keys, columns))
+        ])
+
+
+@lru_cache(maxsize=256)
+def row_encoder(columns: tuple) -> RowEncoder:
+    '''Compiled encoder of the rows of select(*columns), cached by the columns tuple.'''
+    return RowEncoder(columns)
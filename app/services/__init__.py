@@ -0,0 +1,26 @@
+from app.services.invoice_ingest import (
+    bulk_create_invoices,
+    BulkInvoiceResult,
+    InvoicePayloadError,
+    RowFailure,
+)
+from app.services.invoice_totals import recalculate_totals, refresh_balances
+from app.services.payment_application import (
+    apply_payments,
+    PaymentApplicationResult,
+    PaymentFailure,
+    PaymentPayloadError,
+)
+
+__all__ = [
+    'bulk_create_invoices',
+    'BulkInvoiceResult',
+    'InvoicePayloadError',
+    'RowFailure',
+    'recalculate_totals',
+    'refresh_balances',
+    'apply_payments',
+    'PaymentApplicationResult',
+    'PaymentFailure',
+    'PaymentPayloadError',
+]
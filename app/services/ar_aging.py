@@ -0,0 +1,131 @@
+'''
+Accounts receivable aging summary, materialized in customer_ar_aging.
+
+- refresh_aging(): recompute the rows of some customers with one INSERT .. SELECT
+- rebuild_aging(): recompute every customer (flask aging rebuild). buckets move with the
+  calendar, so run it once a day (cron) next to the incremental refresh
+- Invoice and Payment changes flushed through db.session refresh their customers in the
+  same transaction (session events below). bulk writers that bypass the unit of work
+  (ingestion, the totals engine) call refresh_aging() themselves
+'''
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import chain
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, event, func, insert, inspect, literal, select
+
+from app.db_routing import RoutingSession
+from app.extensions import db
+from app.models.aging import CustomerAging
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payments import Payment
+
+OPEN_STATUSES = (InvoiceStatus.pending.value, InvoiceStatus.overdue.value)
+CHUNK_SIZE = 1000
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def aging_select(as_of: date):
+    '''customer_fk_id and bucket sums of the open invoices, grouped by customer.'''
+    def days_ago(days):
+        return datetime.combine(as_of - timedelta(days=days), time.min)
+
+    due = Invoice.invoice_due_date
+    balance = Invoice.outstanding_balance
+
+    def bucket(condition):
+        return func.coalesce(func.sum(case((condition, balance), else_=0)), 0)
+
+    now = datetime.now(timezone.utc)
+    return (
+        select(
+            Invoice.customer_fk_id,
+            bucket(due >= days_ago(0)),
+            bucket((due < days_ago(0)) & (due >= days_ago(30))),
+            bucket((due < days_ago(30)) & (due >= days_ago(60))),
+            bucket((due < days_ago(60)) & (due >= days_ago(90))),
+            bucket(due < days_ago(90)),
+            func.sum(balance),
+            func.count(),
+            literal(as_of),
+            literal(now),
+            literal(now),
+        )
+        .where(Invoice.status.in_(OPEN_STATUSES), balance > 0)
+        .group_by(Invoice.customer_fk_id)
+    )
+
+
+_AGING_COLUMNS = [
+    'customer_fk_id', 'current_amount', 'days_1_30', 'days_31_60', 'days_61_90',
+    'days_over_90', 'total_outstanding', 'open_invoices', 'as_of', 'created', 'updated',
+]
+
+
+def _refresh(connection, customer_ids: Optional[list[int]], as_of: date) -> None:
+    table = CustomerAging.__table__
+    source = aging_select(as_of)
+    if customer_ids is None:
+        connection.execute(delete(table))
+    else:
+        connection.execute(delete(table).where(table.c.customer_fk_id.in_(customer_ids)))
+        source = source.where(Invoice.customer_fk_id.in_(customer_ids))
+    connection.execute(insert(table).from_select(_AGING_COLUMNS, source))
+
+
+def refresh_aging(session=None, customer_ids: Iterable[int] = (), as_of: Optional[date] = None) -> None:
+    '''Recompute the aging rows of the given customers inside the current transaction.'''
+    session = session or db.session
+    ids = sorted({customer_id for customer_id in customer_ids if customer_id is not None})
+    connection = session.connection()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        _refresh(connection, ids[start:start + CHUNK_SIZE], as_of or today())
+
+
+def rebuild_aging(session=None, as_of: Optional[date] = None, commit: bool = True) -> int:
+    '''Recompute the whole table in one pass. returns the number of customers with an open balance.'''
+    session = session or db.session
+    _refresh(session.connection(), None, as_of or today())
+    count = session.scalar(select(func.count()).select_from(CustomerAging))
+    if commit:
+        session.commit()
+    return count
+
+
+def get_customer_aging(customer_fk_id: int, session=None) -> Optional[CustomerAging]:
+    '''Aging of one customer, None when nothing is outstanding.'''
+    session = session or db.session
+    return session.get(CustomerAging, customer_fk_id)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changes(session, flush_context):
+    '''Remember which customers the flushed invoices and payments belong to.'''
+    customers = session.info.setdefault('aging_customers', set())
+    invoices = session.info.setdefault('aging_invoices', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Invoice):
+            customers.add(obj.customer_fk_id)
+            # an invoice moved to another customer changes the old customer too
+            customers.update(inspect(obj).attrs.customer_fk_id.history.deleted or ())
+        elif isinstance(obj, Payment):
+            invoices.add(obj.invoice_fk_id)
+
+
+@event.listens_for(RoutingSession, "after_flush_postexec")
+def _refresh_changes(session, flush_context):
+    customers = session.info.pop('aging_customers', set())
+    invoices = session.info.pop('aging_invoices', set())
+    invoices.discard(None)
+    if invoices:
+        customers.update(session.connection().scalars(
+            select(Invoice.customer_fk_id).where(Invoice.id.in_(invoices))
+        ))
+    if customers:
+        refresh_aging(session, customers)
@@ -0,0 +1,530 @@
+'''
+Streaming import of customers and products from CSV or NDJSON files.
+
+the file goes through a generator pipeline, one row at a time:
+
+read -> validate -> chunk -> dedupe -> write
+
+- memory is bounded by chunk_size, the file is never loaded whole
+- rows are upserted on their natural key (customers.customer_id, products.sku):
+  INSERT .. ON DUPLICATE KEY UPDATE on mysql, INSERT .. ON CONFLICT DO UPDATE on sqlite,
+  so re-running a file updates instead of failing
+- dedupe: rows repeating a key inside a chunk are merged (last one wins, product variants
+  accumulate). a product whose product_name, url or public_product_id already belongs to
+  another sku is rejected. mysql would otherwise upsert into that other row
+- variants are matched on (product, color, size) and updated or inserted
+- one transaction per chunk. the last file row of a committed chunk is stored in
+  job_checkpoints, a stopped run resumes after it. a finished run resets the checkpoint
+- rejected rows go to a rejects file as NDJSON {"line", "reason", "row"}. at most chunk_size
+  of them are held in memory, a file of bad rows commits its checkpoint every chunk_size rejects
+- the checkpoint is keyed by the file's resolved path, two files of the same name in
+  different directories do not share a position
+
+product CSV files hold one row per variant (color, size, price, inventory_stock columns),
+NDJSON product records may carry a "variants" list instead.
+'''
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.jobs import JobCheckpoint
+from app.models.products import Product, ProductVariant
+from app.services.catalog_cache import invalidate_products
+
+CENTS = Decimal('0.01')
+KINDS = ('customers', 'products')
+FORMATS = ('csv', 'ndjson')
+
+CUSTOMER_FIELDS = {
+    # name: (max length, required)
+    'customer_id': (50, True),
+    'customer_name': (100, True),
+    'customer_address': (None, True),
+    'customer_email': (200, False),
+    'customer_phone': (50, False),
+    'additional_notes': (None, False),
+}
+PRODUCT_FIELDS = {
+    'public_product_id': (50, False),
+    'product_name': (200, True),
+    'sku': (200, True),
+    'brand': (200, True),
+    'product_category': (200, True),
+    'product_description': (None, True),
+    'url': (760, False),
+    'url_tag': (100, False),
+    'additional_notes': (None, False),
+}
+VARIANT_FIELDS = ('color', 'size', 'price', 'inventory_stock')
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+
+class ImportRowError(ValueError):
+    '''Raised when a single import row is rejected.'''
+
+
+@dataclass
+class StageStats:
+    name: str
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    rows_written: int = 0 # rows upserted, after merging repeated keys
+    rejected: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    completed: bool = False
+    position: int = 0 # last file row covered
+    stages: list[StageStats] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class _Reject:
+    line: int
+    reason: str
+    row: dict[str, Any]
+
+
+# read
+
+def detect_format(path: str) -> str:
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_rows(path: str, fmt: str, start_after: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+    '''(file row number, raw record) for every data row after start_after. rows count from 1.'''
+    with open(path, newline='') as handle:
+        if fmt == 'csv':
+            records: Iterable[Any] = csv.DictReader(handle)
+        else:
+            records = (line for line in handle if line.strip())
+        for line, record in enumerate(records, start=1):
+            if line <= start_after:
+                continue
+            if fmt == 'ndjson':
+                try:
+                    record = json.loads(record)
+                except ValueError as exc:
+                    record = {'_error': f"invalid json: {exc}", '_raw': record}
+                if not isinstance(record, dict):
+                    record = {'_error': "not a json object", '_raw': record}
+            yield line, record
+
+
+# validate
+
+def _text(record: dict[str, Any], name: str, max_length: Optional[int], required: bool) -> Optional[str]:
+    value = record.get(name)
+    if value is None or (isinstance(value, str) and value.strip() == ''):
+        if required:
+            raise ImportRowError(f"missing required field {name!r}")
+        return None
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise ImportRowError(f"{name} longer than {max_length} characters")
+    return value
+
+
+def _bool(value: Any, name: str, default: bool) -> bool:
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ImportRowError(f"{name} is not a boolean: {value!r}")
+
+
+def _variant(record: dict[str, Any]) -> dict[str, Any]:
+    try:
+        price = Decimal(str(record.get('price'))).quantize(CENTS, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError) as exc:
+        raise ImportRowError(f"price is not a valid amount: {record.get('price')!r}") from exc
+    if not price.is_finite() or price < 0:
+        raise ImportRowError(f"price must not be negative: {price}")
+    stock = record.get('inventory_stock')
+    try:
+        stock = int(stock) if stock not in (None, '') else 0
+    except (TypeError, ValueError) as exc:
+        raise ImportRowError(f"inventory_stock is not an integer: {stock!r}") from exc
+    if stock < 0:
+        raise ImportRowError(f"inventory_stock must not be negative: {stock}")
+    return {
+        'color': _text(record, 'color', 100, False),
+        'size': _text(record, 'size', 100, False),
+        'price': price,
+        'inventory_stock': stock,
+        'has_stock': stock > 0,
+        'is_active': _bool(record.get('variant_is_active', record.get('is_active')), 'is_active', True),
+    }
+
+
+def clean_customer(record: dict[str, Any]) -> dict[str, Any]:
+    row = {name: _text(record, name, *spec) for name, spec in CUSTOMER_FIELDS.items()}
+    if row['customer_email'] is not None and '@' not in row['customer_email']:
+        raise ImportRowError(f"customer_email is not an email address: {row['customer_email']!r}")
+    return row
+
+
+def clean_product(record: dict[str, Any]) -> dict[str, Any]:
+    row = {name: _text(record, name, *spec) for name, spec in PRODUCT_FIELDS.items()}
+    row['is_active'] = _bool(record.get('is_active'), 'is_active', True)
+    if isinstance(record.get('variants'), list):
+        variants = [_variant(variant) for variant in record['variants']]
+    elif any(record.get(name) not in (None, '') for name in VARIANT_FIELDS):
+        variants = [_variant(record)]
+    else:
+        variants = []
+    row['variants'] = variants
+    return row
+
+
+CLEANERS = {'customers': clean_customer, 'products': clean_product}
+
+
+# yielded by validate_rows() when rejects is full, chunked() ends the chunk early
+FLUSH = object()
+
+
+def validate_rows(kind, rows, rejects: list[_Reject], limit: Optional[int] = None) -> Iterator[Any]:
+    '''Clean rows pass through, bad ones are appended to rejects. FLUSH once limit rejects are held.'''
+    clean = CLEANERS[kind]
+    for line, record in rows:
+        try:
+            if '_error' in record:
+                raise ImportRowError(record['_error'])
+            yield line, clean(record)
+        except ImportRowError as exc:
+            rejects.append(_Reject(line, str(exc), record))
+            if limit is not None and len(rejects) >= limit:
+                yield FLUSH
+
+
+def chunked(rows: Iterator[Any], chunk_size: int) -> Iterator[list[Any]]:
+    '''Lists of up to chunk_size rows. FLUSH ends a chunk early, the chunk may be empty.'''
+    chunk = []
+    for row in rows:
+        if row is FLUSH:
+            yield chunk
+            chunk = []
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# dedupe
+
+def _dedupe_customers(session, chunk) -> list[dict[str, Any]]:
+    merged: dict[str, dict[str, Any]] = {}
+    for line, row in chunk:
+        merged[row['customer_id']] = dict(row, _line=line) # last one wins
+    return list(merged.values())
+
+
+def _dedupe_products(session, chunk, rejects: list[_Reject]) -> list[dict[str, Any]]:
+    merged: dict[str, dict[str, Any]] = {}
+    for line, row in chunk:
+        previous = merged.pop(row['sku'], None)
+        if previous is not None:
+            # one csv row per variant: keep every variant, product columns from the last row
+            row['variants'] = previous['variants'] + row['variants']
+            row['public_product_id'] = row['public_product_id'] or previous['public_product_id']
+        row['_line'] = line
+        merged[row['sku']] = row
+
+    # the other unique keys must not belong to a different sku, in the chunk or in the table
+    owners: dict[tuple[str, str], str] = {}
+    names = {row['product_name'] for row in merged.values()}
+    urls = {row['url'] for row in merged.values() if row['url']}
+    public_ids = {row['public_product_id'] for row in merged.values() if row['public_product_id']}
+    for sku, name, url, public_id in session.execute(
+        select(Product.sku, Product.product_name, Product.url, Product.public_product_id).where(
+            or_(
+                Product.product_name.in_(names),
+                Product.url.in_(urls),
+                Product.public_product_id.in_(public_ids),
+            )
+        )
+    ):
+        owners[('product_name', name)] = sku
+        if url:
+            owners[('url', url)] = sku
+        owners[('public_product_id', public_id)] = sku
+
+    rows = []
+    for row in merged.values():
+        keys = [('product_name', row['product_name'])]
+        if row['url']:
+            keys.append(('url', row['url']))
+        if row['public_product_id']:
+            keys.append(('public_product_id', row['public_product_id']))
+        taken = [key for key in keys if owners.get(key, row['sku']) != row['sku']]
+        if taken:
+            name, value = taken[0]
+            rejects.append(_Reject(
+                row['_line'], f"{name} {value!r} already belongs to sku {owners[taken[0]]!r}",
+                _columns(row),
+            ))
+            continue
+        for key in keys:
+            owners[key] = row['sku']
+        rows.append(row)
+    return rows
+
+
+# write
+
+def _upsert(session, table, rows: list[dict[str, Any]], key: str, keep: Iterable[str] = ()) -> None:
+    '''executemany INSERT that updates every column but key, keep and created on a key conflict.'''
+    if not rows:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [dict(row, updated=now) for row in rows]
+    skip = {key, 'created', *keep}
+    columns = [name for name in rows[0] if name not in skip]
+
+    dialect = session.get_bind(clause=insert(table)).dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(table)
+        statement = statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in columns}
+        )
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={name: statement.excluded[name] for name in columns},
+        )
+    else:
+        raise RuntimeError(f"no upsert for dialect {dialect!r}, imports need mysql or sqlite")
+    session.execute(statement, rows)
+
+
+def _columns(row: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in row.items() if k not in ('variants', '_line')}
+
+
+def _write_customers(session, rows: list[dict[str, Any]]) -> None:
+    _upsert(session, Customer.__table__, [_columns(row) for row in rows], 'customer_id')
+
+
+def _variant_key(product_id: int, variant: dict[str, Any]) -> tuple:
+    return (product_id, variant['color'] or '', variant['size'] or '')
+
+
+def _write_products(session, rows: list[dict[str, Any]]) -> None:
+    products = []
+    for row in rows:
+        product = _columns(row)
+        # new products need a public id, existing ones keep theirs (not part of the update set)
+        product['public_product_id'] = product['public_product_id'] or uuid.uuid4().hex
+        products.append(product)
+    _upsert(session, Product.__table__, products, 'sku', keep=('public_product_id',))
+
+    product_ids = dict(session.execute(
+        select(Product.sku, Product.id).where(Product.sku.in_([row['sku'] for row in rows]))
+    ).all())
+
+    variants: dict[tuple, dict[str, Any]] = {}
+    for row in rows:
+        for variant in row['variants']:
+            product_id = product_ids[row['sku']]
+            variants[_variant_key(product_id, variant)] = dict(variant, product_fk_id=product_id)
+    if variants:
+        existing = {
+            _variant_key(product_id, {'color': color, 'size': size}): variant_id
+            for variant_id, product_id, color, size in session.execute(
+                select(
+                    ProductVariant.id, ProductVariant.product_fk_id,
+                    ProductVariant.color, ProductVariant.size,
+                ).where(ProductVariant.product_fk_id.in_({key[0] for key in variants}))
+            )
+        }
+        updates = [
+            dict(variant, id=existing[key]) for key, variant in variants.items() if key in existing
+        ]
+        inserts = [variant for key, variant in variants.items() if key not in existing]
+        if updates:
+            session.execute(update(ProductVariant), updates)
+        if inserts:
+            session.execute(insert(ProductVariant), inserts)
+
+    # bulk statements skip the flush events, drop the cached catalog entries here
+    invalidate_products(session, product_ids.values())
+
+
+WRITERS = {'customers': _write_customers, 'products': _write_products}
+
+
+def checkpoint_name(kind: str, path: str) -> str:
+    '''One checkpoint per file. long paths are hashed to fit job_checkpoints.name.'''
+    source = os.path.realpath(path)
+    name = f"import:{kind}:{source}"
+    if len(name) > 100:
+        name = f"import:{kind}:{hashlib.blake2b(source.encode(), digest_size=32).hexdigest()}"
+    return name
+
+
+def _checkpoint(session, name: str) -> JobCheckpoint:
+    checkpoint = session.get(JobCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=name, position=0)
+        session.add(checkpoint)
+    return checkpoint
+
+
+def _metered(rows: Iterator[Any], stage: StageStats) -> Iterator[Any]:
+    '''count the rows and the time spent producing them (including upstream stages).'''
+    rows = iter(rows)
+    while True:
+        started = perf_counter()
+        try:
+            row = next(rows)
+        except StopIteration:
+            stage.seconds += perf_counter() - started
+            return
+        stage.seconds += perf_counter() - started
+        if row is not FLUSH:
+            stage.rows += 1
+        yield row
+
+
+def _write_chunk(session, kind: str, rows: list[dict[str, Any]], rejects: list[_Reject]) -> int:
+    writer = WRITERS[kind]
+    try:
+        with session.begin_nested():
+            writer(session, rows)
+        return len(rows)
+    except IntegrityError:
+        # a row the dedupe stage could not see (e.g. a concurrent import), retry one by one
+        written = 0
+        for row in rows:
+            try:
+                with session.begin_nested():
+                    writer(session, [row])
+                written += 1
+            except IntegrityError as exc:
+                rejects.append(_Reject(row['_line'], str(exc.orig), _columns(row)))
+        return written
+
+
+def import_file(
+    kind: str,
+    path: str,
+    fmt: Optional[str] = None,
+    rejects_path: Optional[str] = None,
+    chunk_size: int = 1000,
+    restart: bool = False,
+    session=None,
+) -> ImportReport:
+    '''
+    Import customers or products from path (csv or ndjson, guessed from the extension).
+
+    Resumes after the row stored in the file's checkpoint unless restart is set.
+    Rejected rows are written to rejects_path (default: path + '.rejects.ndjson').
+    '''
+    if kind not in KINDS:
+        raise ValueError(f"unknown import kind {kind!r}, expected one of {KINDS}")
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {FORMATS}")
+    session = session or db.session
+    rejects_path = rejects_path or f"{path}.rejects.ndjson"
+    started = perf_counter()
+
+    checkpoint = _checkpoint(session, checkpoint_name(kind, path))
+    if restart:
+        checkpoint.position = 0
+    session.commit()
+    report = ImportReport(position=checkpoint.position)
+
+    read, validate = StageStats('read'), StageStats('validate')
+    dedupe, write = StageStats('dedupe'), StageStats('write')
+    report.stages = [read, validate, dedupe, write]
+
+    rejects: list[_Reject] = []
+    rows = _metered(read_rows(path, fmt, checkpoint.position), read)
+    rows = _metered(validate_rows(kind, rows, rejects, limit=chunk_size), validate)
+
+    # append when resuming, rejects of committed chunks are already in the file
+    with open(rejects_path, 'a' if checkpoint.position else 'w') as rejects_file:
+        for chunk in chunked(rows, chunk_size):
+            clock = perf_counter()
+            if kind == 'products':
+                ready = _dedupe_products(session, chunk, rejects)
+            else:
+                ready = _dedupe_customers(session, chunk)
+            dedupe.seconds += perf_counter() - clock
+            dedupe.rows += len(chunk)
+
+            clock = perf_counter()
+            report.rows_written += _write_chunk(session, kind, ready, rejects)
+            # rows rejected at the end of the file may come after the last valid row,
+            # a chunk ended by FLUSH may hold rejects only
+            checkpoint.position = max([
+                checkpoint.position, *(line for line, _ in chunk[-1:]), *(reject.line for reject in rejects),
+            ])
+            session.commit()
+            write.seconds += perf_counter() - clock
+            write.rows += len(ready)
+
+            report.chunks += 1
+            report.position = checkpoint.position
+            _flush_rejects(rejects_file, rejects, report)
+
+        _flush_rejects(rejects_file, rejects, report)
+
+    # validate is timed including the read stage, keep only its own time
+    validate.seconds = max(validate.seconds - read.seconds, 0.0)
+    report.rows_read = read.rows
+    report.completed = True
+    checkpoint.position = 0
+    session.commit()
+    report.seconds = perf_counter() - started
+    return report
+
+
+def _flush_rejects(rejects_file, rejects: list[_Reject], report: ImportReport) -> None:
+    for reject in sorted(rejects, key=lambda reject: reject.line):
+        rejects_file.write(json.dumps(
+            {'line': reject.line, 'reason': reject.reason, 'row': reject.row}, default=str
+        ) + '\n')
+    report.rejected += len(rejects)
+    rejects.clear()
@@ -0,0 +1,225 @@
+'''
+In-process product catalog cache.
+
+- size bounded LRU with a TTL, one entry per product, reachable by public_product_id and sku
+- entries are immutable snapshots (frozen dataclasses), never live ORM instances,
+  so they are safe to share between requests and threads
+- Product/ProductVariant changes flushed through db.session invalidate the product on
+  flush and again on commit or rollback. reads of a changed product are not cached until
+  its transaction ends, they may see uncommitted rows. bulk writers that bypass the unit of work call
+  invalidate_products() themselves
+- stats() returns hit/miss/eviction counters to size CATALOG_CACHE_SIZE and CATALOG_CACHE_TTL
+'''
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import chain
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, select
+
+from app.db_routing import RoutingSession
+from app.extensions import db
+from app.models.products import Product, ProductVariant
+
+
+@dataclass(frozen=True, slots=True)
+class VariantSnapshot:
+    id: int
+    color: Optional[str]
+    size: Optional[str]
+    price: Decimal
+    has_stock: bool
+    inventory_stock: int
+    is_active: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ProductSnapshot:
+    id: int
+    public_product_id: str
+    sku: str
+    product_name: str
+    brand: str
+    product_category: str
+    is_active: bool
+    variants: tuple[VariantSnapshot, ...]
+
+
+_PRODUCT_COLUMNS = (
+    Product.id, Product.public_product_id, Product.sku, Product.product_name,
+    Product.brand, Product.product_category, Product.is_active,
+)
+_VARIANT_COLUMNS = (
+    ProductVariant.id, ProductVariant.color, ProductVariant.size, ProductVariant.price,
+    ProductVariant.has_stock, ProductVariant.inventory_stock, ProductVariant.is_active,
+)
+
+
+def load_snapshot(session, column, value) -> Optional[ProductSnapshot]:
+    product = session.execute(select(*_PRODUCT_COLUMNS).where(column == value)).first()
+    if product is None:
+        return None
+    variants = session.execute(
+        select(*_VARIANT_COLUMNS)
+        .where(ProductVariant.product_fk_id == product.id)
+        .order_by(ProductVariant.id)
+    ).all()
+    return ProductSnapshot(*product, variants=tuple(VariantSnapshot(*row) for row in variants))
+
+
+class CatalogCache:
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, ProductSnapshot]] = OrderedDict()
+        self._keys: dict[tuple[str, str], int] = {}
+        # bumped on every invalidation, a load that raced one is not stored
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def configure(self, maxsize: int, ttl: float) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._evict()
+
+    def get_by_public_id(self, public_product_id: str, session=None) -> Optional[ProductSnapshot]:
+        return self._get('public_product_id', public_product_id, Product.public_product_id, session)
+
+    def get_by_sku(self, sku: str, session=None) -> Optional[ProductSnapshot]:
+        return self._get('sku', sku, Product.sku, session)
+
+    def _get(self, kind, value, column, session):
+        with self._lock:
+            product_id = self._keys.get((kind, value))
+            entry = self._entries.get(product_id) if product_id is not None else None
+            if entry is not None:
+                expires, snapshot = entry
+                if expires > self._clock():
+                    self._entries.move_to_end(product_id)
+                    self.hits += 1
+                    return snapshot
+                self.expirations += 1
+                self._drop(product_id)
+            self.misses += 1
+            generation = self._generation
+
+        session = session or db.session
+        snapshot = load_snapshot(session, column, value)
+        # a product this transaction changed may still roll back, it is not shared
+        if snapshot is not None and snapshot.id not in session.info.get('catalog_products', ()):
+            with self._lock:
+                if generation == self._generation:
+                    self._store(snapshot)
+        return snapshot
+
+    def _store(self, snapshot: ProductSnapshot) -> None:
+        self._drop(snapshot.id)
+        self._entries[snapshot.id] = (self._clock() + self.ttl, snapshot)
+        self._keys[('public_product_id', snapshot.public_product_id)] = snapshot.id
+        self._keys[('sku', snapshot.sku)] = snapshot.id
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.maxsize:
+            product_id = next(iter(self._entries))
+            self._drop(product_id)
+            self.evictions += 1
+
+    def _drop(self, product_id: int) -> bool:
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return False
+        snapshot = entry[1]
+        self._keys.pop(('public_product_id', snapshot.public_product_id), None)
+        self._keys.pop(('sku', snapshot.sku), None)
+        return True
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                if self._drop(product_id):
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+def init_catalog_cache(app) -> None:
+    catalog_cache.configure(
+        maxsize=app.config.get('CATALOG_CACHE_SIZE', 10000),
+        ttl=app.config.get('CATALOG_CACHE_TTL', 300.0),
+    )
+
+
+def _changed_product_ids(session) -> set[int]:
+    product_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Product):
+            product_ids.add(obj.id)
+        elif isinstance(obj, ProductVariant):
+            product_ids.add(obj.product_fk_id)
+            # a variant moved to another product changes the old product too
+            product_ids.update(inspect(obj).attrs.product_fk_id.history.deleted or ())
+    product_ids.discard(None)
+    return product_ids
+
+
+def invalidate_products(session, product_ids: Iterable[int]) -> None:
+    '''Drop products changed in the session's transaction, now and again when it commits.'''
+    product_ids = set(product_ids)
+    if product_ids:
+        # now so this transaction does not read its own stale entry,
+        # on commit in case another thread cached the old row meanwhile
+        catalog_cache.invalidate(product_ids)
+        session.info.setdefault('catalog_products', set()).update(product_ids)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _invalidate_on_flush(session, flush_context):
+    invalidate_products(session, _changed_product_ids(session))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_on_commit(session):
+    product_ids = session.info.pop('catalog_products', None)
+    if product_ids:
+        catalog_cache.invalidate(product_ids)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _invalidate_on_rollback(session):
+    # another thread may have cached the row while it was flushed but not committed
+    product_ids = session.info.pop('catalog_products', None)
+    if product_ids:
+        catalog_cache.invalidate(product_ids)
@@ -0,0 +1,330 @@
+'''
+Idempotency keys for the write endpoints (POST /invoices, POST /payments).
+
+a client that retries a write sends the same Idempotency-Key header. the first request
+with a key runs, every later one gets its response back without running the write again,
+with Idempotent-Replayed: true. no key, no deduplication.
+
+- idempotency_keys (app/models/idempotency.py) holds one row per (scope, key): the hash of
+  the request body and, once done, the status and body of the response. a key reused with
+  another body gets 422
+- the first request claims the key by inserting the row in progress and committing it. the
+  write and the stored response then commit together in the request's transaction, a
+  crash in between leaves neither and the claim runs out after IDEMPOTENCY_LOCK_TIMEOUT
+- concurrent duplicates: in one process they queue on a per key lock and replay what the
+  first one stored. another process that loses the insert polls the row for up to
+  IDEMPOTENCY_WAIT seconds, then gets 409 with Retry-After
+- 2xx and 4xx responses are stored, abort(4xx) in the view included (as {"error": description}).
+  a 5xx or any other exception releases the key so a retry runs
+- completed responses are also kept in a front store (LRUStore in process, or SharedStore,
+  app/services/response_cache.py), a replay usually does not touch the database
+- rows expire after IDEMPOTENCY_TTL, purge_expired() deletes them (flask idempotency purge)
+'''
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import Response, abort, request
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+
+from app.extensions import db
+from app.models.idempotency import IdempotencyKey
+from app.serialization import dumps
+from app.services.response_cache import LRUStore, make_store
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+POLL_INTERVAL = 0.05
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def request_hash() -> str:
+    '''Hash of the method, path and body. JSON bodies are compared by content, not by layout.'''
+    payload = request.get_json(silent=True)
+    body = json.dumps(payload, sort_keys=True).encode() if payload is not None else request.get_data()
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.method.encode(), request.path.encode(), body):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _pack(status: int, body: bytes, expires: datetime) -> bytes:
+    return f"{status} {expires.replace(tzinfo=timezone.utc).timestamp()}\n".encode() + body
+
+
+def _unpack(data: bytes) -> tuple[int, bytes, datetime]:
+    head, _, body = data.partition(b'\n')
+    status, expires = head.split()
+    return int(status), body, datetime.fromtimestamp(float(expires), timezone.utc).replace(tzinfo=None)
+
+
+class _SingleFlight:
+    '''One lock per key, held by the request running it, dropped when nobody waits on it.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: dict[str, list] = {} # key -> [lock, holders and waiters]
+
+    @contextmanager
+    def __call__(self, key: str):
+        with self._lock:
+            entry = self._keys.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._keys[key]
+
+
+class IdempotencyStore:
+    def __init__(self, store=None, ttl: float = 86400.0, lock_timeout: float = 60.0, wait: float = 5.0):
+        self.store = store if store is not None else LRUStore()
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait = wait
+        self._flight = _SingleFlight()
+        self._lock = threading.Lock()
+        self.executed = self.replayed = self.replayed_from_db = self.conflicts = self.released = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def run(self, scope: str, session, handler: Callable[[], tuple[dict, int]]) -> Response:
+        '''Run handler() once per Idempotency-Key of scope and commit, or replay its stored response.'''
+        key = request.headers.get(HEADER)
+        if key is None:
+            return self._execute(session, handler, None)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            abort(400, description=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+        fingerprint = request_hash()
+        cache_key = f"{scope}:{key}"
+
+        replay = self._cached(cache_key, fingerprint)
+        if replay is not None:
+            return replay
+        with self._flight(cache_key):
+            # the request this one waited for may have stored the response
+            replay = self._cached(cache_key, fingerprint)
+            if replay is not None:
+                return replay
+            replay = self._claim(session, scope, key, fingerprint, cache_key)
+            if replay is not None:
+                return replay
+            return self._execute(session, handler, (scope, key, fingerprint, cache_key))
+
+    def _cached(self, cache_key: str, fingerprint: str) -> Optional[Response]:
+        entry = self.store.get(cache_key)
+        if entry is None:
+            return None
+        stored_hash, data = entry
+        status, body, expires = _unpack(data)
+        if expires <= _now():
+            return None
+        if stored_hash != fingerprint:
+            abort(422, description=f"{HEADER} was used with another request")
+        self._count('replayed')
+        return _response(body, status, replayed=True)
+
+    def _claim(self, session, scope, key, fingerprint, cache_key) -> Optional[Response]:
+        '''Insert the key in progress and commit. None when this request is to run, else the replay.'''
+        deadline = time.monotonic() + self.wait
+        while True:
+            now = _now()
+            try:
+                with session.begin_nested():
+                    session.execute(insert(IdempotencyKey).values(
+                        scope=scope, idempotency_key=key, request_hash=fingerprint,
+                        locked_until=now + timedelta(seconds=self.lock_timeout),
+                        expires=now + timedelta(seconds=self.ttl), created=now, updated=now,
+                    ))
+                session.commit()
+                return None
+            except IntegrityError:
+                pass
+
+            row = session.execute(
+                select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body,
+                       IdempotencyKey.locked_until, IdempotencyKey.expires)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.idempotency_key == key)
+            ).first()
+            # the row was purged in between, insert again
+            if row is None:
+                continue
+            if row.expires <= now or (row.status_code is None and row.locked_until <= now):
+                # expired, or the request that claimed it died: take it over
+                if self._take_over(session, scope, key, fingerprint, row, now):
+                    return None
+                continue
+            if row.request_hash != fingerprint:
+                session.rollback()
+                abort(422, description=f"{HEADER} was used with another request")
+            if row.status_code is not None:
+                session.rollback()
+                self.store.set(cache_key, row.request_hash, _pack(row.status_code, row.response_body, row.expires))
+                self._count('replayed_from_db')
+                return _response(row.response_body, row.status_code, replayed=True)
+            # another process is running it
+            session.rollback()
+            if time.monotonic() >= deadline:
+                self._count('conflicts')
+                response = _response(dumps({"error": f"a request with this {HEADER} is in progress"}), 409)
+                response.headers['Retry-After'] = '1'
+                return response
+            time.sleep(POLL_INTERVAL)
+
+    def _take_over(self, session, scope, key, fingerprint, row, now) -> bool:
+        result = session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.scope == scope, IdempotencyKey.idempotency_key == key,
+                # only if nobody took it over first
+                IdempotencyKey.expires == row.expires,
+                IdempotencyKey.locked_until.is_(None) if row.locked_until is None
+                else IdempotencyKey.locked_until == row.locked_until,
+            )
+            .values(
+                request_hash=fingerprint, status_code=None, response_body=None,
+                locked_until=now + timedelta(seconds=self.lock_timeout),
+                expires=now + timedelta(seconds=self.ttl), updated=now,
+            )
+        )
+        session.commit()
+        return result.rowcount == 1
+
+    def _execute(self, session, handler, claim) -> Response:
+        try:
+            try:
+                body, status = handler()
+            except HTTPException as exc:
+                if exc.code is None or exc.code >= 500:
+                    raise
+                # the same client error as a returned one, stored and replayed
+                body, status = {"error": exc.description}, exc.code
+            data = dumps(body)
+            if status >= 500:
+                raise _ServerError(data, status)
+            if claim is not None:
+                scope, key, fingerprint, cache_key = claim
+                expires = _now() + timedelta(seconds=self.ttl)
+                # the stored response commits with the write
+                session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.scope == scope, IdempotencyKey.idempotency_key == key)
+                    .values(status_code=status, response_body=data, locked_until=None, expires=expires, updated=_now())
+                )
+            session.commit()
+        except _ServerError as exc:
+            self._release(session, claim)
+            return _response(exc.data, exc.status)
+        except BaseException:
+            self._release(session, claim)
+            raise
+        if claim is not None:
+            self.store.set(cache_key, fingerprint, _pack(status, data, expires))
+            self._count('executed')
+        return _response(data, status)
+
+    def _release(self, session, claim) -> None:
+        '''Roll the write back and drop the claim, a retry runs the request again.'''
+        session.rollback()
+        if claim is None:
+            return
+        scope, key, fingerprint, _ = claim
+        session.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope, IdempotencyKey.idempotency_key == key,
+            IdempotencyKey.request_hash == fingerprint, IdempotencyKey.status_code.is_(None),
+        ))
+        session.commit()
+        self._count('released')
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.store.stats(),
+                'ttl': self.ttl,
+                'executed': self.executed,
+                'replayed': self.replayed,
+                'replayed_from_db': self.replayed_from_db,
+                'conflicts': self.conflicts,
+                'released': self.released,
+            }
+
+
+class _ServerError(Exception):
+    def __init__(self, data: bytes, status: int):
+        self.data = data
+        self.status = status
+
+
+def _response(body: bytes, status: int, replayed: bool = False) -> Response:
+    response = Response(body, status=status, mimetype='application/json')
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+idempotency = IdempotencyStore()
+
+
+def idempotent(scope: str):
+    '''Route decorator: the view returns (body, status) or aborts, and leaves the commit to the store.'''
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return idempotency.run(scope, db.session, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def purge_expired(session=None, chunk_size: int = 1000, now: Optional[datetime] = None) -> int:
+    '''Delete the keys past their expiry, chunk_size rows per transaction. returns the number deleted.'''
+    session = session or db.session
+    now = now or _now()
+    deleted = 0
+    while True:
+        keys = session.execute(
+            select(IdempotencyKey.scope, IdempotencyKey.idempotency_key)
+            .where(IdempotencyKey.expires <= now)
+            .limit(chunk_size)
+        ).all()
+        if not keys:
+            return deleted
+        session.execute(delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.scope, IdempotencyKey.idempotency_key).in_(keys),
+            IdempotencyKey.expires <= now,
+        ))
+        session.commit()
+        deleted += len(keys)
+
+
+def init_idempotency(app) -> None:
+    kind = app.config.get('IDEMPOTENCY_CACHE', 'lru')
+    ttl = app.config.get('IDEMPOTENCY_TTL', 86400.0)
+    idempotency.store = make_store(
+        kind, maxsize=app.config.get('IDEMPOTENCY_CACHE_SIZE', 10000), ttl=ttl, prefix='erp:idempotency:',
+    )
+    idempotency.ttl = ttl
+    idempotency.lock_timeout = app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', 60.0)
+    idempotency.wait = app.config.get('IDEMPOTENCY_WAIT', 5.0)
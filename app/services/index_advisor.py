@@ -0,0 +1,343 @@
+'''
+Index advisor: EXPLAIN the app's canonical queries on the configured database and flag
+plans that read a whole table or sort rows the index could have returned in order.
+
+flask --app app.main indexes advise
+flask --app app.main indexes advise --plans --only customer_invoices_by_status
+
+- CANONICAL_QUERIES is the registry, one entry per hot query shape of the services and
+  routes, with representative parameter values. register new shapes with @canonical
+- mysql: EXPLAIN, type ALL / index is a full scan, "Using filesort" in Extra a filesort
+- sqlite: EXPLAIN QUERY PLAN, "SCAN <table>" is a full scan, "USE TEMP B-TREE FOR .. ORDER BY"
+  a filesort
+- queries that read everything on purpose (keyset pages walking the primary key, the aging
+  rebuild) list what they allow
+
+the planner looks at row counts. on mysql run it against production-like data with fresh
+statistics (ANALYZE TABLE), on an empty table it may pick a scan because it is cheaper.
+'''
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import func, or_, select
+
+from app.extensions import db
+from app.models.archive import ArchivedInvoice
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.services.ar_aging import OPEN_STATUSES, aging_select
+from app.services.invoice_archive import all_invoices, closed_before
+from app.services.response_cache import invoice_version, product_version
+from app.services.sales_rollups import ROLLUPS, changed_days_query, recompute_query, summary_query
+
+FULL_SCAN = "full_scan"
+FILESORT = "filesort"
+
+# representative parameter values, the plan does not depend on them
+CUSTOMER_PK = 1
+INVOICE_PKS = [1, 2, 3]
+PRODUCT_PKS = [1, 2, 3]
+AS_OF = date(2025, 7, 1)
+NOW = datetime(2025, 7, 1)
+
+
+@dataclass(frozen=True)
+class CanonicalQuery:
+    name: str
+    build: Callable
+    description: str
+    allow: frozenset = frozenset()
+
+
+@dataclass
+class Finding:
+    kind: str # FULL_SCAN or FILESORT
+    table: Optional[str]
+    detail: str
+
+
+@dataclass
+class Advice:
+    query: CanonicalQuery
+    plan: list[str] = field(default_factory=list)
+    findings: list[Finding] = field(default_factory=list) # not allowed by the query
+    allowed: list[Finding] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.findings
+
+
+CANONICAL_QUERIES: dict[str, CanonicalQuery] = {}
+
+
+def canonical(name, allow=()):
+    '''Register fn() -> statement. the first docstring line is the description.'''
+    def register(fn):
+        description = (fn.__doc__ or "").strip().splitlines()[0] if fn.__doc__ else ""
+        CANONICAL_QUERIES[name] = CanonicalQuery(name, fn, description, frozenset(allow))
+        return fn
+    return register
+
+
+@canonical("customer_by_customer_id")
+def _customer_by_customer_id():
+    '''customer lookup by public id (routes, imports)'''
+    return select(Customer).where(Customer.customer_id == "C00000001")
+
+
+@canonical("customer_open_invoices")
+def _customer_open_invoices():
+    '''Customer.open_invoices, the SELECT .. IN of the with_open_invoices profile'''
+    return select(Invoice).where(
+        Invoice.customer_fk_id.in_([CUSTOMER_PK, CUSTOMER_PK + 1]), Invoice.status.in_(OPEN_STATUSES),
+    )
+
+
+@canonical("customer_invoices_by_status")
+def _customer_invoices_by_status():
+    '''/invoices?customer=&status=, one keyset page by id'''
+    return (
+        select(Invoice.id, Invoice.public_invoice_id, Customer.customer_id, Invoice.status)
+        .join(Customer, Invoice.customer_fk_id == Customer.id)
+        .where(Customer.customer_id == "C00000001", Invoice.status == InvoiceStatus.pending.value)
+        .where(Invoice.id > 0)
+        .order_by(Invoice.id)
+        .limit(51)
+    )
+
+
+@canonical("customer_latest_invoices")
+def _customer_latest_invoices():
+    '''customer.invoices.select() page, latest first'''
+    return (
+        select(Invoice)
+        .where(Invoice.customer_fk_id == CUSTOMER_PK)
+        .order_by(Invoice.invoice_date.desc())
+        .limit(20)
+    )
+
+
+@canonical("invoice_by_public_id")
+def _invoice_by_public_id():
+    '''invoice lookup by public id (ingest, payments)'''
+    return select(Invoice).where(Invoice.public_invoice_id == "INV000000001")
+
+
+@canonical("invoice_page", allow=(FULL_SCAN,))
+def _invoice_page():
+    '''/invoices keyset page, walks the primary key'''
+    return (
+        select(Invoice.id, Invoice.public_invoice_id, Customer.customer_id)
+        .join(Customer, Invoice.customer_fk_id == Customer.id)
+        .where(Invoice.id > 0)
+        .order_by(Invoice.id)
+        .limit(51)
+    )
+
+
+@canonical("invoice_items")
+def _invoice_items():
+    '''items of a chunk of invoices (full profile, totals, export)'''
+    return select(InvoiceItem).where(InvoiceItem.invoice_fk_id.in_(INVOICE_PKS))
+
+
+@canonical("invoice_taxes")
+def _invoice_taxes():
+    '''taxes of a chunk of invoices (full profile, totals, export)'''
+    return select(InvoiceTax).where(InvoiceTax.invoice_fk_id.in_(INVOICE_PKS))
+
+
+@canonical("overdue_candidates")
+def _overdue_candidates():
+    '''overdue sweeper: id range of pending invoices past their due date'''
+    return select(func.min(Invoice.id), func.max(Invoice.id)).where(
+        Invoice.status == InvoiceStatus.pending.value, Invoice.invoice_due_date < NOW,
+    )
+
+
+@canonical("overdue_by_due_date")
+def _overdue_by_due_date():
+    '''collections worklist: overdue invoices, oldest due date first'''
+    return (
+        select(Invoice.id, Invoice.customer_fk_id, Invoice.outstanding_balance, Invoice.invoice_due_date)
+        .where(Invoice.status == InvoiceStatus.overdue.value)
+        .order_by(Invoice.invoice_due_date)
+        .limit(100)
+    )
+
+
+@canonical("aging_refresh")
+def _aging_refresh():
+    '''aging of some customers, refreshed after every invoice or payment flush'''
+    return aging_select(AS_OF).where(Invoice.customer_fk_id.in_([CUSTOMER_PK, CUSTOMER_PK + 1]))
+
+
+@canonical("aging_rebuild", allow=(FULL_SCAN,))
+def _aging_rebuild():
+    '''aging of every customer (flask aging rebuild), reads all open invoices'''
+    return aging_select(AS_OF)
+
+
+@canonical("invoice_payments_rollup")
+def _invoice_payments_rollup():
+    '''totals engine: paid amount and last payment date per invoice'''
+    return (
+        select(Payment.invoice_fk_id, func.sum(Payment.payment_amount), func.max(Payment.payment_date))
+        .where(Payment.invoice_fk_id.in_(INVOICE_PKS))
+        .group_by(Payment.invoice_fk_id)
+    )
+
+
+@canonical("invoice_payments_by_date")
+def _invoice_payments_by_date():
+    '''payment history of an invoice, latest first'''
+    return (
+        select(Payment)
+        .where(Payment.invoice_fk_id == INVOICE_PKS[0])
+        .order_by(Payment.payment_date.desc())
+    )
+
+
+@canonical("payment_duplicates")
+def _payment_duplicates():
+    '''payment application: already applied public ids or references'''
+    return select(Payment.public_payment_id, Payment.payment_reference).where(or_(
+        Payment.public_payment_id.in_(["PAY000000001", "PAY000000002"]),
+        Payment.payment_reference.in_(["REF000000001", "REF000000002"]),
+    ))
+
+
+@canonical("archive_candidates")
+def _archive_candidates():
+    '''archiver: closed invoices in one primary key range'''
+    return select(Invoice.id).where(Invoice.id > 0, Invoice.id <= 1000, *closed_before(NOW))
+
+
+@canonical("archived_invoice_by_public_id")
+def _archived_invoice_by_public_id():
+    '''get_invoice() falling through to the archive'''
+    return select(ArchivedInvoice).where(ArchivedInvoice.public_invoice_id == "INV000000001")
+
+
+@canonical("customer_invoice_history")
+def _customer_invoice_history():
+    '''customer_invoices(): live and archived invoices of a customer, latest first'''
+    invoices = all_invoices()
+    return (
+        select(invoices)
+        .where(invoices.c.customer_fk_id == CUSTOMER_PK)
+        .order_by(invoices.c.invoice_date.desc())
+        .limit(100)
+    )
+
+
+@canonical("product_by_sku")
+def _product_by_sku():
+    '''catalog lookup by sku'''
+    return select(Product).where(Product.sku == "SKU00000001")
+
+
+@canonical("product_active_variants")
+def _product_active_variants():
+    '''active variants of a chunk of products (catalog, inventory, imports)'''
+    return select(ProductVariant).where(
+        ProductVariant.product_fk_id.in_(PRODUCT_PKS), ProductVariant.is_active.is_(True),
+    )
+
+
+
+@canonical("invoice_version")
+def _invoice_version():
+    '''ETag of GET /invoices/<public_invoice_id>, runs on every request'''
+    return invoice_version("INV000000001")
+
+
+@canonical("product_version")
+def _product_version():
+    '''ETag of GET /products/<public_product_id>, runs on every request'''
+    return product_version("PID00000001")
+
+
+@canonical("sales_changed_days")
+def _sales_changed_days():
+    '''rollup catch up: days of the invoices updated since the watermark'''
+    return changed_days_query(NOW)
+
+
+@canonical("sales_recompute_days")
+def _sales_recompute_days():
+    '''rollup catch up: product sales of a chunk of days, live and archived invoices'''
+    return recompute_query(ROLLUPS["product"], [AS_OF, AS_OF + timedelta(days=1)])
+
+
+@canonical("sales_summary", allow=(FILESORT,))
+def _sales_summary():
+    '''/analytics/sales: a date range of the product rollup, sorted by revenue'''
+    return summary_query("product", AS_OF, AS_OF + timedelta(days=30), limit=100)
+
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def _sqlite_plan(connection, sql):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    plan, findings = [], []
+    for row in rows:
+        detail = row[-1]
+        plan.append(detail)
+        scan = _SQLITE_SCAN.match(detail)
+        if scan and scan.group(1) in db.metadata.tables:
+            findings.append(Finding(FULL_SCAN, scan.group(1), detail))
+        elif detail.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in detail:
+            findings.append(Finding(FILESORT, None, detail))
+    return plan, findings
+
+
+def _mysql_plan(connection, sql):
+    rows = connection.exec_driver_sql(f"EXPLAIN {sql}").mappings().all()
+    plan, findings = [], []
+    for row in rows:
+        extra = row.get("Extra") or ""
+        detail = f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {extra}".rstrip()
+        plan.append(detail)
+        if row["type"] in ("ALL", "index"):
+            findings.append(Finding(FULL_SCAN, row["table"], detail))
+        if "Using filesort" in extra:
+            findings.append(Finding(FILESORT, row["table"], detail))
+    return plan, findings
+
+
+PLANNERS = {"sqlite": _sqlite_plan, "mysql": _mysql_plan}
+
+
+def explain(query: CanonicalQuery, connection) -> Advice:
+    '''Plan of one canonical query, split into findings and allowed findings.'''
+    dialect = connection.dialect
+    planner = PLANNERS.get(dialect.name)
+    if planner is None:
+        raise ValueError(f"no index advisor for {dialect.name}, supported: {', '.join(PLANNERS)}")
+    sql = str(query.build().compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    plan, findings = planner(connection, sql)
+    advice = Advice(query=query, plan=plan)
+    for finding in findings:
+        (advice.allowed if finding.kind in query.allow else advice.findings).append(finding)
+    return advice
+
+
+def advise(names: Optional[Iterable[str]] = None, engine=None) -> list[Advice]:
+    '''EXPLAIN every registered query (or the named ones) on the configured database.'''
+    engine = engine or db.engine
+    names = list(names) if names else list(CANONICAL_QUERIES)
+    unknown = [name for name in names if name not in CANONICAL_QUERIES]
+    if unknown:
+        raise ValueError(f"unknown canonical queries: {', '.join(unknown)}")
+    with engine.connect() as connection:
+        return [explain(CANONICAL_QUERIES[name], connection) for name in names]
@@ -0,0 +1,99 @@
+'''
+Contention safe stock reservation for ProductVariant.inventory_stock.
+
+reserve_stock() takes {variant_id: quantity} for a whole checkout and is all or nothing:
+
+- the variant rows are locked with SELECT .. FOR UPDATE in primary key order, two checkouts
+  sharing variants queue behind each other instead of deadlocking
+- one conditional UPDATE decrements every variant (CASE id WHEN .. THEN qty) only where
+  inventory_stock >= qty, and sets has_stock in the same statement
+- if any variant is short, the savepoint is rolled back and InsufficientStock lists them
+'''
+
+from __future__ import annotations
+
+from typing import Mapping
+
+from sqlalchemy import case, select, update
+
+from app.extensions import db
+from app.models.products import ProductVariant
+from app.services.catalog_cache import invalidate_products
+
+
+class InsufficientStock(Exception):
+    def __init__(self, variant_ids):
+        self.variant_ids = sorted(variant_ids)
+        super().__init__(f"insufficient stock for variants {self.variant_ids}")
+
+
+def _validate(quantities: Mapping[int, int]) -> list[int]:
+    if not quantities:
+        raise ValueError("no variants to reserve")
+    for variant_id, quantity in quantities.items():
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError(f"quantity for variant {variant_id} must be a positive integer")
+    return sorted(quantities)
+
+
+def _apply(session, quantities: Mapping[int, int], sign: int) -> None:
+    ids = _validate(quantities)
+    table = ProductVariant.__table__
+
+    # deterministic lock order. sqlite has no row locks and ignores FOR UPDATE,
+    # there the conditional UPDATE below is the guard
+    locked = session.execute(
+        select(table.c.id, table.c.product_fk_id, table.c.inventory_stock)
+        .where(table.c.id.in_(ids))
+        .order_by(table.c.id)
+        .with_for_update()
+    ).all()
+    found = {row.id for row in locked}
+    if len(found) != len(ids):
+        raise ValueError(f"unknown variants {sorted(set(ids) - found)}")
+
+    quantity = case(dict(quantities), value=table.c.id)
+    remaining = table.c.inventory_stock + sign * quantity
+    statement = (
+        update(table)
+        .where(table.c.id.in_(ids))
+        # has_stock first: mysql evaluates SET left to right with already updated values
+        .ordered_values(
+            (table.c.has_stock, remaining > 0),
+            (table.c.inventory_stock, remaining),
+        )
+    )
+    if sign < 0:
+        statement = statement.where(table.c.inventory_stock >= quantity)
+
+    savepoint = session.begin_nested()
+    if session.execute(statement).rowcount != len(ids):
+        savepoint.rollback()
+        short = session.execute(
+            select(table.c.id).where(table.c.id.in_(ids), table.c.inventory_stock < quantity)
+        ).scalars()
+        raise InsufficientStock(short)
+    savepoint.commit()
+
+    invalidate_products(session, {row.product_fk_id for row in locked})
+
+
+def reserve_stock(quantities: Mapping[int, int], session=None, commit: bool = True) -> None:
+    '''Take quantities out of stock for every variant, or for none of them.'''
+    session = session or db.session
+    try:
+        _apply(session, quantities, -1)
+    except (InsufficientStock, ValueError):
+        if commit:
+            session.rollback()
+        raise
+    if commit:
+        session.commit()
+
+
+def release_stock(quantities: Mapping[int, int], session=None, commit: bool = True) -> None:
+    '''Put reserved quantities back, e.g. for a cancelled checkout.'''
+    session = session or db.session
+    _apply(session, quantities, 1)
+    if commit:
+        session.commit()
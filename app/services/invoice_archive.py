@@ -0,0 +1,182 @@
+'''
+Archival of closed invoices.
+
+paid and cancelled invoices closed before a cutoff (date_fully_paid, or the last update
+of a cancelled invoice) move with their items, taxes and payments into the archive
+tables (app/models/archive.py), keeping their ids:
+
+- archive_closed_invoices(): walks primary key ranges of chunk_size ids like the overdue
+  sweeper, each range is one transaction of INSERT .. SELECT into the archive and DELETE
+  from the live tables. the ids of a range are locked (SELECT .. FOR UPDATE on mysql) so
+  a payment cannot land in between. stopped by its time budget, the next run picks up
+  the rest, archived rows are gone from the live tables so there is no checkpoint
+- reads: get_invoice() looks in the live table, then the archive. all_invoices() is the
+  union of both for reports, customer_invoices() a customer's history from it
+- closed invoices have no open balance, the aging summary does not change
+
+payments posted against an archived invoice are rejected as an unknown invoice.
+'''
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Optional, Union
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select, text, union_all
+
+from app.extensions import db
+from app.models.archive import ARCHIVE_MODELS, ArchivedInvoice
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.payments import Payment
+
+CLOSED_STATUSES = (InvoiceStatus.paid.value, InvoiceStatus.cancelled.value)
+RETENTION_DAYS = 730
+CHILDREN = (InvoiceItem, InvoiceTax, Payment)
+
+
+@dataclass
+class ArchiveReport:
+    invoices: int = 0
+    items: int = 0
+    taxes: int = 0
+    payments: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    completed: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.invoices / self.seconds if self.seconds else 0.0
+
+
+def closed_before(cutoff: datetime):
+    '''WHERE clause of the invoices the archiver moves.'''
+    return (
+        Invoice.status.in_(CLOSED_STATUSES),
+        func.coalesce(Invoice.date_fully_paid, Invoice.updated) < cutoff,
+    )
+
+
+def _copy(session, model, key, ids, now) -> int:
+    source = model.__table__
+    target = ARCHIVE_MODELS[model].__table__
+    names = [column.name for column in source.columns]
+    result = session.execute(
+        insert(target).from_select(
+            names + ['archived'],
+            select(*source.columns, literal(now, DateTime)).where(source.c[key].in_(ids)),
+        )
+    )
+    return result.rowcount
+
+
+def _archive_chunk(session, ids: list[int], now: datetime, report: ArchiveReport) -> None:
+    report.invoices += _copy(session, Invoice, 'id', ids, now)
+    report.items += _copy(session, InvoiceItem, 'invoice_fk_id', ids, now)
+    report.taxes += _copy(session, InvoiceTax, 'invoice_fk_id', ids, now)
+    report.payments += _copy(session, Payment, 'invoice_fk_id', ids, now)
+    for model in CHILDREN:
+        session.execute(delete(model.__table__).where(model.__table__.c.invoice_fk_id.in_(ids)))
+    session.execute(delete(Invoice.__table__).where(Invoice.__table__.c.id.in_(ids)))
+
+
+def archive_closed_invoices(
+    session=None,
+    cutoff: Optional[datetime] = None,
+    retention_days: int = RETENTION_DAYS,
+    chunk_size: int = 1000,
+    time_budget: Optional[float] = None,
+) -> ArchiveReport:
+    '''Move invoices closed before cutoff (default: retention_days ago) to the archive tables.'''
+    session = session or db.session
+    now = datetime.now(timezone.utc)
+    cutoff = cutoff or now - timedelta(days=retention_days)
+    started = perf_counter()
+    report = ArchiveReport()
+
+    candidates = closed_before(cutoff)
+    first_id, last_id = session.execute(
+        select(func.min(Invoice.id), func.max(Invoice.id)).where(*candidates)
+    ).one()
+    position = (first_id or 1) - 1
+    while first_id is not None and position < last_id:
+        if time_budget is not None and perf_counter() - started >= time_budget:
+            break
+        upper = min(position + chunk_size, last_id)
+        ids = list(session.scalars(
+            select(Invoice.id).where(Invoice.id > position, Invoice.id <= upper, *candidates).with_for_update()
+        ))
+        if ids:
+            _archive_chunk(session, ids, now, report)
+            report.chunks += 1
+        session.commit()
+        position = upper
+    report.completed = first_id is None or position >= last_id
+
+    session.commit()
+    report.seconds = perf_counter() - started
+    return report
+
+
+def get_invoice(public_invoice_id: str, session=None) -> Optional[Union[Invoice, ArchivedInvoice]]:
+    '''The invoice, live or archived. both have items, taxes and payments.'''
+    session = session or db.session
+    invoice = session.scalars(select(Invoice).where(Invoice.public_invoice_id == public_invoice_id)).first()
+    if invoice is None:
+        invoice = session.scalars(
+            select(ArchivedInvoice).where(ArchivedInvoice.public_invoice_id == public_invoice_id)
+        ).first()
+    return invoice
+
+
+def all_invoices(columns=None):
+    '''Subquery over live and archived invoices, is_archived tells them apart.'''
+    names = columns or [column.name for column in Invoice.__table__.columns]
+    live = Invoice.__table__
+    archive = ArchivedInvoice.__table__
+    return union_all(
+        select(*(live.c[name] for name in names), literal(False).label('is_archived')),
+        select(*(archive.c[name] for name in names), literal(True).label('is_archived')),
+    ).subquery('all_invoices')
+
+
+def customer_invoices(
+    customer_fk_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 100,
+    session=None,
+):
+    '''A customer's invoices, live and archived, latest first.'''
+    session = session or db.session
+    invoices = all_invoices()
+    query = select(invoices).where(invoices.c.customer_fk_id == customer_fk_id)
+    if date_from is not None:
+        query = query.where(invoices.c.invoice_date >= date_from)
+    if date_to is not None:
+        query = query.where(invoices.c.invoice_date < date_to)
+    return session.execute(query.order_by(invoices.c.invoice_date.desc()).limit(limit)).all()
+
+
+def add_archive_partitions(through_year: int, session=None) -> list[str]:
+    '''mysql: split yearly partitions off pmax up to through_year (see migration 0005).'''
+    session = session or db.session
+    if session.get_bind().dialect.name != 'mysql':
+        return []
+    existing = set(session.scalars(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'invoices_archive'"
+    )))
+    if 'pmax' not in existing:
+        raise RuntimeError("invoices_archive is not partitioned, run flask db upgrade")
+    years = sorted(int(name[1:]) for name in existing if name[1:].isdigit())
+    new = list(range(years[-1] + 1, through_year + 1))
+    if new:
+        partitions = ", ".join(f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in new)
+        session.execute(text(
+            f"ALTER TABLE invoices_archive REORGANIZE PARTITION pmax INTO "
+            f"({partitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ))
+    return [f"p{year}" for year in new]
@@ -0,0 +1,233 @@
+'''
+Memory bounded export of invoices with their items and taxes.
+
+- invoice headers are streamed in id order from a server side cursor (stream_results + yield_per)
+- for every chunk of headers the items and taxes come from one IN query per table
+- each chunk is written out and dropped before the next one is fetched,
+  so memory depends on chunk_size, not on the number of invoices
+
+the header cursor runs on its own connection: with mysql an unbuffered (server side)
+result blocks its connection, the child queries use a second one.
+
+formats:
+csv      a directory with invoices.csv, invoice_items.csv and invoice_taxes.csv
+ndjson   one invoice per line with nested items and taxes
+columnar one row group per line: {"invoices": {column: [values]}, "invoice_items": .., "invoice_taxes": ..}
+         (parquet-like layout without a pyarrow dependency)
+'''
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from time import perf_counter
+from typing import Any, Optional
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.products import Product
+from app.serialization import dumps_lines, row_encoder
+
+FORMATS = ('csv', 'ndjson', 'columnar')
+
+INVOICE_COLUMNS = (
+    Invoice.id,
+    Invoice.public_invoice_id,
+    Customer.customer_id,
+    Invoice.status,
+    Invoice.subtotal,
+    Invoice.tax_amount,
+    Invoice.shipping_amount,
+    Invoice.total_amount,
+    Invoice.outstanding_balance,
+    Invoice.invoice_date,
+    Invoice.invoice_due_date,
+    Invoice.date_fully_paid,
+)
+ITEM_COLUMNS = (
+    InvoiceItem.id,
+    InvoiceItem.invoice_fk_id,
+    Product.public_product_id,
+    InvoiceItem.quantity,
+    InvoiceItem.unit_price,
+    InvoiceItem.line_total,
+)
+TAX_COLUMNS = (
+    InvoiceTax.id,
+    InvoiceTax.invoice_fk_id,
+    InvoiceTax.tax_rate_percent,
+    InvoiceTax.tax_amount,
+)
+
+
+@dataclass
+class ExportReport:
+    invoices: int = 0
+    items: int = 0
+    taxes: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.invoices / self.seconds if self.seconds else 0.0
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _keys(columns) -> list[str]:
+    return [column.key for column in columns]
+
+
+def invoice_query(date_from=None, date_to=None, status=None):
+    query = (
+        select(*INVOICE_COLUMNS)
+        .join(Customer, Customer.id == Invoice.customer_fk_id)
+        .order_by(Invoice.id)
+    )
+    if date_from is not None:
+        query = query.where(Invoice.invoice_date >= date_from)
+    if date_to is not None:
+        query = query.where(Invoice.invoice_date < date_to)
+    if status is not None:
+        query = query.where(Invoice.status == status)
+    return query
+
+
+def _children(connection, ids: list[int]) -> tuple[list, list]:
+    items = connection.execute(
+        select(*ITEM_COLUMNS)
+        .join(Product, Product.id == InvoiceItem.product_fk_id)
+        .where(InvoiceItem.invoice_fk_id.in_(ids))
+        .order_by(InvoiceItem.invoice_fk_id, InvoiceItem.id)
+    ).all()
+    taxes = connection.execute(
+        select(*TAX_COLUMNS)
+        .where(InvoiceTax.invoice_fk_id.in_(ids))
+        .order_by(InvoiceTax.invoice_fk_id, InvoiceTax.id)
+    ).all()
+    return items, taxes
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self._files = []
+        self._writers = []
+        for name, columns in (
+            ('invoices.csv', INVOICE_COLUMNS),
+            ('invoice_items.csv', ITEM_COLUMNS),
+            ('invoice_taxes.csv', TAX_COLUMNS),
+        ):
+            handle = open(os.path.join(path, name), 'w', newline='')
+            writer = csv.writer(handle)
+            writer.writerow(_keys(columns))
+            self._files.append(handle)
+            self._writers.append(writer)
+
+    def write_chunk(self, invoices, items, taxes) -> None:
+        for writer, rows in zip(self._writers, (invoices, items, taxes)):
+            writer.writerows([_plain(value) for value in row] for row in rows)
+
+    def close(self) -> None:
+        for handle in self._files:
+            handle.close()
+
+
+class NdjsonWriter:
+    def __init__(self, path: str):
+        self._handle = open(path, 'wb')
+        self._encode_invoice = row_encoder(INVOICE_COLUMNS)
+        self._encode_item = row_encoder(ITEM_COLUMNS[2:]) # without id and invoice_fk_id
+        self._encode_tax = row_encoder(TAX_COLUMNS[2:])
+
+    def write_chunk(self, invoices, items, taxes) -> None:
+        encode_invoice = self._encode_invoice.for_dumps()
+        encode_item = self._encode_item.for_dumps()
+        encode_tax = self._encode_tax.for_dumps()
+        by_invoice: dict[int, dict[str, list]] = {
+            row[0]: {'items': [], 'taxes': []} for row in invoices
+        }
+        for row in items:
+            by_invoice[row[1]]['items'].append(encode_item(row[2:]))
+        for row in taxes:
+            by_invoice[row[1]]['taxes'].append(encode_tax(row[2:]))
+        documents = []
+        for row in invoices:
+            document = encode_invoice(row)
+            document.update(by_invoice[row[0]])
+            documents.append(document)
+        self._handle.write(dumps_lines(documents))
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class ColumnarWriter:
+    def __init__(self, path: str):
+        self._handle = open(path, 'w')
+        self._tables = (
+            ('invoices', _keys(INVOICE_COLUMNS)),
+            ('invoice_items', _keys(ITEM_COLUMNS)),
+            ('invoice_taxes', _keys(TAX_COLUMNS)),
+        )
+
+    def write_chunk(self, invoices, items, taxes) -> None:
+        group = {}
+        for (table, keys), rows in zip(self._tables, (invoices, items, taxes)):
+            columns = list(zip(*rows)) if rows else [()] * len(keys)
+            group[table] = {key: [_plain(value) for value in column] for key, column in zip(keys, columns)}
+        self._handle.write(json.dumps(group) + '\n')
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+WRITERS = {'csv': CsvWriter, 'ndjson': NdjsonWriter, 'columnar': ColumnarWriter}
+
+
+def export_invoices(
+    path: str,
+    fmt: str = 'ndjson',
+    chunk_size: int = 1000,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    engine=None,
+) -> ExportReport:
+    '''Write every matching invoice with its items and taxes to path (a directory for csv).'''
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {FORMATS}")
+    engine = engine or db.engine
+    started = perf_counter()
+    report = ExportReport()
+    writer = WRITERS[fmt](path)
+    try:
+        with engine.connect() as stream, engine.connect() as lookup:
+            result = stream.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                invoice_query(date_from, date_to, status)
+            )
+            for invoices in result.partitions():
+                items, taxes = _children(lookup, [row[0] for row in invoices])
+                writer.write_chunk(invoices, items, taxes)
+                report.invoices += len(invoices)
+                report.items += len(items)
+                report.taxes += len(taxes)
+                report.chunks += 1
+    finally:
+        writer.close()
+    report.seconds = perf_counter() - started
+    return report
@@ -0,0 +1,253 @@
+'''
+Bulk invoice ingestion for imports from the order system.
+
+- one query to resolve customers, one for products, one for duplicate public ids
+- invoices, items and taxes are written with executemany inserts in one transaction
+- derived amounts come from the totals engine (app/services/invoice_totals.py)
+  a payload that sends taxes[].tax_amount is rejected, tax amounts are always recomputed
+- a bad row is reported in the result, it does not abort the whole batch. a public id
+  that is already stored is listed in duplicates, not in failures
+'''
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.products import Product
+from app.services.invoice_totals import recalculate_totals
+
+CENTS = Decimal('0.01')
+
+
+class InvoicePayloadError(ValueError):
+    '''Raised when a single invoice payload cannot be ingested.'''
+
+
+@dataclass
+class RowFailure:
+    index: int # position of the payload in the batch
+    public_invoice_id: Optional[str]
+    reason: str
+
+
+@dataclass
+class BulkInvoiceResult:
+    created: list[str] = field(default_factory=list)
+    duplicates: list[str] = field(default_factory=list) # public ids already stored
+    failures: list[RowFailure] = field(default_factory=list)
+
+
+@dataclass
+class _InvoiceRow:
+    index: int
+    public_invoice_id: str
+    customer_id: str
+    invoice: dict[str, Any]
+    items: list[dict[str, Any]]
+    taxes: list[dict[str, Any]]
+
+
+def _money(value: Any, name: str) -> Decimal:
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError) as exc:
+        raise InvoicePayloadError(f"{name} is not a valid amount: {value!r}") from exc
+    if not amount.is_finite():
+        raise InvoicePayloadError(f"{name} is not a valid amount: {value!r}")
+    return amount.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _required(payload: dict[str, Any], key: str) -> Any:
+    value = payload.get(key)
+    if value is None or value == '':
+        raise InvoicePayloadError(f"missing required field {key!r}")
+    return value
+
+
+def _normalize(index: int, payload: dict[str, Any]) -> _InvoiceRow:
+    '''Validate one payload and turn it into column dicts (foreign keys still unresolved).'''
+    public_invoice_id = str(_required(payload, 'public_invoice_id'))
+    customer_id = str(_required(payload, 'customer_id'))
+    due = _required(payload, 'invoice_due_date')
+    if not isinstance(due, datetime):
+        raise InvoicePayloadError("invoice_due_date must be a datetime")
+
+    status = payload.get('status', InvoiceStatus.pending.value)
+    try:
+        status = InvoiceStatus(status).value
+    except ValueError as exc:
+        raise InvoicePayloadError(f"unknown status {status!r}") from exc
+
+    items = []
+    for item in payload.get('items') or ():
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise InvoicePayloadError(f"quantity must be a positive integer: {quantity!r}")
+        unit_price = _money(_required(item, 'unit_price'), 'unit_price')
+        line_total = item.get('line_total')
+        line_total = (
+            _money(line_total, 'line_total') if line_total is not None
+            else (unit_price * quantity).quantize(CENTS, rounding=ROUND_HALF_UP)
+        )
+        items.append({
+            'public_product_id': str(_required(item, 'public_product_id')),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'line_total': line_total,
+        })
+
+    taxes = []
+    for tax in payload.get('taxes') or ():
+        if 'tax_amount' in tax:
+            raise InvoicePayloadError("tax_amount is derived from tax_rate_percent, do not send it")
+        taxes.append({
+            'tax_rate_percent': _money(_required(tax, 'tax_rate_percent'), 'tax_rate_percent'),
+            'tax_amount': Decimal('0.00'),
+        })
+
+    # subtotal, tax and total amounts are derived by the totals engine after the insert
+    invoice = {
+        'public_invoice_id': public_invoice_id,
+        'status': status,
+        'shipping_amount': _money(payload.get('shipping_amount', 0), 'shipping_amount'),
+        'invoice_date': payload.get('invoice_date') or datetime.now(timezone.utc),
+        'invoice_due_date': due,
+        'additional_notes': payload.get('additional_notes'),
+    }
+    return _InvoiceRow(index, public_invoice_id, customer_id, invoice, items, taxes)
+
+
+def _insert_rows(session, rows: list[_InvoiceRow]) -> list[int]:
+    '''executemany the invoices, read back their ids in one query, then executemany the children.'''
+    session.execute(insert(Invoice), [row.invoice for row in rows])
+
+    # mysql has no INSERT .. RETURNING, so look the new ids up by the unique public id
+    invoice_ids = dict(session.execute(
+        select(Invoice.public_invoice_id, Invoice.id).where(
+            Invoice.public_invoice_id.in_([row.public_invoice_id for row in rows])
+        )
+    ).all())
+
+    items = [
+        dict(item, invoice_fk_id=invoice_ids[row.public_invoice_id])
+        for row in rows for item in row.items
+    ]
+    taxes = [
+        dict(tax, invoice_fk_id=invoice_ids[row.public_invoice_id])
+        for row in rows for tax in row.taxes
+    ]
+    if items:
+        session.execute(insert(InvoiceItem), items)
+    if taxes:
+        session.execute(insert(InvoiceTax), taxes)
+    return list(invoice_ids.values())
+
+
+def bulk_create_invoices(
+    payloads: Iterable[dict[str, Any]],
+    session=None,
+    commit: bool = True,
+) -> BulkInvoiceResult:
+    '''
+    Create many invoices with their items and taxes.
+
+    Each payload is a dict with public_invoice_id, customer_id (Customer.customer_id),
+    invoice_due_date and optional invoice_date, status, shipping_amount, additional_notes,
+    items [{public_product_id, quantity, unit_price, line_total?}] and
+    taxes [{tax_rate_percent}]. Header amounts and tax amounts are derived
+    with recalculate_totals() in the same transaction. Payloads whose public_invoice_id
+    is already stored are skipped and listed as duplicates.
+    '''
+    session = session or db.session
+    result = BulkInvoiceResult()
+
+    rows: list[_InvoiceRow] = []
+    seen: set[str] = set()
+    for index, payload in enumerate(payloads):
+        try:
+            row = _normalize(index, payload)
+            if row.public_invoice_id in seen:
+                raise InvoicePayloadError("duplicate public_invoice_id in batch")
+        except InvoicePayloadError as exc:
+            result.failures.append(RowFailure(index, payload.get('public_invoice_id'), str(exc)))
+            continue
+        seen.add(row.public_invoice_id)
+        rows.append(row)
+
+    if not rows:
+        return result
+
+    # one query per lookup, not one per row
+    customers = dict(session.execute(
+        select(Customer.customer_id, Customer.id).where(
+            Customer.customer_id.in_({row.customer_id for row in rows})
+        )
+    ).all())
+    product_ids = {item['public_product_id'] for row in rows for item in row.items}
+    products = dict(session.execute(
+        select(Product.public_product_id, Product.id).where(
+            Product.public_product_id.in_(product_ids)
+        )
+    ).all()) if product_ids else {}
+    existing = set(session.scalars(
+        select(Invoice.public_invoice_id).where(Invoice.public_invoice_id.in_(seen))
+    ))
+
+    ready: list[_InvoiceRow] = []
+    new_ids: list[int] = []
+    for row in rows:
+        if row.public_invoice_id in existing:
+            result.duplicates.append(row.public_invoice_id)
+            continue
+        if row.customer_id not in customers:
+            reason = f"unknown customer {row.customer_id!r}"
+        else:
+            missing = [item['public_product_id'] for item in row.items
+                       if item['public_product_id'] not in products]
+            reason = f"unknown product {missing[0]!r}" if missing else None
+        if reason:
+            result.failures.append(RowFailure(row.index, row.public_invoice_id, reason))
+            continue
+
+        row.invoice['customer_fk_id'] = customers[row.customer_id]
+        for item in row.items:
+            item['product_fk_id'] = products[item.pop('public_product_id')]
+        ready.append(row)
+
+    if ready:
+        try:
+            with session.begin_nested():
+                new_ids.extend(_insert_rows(session, ready))
+            result.created.extend(row.public_invoice_id for row in ready)
+        except IntegrityError:
+            # something raced us (e.g. a concurrent import of the same id).
+            # retry row by row so only the offending invoices fail
+            for row in ready:
+                try:
+                    with session.begin_nested():
+                        new_ids.extend(_insert_rows(session, [row]))
+                    result.created.append(row.public_invoice_id)
+                except IntegrityError as exc:
+                    if session.scalar(select(Invoice.id).where(Invoice.public_invoice_id == row.public_invoice_id)):
+                        result.duplicates.append(row.public_invoice_id)
+                    else:
+                        result.failures.append(
+                            RowFailure(row.index, row.public_invoice_id, str(exc.orig))
+                        )
+
+    if new_ids:
+        recalculate_totals(session, invoice_ids=new_ids, commit=False)
+    if commit:
+        session.commit()
+
+    result.failures.sort(key=lambda failure: failure.index)
+    return result
@@ -0,0 +1,215 @@
+'''
+Set based invoice totals engine.
+
+subtotal, tax_amount, total_amount and outstanding_balance are derived columns.
+they are recomputed here for many invoices at once:
+
+- GROUP BY over invoice_items and payments, summed in integer cents inside the database
+- every InvoiceTax.tax_amount is re-derived from tax_rate_percent of the subtotal, rounded half up to the cent
+  (the tax rules of app/money.py)
+- status and date_fully_paid follow the balance: a settled invoice becomes paid, a paid invoice
+  with a balance again goes back to pending/overdue. cancelled invoices keep their status
+- the new values are written back with executemany UPDATEs keyed on the primary key
+
+recalculate_totals() recomputes everything, refresh_balances() only the payment side
+(after payments were posted, see app/services/payment_application.py).
+
+no ORM objects are loaded and no per-object Decimal arithmetic is done.
+the aging summary of the affected customers is refreshed in the same transaction.
+'''
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import Integer, cast, func, select, update
+
+from app.extensions import db
+from app.money import tax_minor
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.payments import Payment
+from app.services.ar_aging import refresh_aging
+
+
+def cents(column):
+    '''SQL expression for a Numeric(.., 2) column as integer cents.'''
+    # round first, sqlite keeps NUMERIC as REAL so 0.29 * 100 is 28.999...
+    return cast(func.round(column * 100), Integer)
+
+
+def from_cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+def tax_cents(subtotal_cents: int, rate_hundredths: int) -> int:
+    '''Tax in cents of a subtotal for a rate in hundredths of a percent, rounded half up.'''
+    return tax_minor(subtotal_cents, rate_hundredths)
+
+
+def _invoice_id_chunks(session, invoice_ids, customer_fk_id, date_from, date_to, chunk_size) -> Iterator[list[int]]:
+    if invoice_ids is not None:
+        ids = sorted(set(invoice_ids))
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+        return
+
+    query = select(Invoice.id).order_by(Invoice.id).limit(chunk_size)
+    if customer_fk_id is not None:
+        query = query.where(Invoice.customer_fk_id == customer_fk_id)
+    if date_from is not None:
+        query = query.where(Invoice.invoice_date >= date_from)
+    if date_to is not None:
+        query = query.where(Invoice.invoice_date < date_to)
+
+    last_id = 0
+    while True:
+        ids = list(session.scalars(query.where(Invoice.id > last_id)))
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _headers(session, ids: list[int]):
+    return session.execute(
+        select(
+            Invoice.id, Invoice.customer_fk_id, Invoice.status, Invoice.invoice_due_date,
+            Invoice.date_fully_paid, cents(Invoice.shipping_amount), cents(Invoice.total_amount),
+        ).where(Invoice.id.in_(ids))
+    ).all()
+
+
+def _payments(session, ids: list[int]) -> dict[int, tuple[int, datetime]]:
+    '''invoice id -> (cents paid, date of the last payment)'''
+    rows = session.execute(
+        select(
+            Payment.invoice_fk_id,
+            func.sum(cents(Payment.payment_amount)),
+            func.max(Payment.payment_date),
+        )
+        .where(Payment.invoice_fk_id.in_(ids))
+        .group_by(Payment.invoice_fk_id)
+    ).all()
+    return {invoice_id: (int(paid), last) for invoice_id, paid, last in rows}
+
+
+def _settle(header, total: int, payments: dict, now: datetime) -> dict:
+    '''outstanding_balance, status and date_fully_paid of one invoice.'''
+    paid, last_payment = payments.get(header.id, (0, None))
+    outstanding = max(total - paid, 0)
+    row = {'id': header.id, 'outstanding_balance': from_cents(outstanding)}
+    if header.status == InvoiceStatus.cancelled.value:
+        return row
+
+    if outstanding == 0 and total > 0:
+        row['status'] = InvoiceStatus.paid.value
+        row['date_fully_paid'] = header.date_fully_paid or last_payment or now
+    elif header.status == InvoiceStatus.paid.value:
+        due = header.invoice_due_date
+        past_due = due < (now if due.tzinfo else now.replace(tzinfo=None))
+        row['status'] = (InvoiceStatus.overdue if past_due else InvoiceStatus.pending).value
+        row['date_fully_paid'] = None
+    return row
+
+
+def _write(session, headers, invoice_rows: list[dict]) -> None:
+    if invoice_rows:
+        # executemany batches rows by their set of keys, settled and unsettled rows go in separate batches
+        session.execute(update(Invoice), invoice_rows)
+    refresh_aging(session, {header.customer_fk_id for header in headers})
+
+
+def _recalculate_chunk(session, ids: list[int], now: datetime) -> None:
+    subtotals = dict(session.execute(
+        select(InvoiceItem.invoice_fk_id, func.sum(cents(InvoiceItem.line_total)))
+        .where(InvoiceItem.invoice_fk_id.in_(ids))
+        .group_by(InvoiceItem.invoice_fk_id)
+    ).all())
+    payments = _payments(session, ids)
+    headers = _headers(session, ids)
+    taxes = session.execute(
+        select(InvoiceTax.id, InvoiceTax.invoice_fk_id, cents(InvoiceTax.tax_rate_percent))
+        .where(InvoiceTax.invoice_fk_id.in_(ids))
+    ).all()
+
+    tax_totals: dict[int, int] = {}
+    tax_rows = []
+    for tax_id, invoice_id, rate in taxes:
+        amount = tax_cents(int(subtotals.get(invoice_id, 0)), int(rate))
+        tax_totals[invoice_id] = tax_totals.get(invoice_id, 0) + amount
+        tax_rows.append({'id': tax_id, 'tax_amount': from_cents(amount)})
+
+    invoice_rows = []
+    for header in headers:
+        subtotal = int(subtotals.get(header.id, 0))
+        tax = tax_totals.get(header.id, 0)
+        total = subtotal + tax + int(header[5])
+        row = _settle(header, total, payments, now)
+        row.update(
+            subtotal=from_cents(subtotal),
+            tax_amount=from_cents(tax),
+            total_amount=from_cents(total),
+        )
+        invoice_rows.append(row)
+
+    if tax_rows:
+        session.execute(update(InvoiceTax), tax_rows)
+    _write(session, headers, invoice_rows)
+
+
+def _refresh_chunk(session, ids: list[int], now: datetime) -> None:
+    payments = _payments(session, ids)
+    headers = _headers(session, ids)
+    _write(session, headers, [_settle(header, int(header[6]), payments, now) for header in headers])
+
+
+def recalculate_totals(
+    session=None,
+    *,
+    invoice_ids: Optional[Iterable[int]] = None,
+    customer_fk_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    chunk_size: int = 1000,
+    commit: bool = True,
+) -> int:
+    '''
+    Recompute the derived amounts of invoices and their taxes.
+
+    Pass explicit invoice_ids, or select invoices in a single pass by customer_fk_id
+    and/or an invoice_date range [date_from, date_to). Nothing given means every invoice.
+    Returns the number of invoices recalculated.
+    '''
+    session = session or db.session
+    now = datetime.now(timezone.utc)
+    count = 0
+    for ids in _invoice_id_chunks(session, invoice_ids, customer_fk_id, date_from, date_to, chunk_size):
+        _recalculate_chunk(session, ids, now)
+        count += len(ids)
+    if commit:
+        session.commit()
+    return count
+
+
+def refresh_balances(
+    session=None,
+    *,
+    invoice_ids: Iterable[int],
+    chunk_size: int = 1000,
+    commit: bool = True,
+) -> int:
+    '''
+    Recompute outstanding_balance, status and date_fully_paid from total_amount and the
+    payments of the given invoices. Returns the number of invoices refreshed.
+    '''
+    session = session or db.session
+    now = datetime.now(timezone.utc)
+    count = 0
+    for ids in _invoice_id_chunks(session, invoice_ids, None, None, None, chunk_size):
+        _refresh_chunk(session, ids, now)
+        count += len(ids)
+    if commit:
+        session.commit()
+    return count
@@ -0,0 +1,95 @@
+'''
+Overdue sweeper: pending invoices past invoice_due_date become overdue.
+
+- set based UPDATEs over id ranges of chunk_size, one transaction per chunk
+- the first and last candidate ids come from ix_invoices_status_due_date, ranges outside them are skipped
+- the end of every chunk is stored in job_checkpoints in the same transaction, so a run
+  stopped by its time budget (or a crash) resumes where it left off
+- a finished pass resets the checkpoint
+'''
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.jobs import JobCheckpoint
+
+CHECKPOINT_NAME = 'overdue_sweeper'
+
+
+@dataclass
+class SweepReport:
+    rows_updated: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    completed: bool = False # False when the time budget ran out, the next run resumes
+    position: int = 0 # last id covered
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_updated / self.seconds if self.seconds else 0.0
+
+
+def _checkpoint(session) -> JobCheckpoint:
+    checkpoint = session.get(JobCheckpoint, CHECKPOINT_NAME)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=CHECKPOINT_NAME, position=0)
+        session.add(checkpoint)
+    return checkpoint
+
+
+def sweep_overdue(
+    session=None,
+    now: Optional[datetime] = None,
+    chunk_size: int = 5000,
+    time_budget: Optional[float] = None,
+) -> SweepReport:
+    '''Flip pending invoices due before now to overdue. time_budget is in seconds.'''
+    session = session or db.session
+    now = now or datetime.now(timezone.utc)
+    started = perf_counter()
+    report = SweepReport()
+
+    candidates = (
+        Invoice.status == InvoiceStatus.pending.value,
+        Invoice.invoice_due_date < now,
+    )
+    first_id, last_id = session.execute(
+        select(func.min(Invoice.id), func.max(Invoice.id)).where(*candidates)
+    ).one()
+
+    checkpoint = _checkpoint(session)
+    position = checkpoint.position
+    if first_id is not None:
+        position = max(position, first_id - 1)
+
+        while position < last_id:
+            if time_budget is not None and perf_counter() - started >= time_budget:
+                break
+            upper = min(position + chunk_size, last_id)
+            result = session.execute(
+                update(Invoice)
+                .where(Invoice.id > position, Invoice.id <= upper, *candidates)
+                .values(status=InvoiceStatus.overdue.value)
+                .execution_options(synchronize_session=False)
+            )
+            report.rows_updated += result.rowcount
+            report.chunks += 1
+            position = upper
+            checkpoint.position = position
+            session.commit()
+
+    report.position = position
+    report.completed = first_id is None or position >= last_id
+    if report.completed:
+        checkpoint.position = 0
+    session.commit()
+    report.seconds = perf_counter() - started
+    return report
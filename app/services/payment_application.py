@@ -0,0 +1,240 @@
+'''
+Payment application for bank settlement files.
+
+- duplicates are found with one query on public_payment_id / payment_reference for the whole batch
+- invoices are resolved by public_invoice_id in one query, cancelled invoices are rejected
+- payments are written with one executemany insert
+- outstanding_balance, status and date_fully_paid of the touched invoices are refreshed
+  with grouped UPDATEs by the totals engine (refresh_balances in app/services/invoice_totals.py)
+
+a payment that was already applied is reported as a duplicate, so re-running a
+settlement file is safe.
+'''
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payments import Payment
+from app.services.invoice_totals import refresh_balances
+
+CENTS = Decimal('0.01')
+
+SETTLEMENT_COLUMNS = (
+    'public_payment_id',
+    'payment_reference',
+    'public_invoice_id',
+    'payment_amount',
+    'payment_date',
+    'payment_method',
+    'additional_info',
+)
+
+
+class PaymentPayloadError(ValueError):
+    '''Raised when a single payment payload cannot be applied.'''
+
+
+@dataclass
+class PaymentFailure:
+    index: int # position of the payload in the batch
+    public_payment_id: Optional[str]
+    reason: str
+
+
+@dataclass
+class PaymentApplicationResult:
+    applied: list[str] = field(default_factory=list)
+    duplicates: list[str] = field(default_factory=list)
+    failures: list[PaymentFailure] = field(default_factory=list)
+    invoices_updated: int = 0
+
+
+@dataclass
+class _PaymentRow:
+    index: int
+    public_invoice_id: str
+    payment: dict[str, Any]
+
+
+def _required(payload: dict[str, Any], key: str) -> str:
+    value = payload.get(key)
+    if value is None or value == '':
+        raise PaymentPayloadError(f"missing required field {key!r}")
+    return str(value)
+
+
+def _normalize(index: int, payload: dict[str, Any]) -> _PaymentRow:
+    amount = payload.get('payment_amount')
+    try:
+        amount = Decimal(str(amount)).quantize(CENTS, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError) as exc:
+        raise PaymentPayloadError(f"payment_amount is not a valid amount: {amount!r}") from exc
+    if not amount.is_finite() or amount <= 0:
+        raise PaymentPayloadError(f"payment_amount must be positive: {amount}")
+
+    payment_date = payload.get('payment_date') or datetime.now(timezone.utc)
+    if isinstance(payment_date, str):
+        try:
+            payment_date = datetime.fromisoformat(payment_date)
+        except ValueError as exc:
+            raise PaymentPayloadError(f"payment_date is not an ISO datetime: {payment_date!r}") from exc
+
+    payment = {
+        'public_payment_id': _required(payload, 'public_payment_id'),
+        'payment_reference': _required(payload, 'payment_reference'),
+        'payment_amount': amount,
+        'payment_date': payment_date,
+        'payment_method': _required(payload, 'payment_method'),
+        'additional_info': payload.get('additional_info') or None,
+    }
+    return _PaymentRow(index, _required(payload, 'public_invoice_id'), payment)
+
+
+def read_settlement_csv(path: str) -> Iterator[dict[str, str]]:
+    '''Rows of a settlement file with a header line (columns as in SETTLEMENT_COLUMNS).'''
+    with open(path, newline='') as handle:
+        yield from csv.DictReader(handle)
+
+
+def apply_payments(
+    payloads: Iterable[dict[str, Any]],
+    session=None,
+    commit: bool = True,
+) -> PaymentApplicationResult:
+    '''
+    Record many payments and settle the invoices they pay.
+
+    Each payload is a dict with public_payment_id, payment_reference, public_invoice_id,
+    payment_amount, payment_method and optional payment_date, additional_info.
+    Payments whose public_payment_id or payment_reference is already recorded
+    (or repeated earlier in the batch) are skipped and listed as duplicates.
+    '''
+    session = session or db.session
+    result = PaymentApplicationResult()
+
+    rows: list[_PaymentRow] = []
+    seen_ids: set[str] = set()
+    seen_refs: set[str] = set()
+    for index, payload in enumerate(payloads):
+        try:
+            row = _normalize(index, payload)
+        except PaymentPayloadError as exc:
+            result.failures.append(PaymentFailure(index, payload.get('public_payment_id'), str(exc)))
+            continue
+        public_payment_id = row.payment['public_payment_id']
+        if public_payment_id in seen_ids or row.payment['payment_reference'] in seen_refs:
+            result.duplicates.append(public_payment_id)
+            continue
+        seen_ids.add(public_payment_id)
+        seen_refs.add(row.payment['payment_reference'])
+        rows.append(row)
+
+    if not rows:
+        return result
+
+    # one query each for already recorded payments and for the invoices they pay
+    recorded_ids: set[str] = set()
+    recorded_refs: set[str] = set()
+    for public_payment_id, reference in session.execute(
+        select(Payment.public_payment_id, Payment.payment_reference).where(
+            or_(Payment.public_payment_id.in_(seen_ids), Payment.payment_reference.in_(seen_refs))
+        )
+    ):
+        recorded_ids.add(public_payment_id)
+        recorded_refs.add(reference)
+    invoices = {
+        public_invoice_id: (invoice_id, status)
+        for public_invoice_id, invoice_id, status in session.execute(
+            select(Invoice.public_invoice_id, Invoice.id, Invoice.status).where(
+                Invoice.public_invoice_id.in_({row.public_invoice_id for row in rows})
+            )
+        )
+    }
+
+    ready: list[_PaymentRow] = []
+    for row in rows:
+        public_payment_id = row.payment['public_payment_id']
+        if public_payment_id in recorded_ids or row.payment['payment_reference'] in recorded_refs:
+            result.duplicates.append(public_payment_id)
+            continue
+        invoice = invoices.get(row.public_invoice_id)
+        if invoice is None:
+            reason = f"unknown invoice {row.public_invoice_id!r}"
+        elif invoice[1] == InvoiceStatus.cancelled.value:
+            reason = f"invoice {row.public_invoice_id!r} is cancelled"
+        else:
+            reason = None
+        if reason:
+            result.failures.append(PaymentFailure(row.index, public_payment_id, reason))
+            continue
+        row.payment['invoice_fk_id'] = invoice[0]
+        ready.append(row)
+
+    invoice_ids: set[int] = set()
+    if ready:
+        try:
+            with session.begin_nested():
+                session.execute(insert(Payment), [row.payment for row in ready])
+            applied = ready
+        except IntegrityError:
+            # a concurrent run recorded some of these first, retry row by row
+            applied = []
+            for row in ready:
+                try:
+                    with session.begin_nested():
+                        session.execute(insert(Payment), [row.payment])
+                    applied.append(row)
+                except IntegrityError:
+                    result.duplicates.append(row.payment['public_payment_id'])
+        result.applied.extend(row.payment['public_payment_id'] for row in applied)
+        invoice_ids.update(row.payment['invoice_fk_id'] for row in applied)
+
+    if invoice_ids:
+        result.invoices_updated = refresh_balances(session, invoice_ids=invoice_ids, commit=False)
+    if commit:
+        session.commit()
+
+    result.failures.sort(key=lambda failure: failure.index)
+    return result
+
+
+def apply_settlement_file(
+    path: str,
+    batch_size: int = 5000,
+    session=None,
+) -> PaymentApplicationResult:
+    '''Apply a settlement CSV in batches, committing each batch. Failure indexes are file rows.'''
+    session = session or db.session
+    total = PaymentApplicationResult()
+    batch: list[dict[str, str]] = []
+    offset = 0
+
+    def flush():
+        result = apply_payments(batch, session=session)
+        total.applied.extend(result.applied)
+        total.duplicates.extend(result.duplicates)
+        total.invoices_updated += result.invoices_updated
+        total.failures.extend(
+            PaymentFailure(offset + failure.index, failure.public_payment_id, failure.reason)
+            for failure in result.failures
+        )
+
+    for row in read_settlement_csv(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            offset += len(batch)
+            batch = []
+    if batch:
+        flush()
+    return total
@@ -0,0 +1,121 @@
+'''
+Ranked full text search over product_name, brand, product_category and product_description.
+
+the text index lives in the database, every worker sees the same one and it is up to date
+as soon as a write commits, bulk imports included:
+- mysql: FULLTEXT index ft_products_search, MATCH .. AGAINST in boolean mode. innodb skips
+  terms shorter than innodb_ft_min_token_size (3) and its stopwords
+- sqlite (local runs, tests): FTS5 table products_search kept in sync by triggers, ranked
+  with bm25, a match in the name counts more than one in the description
+(app/models/products.py, migrations/versions/0006)
+
+every term of the query has to match, the last one as a prefix ("red sh" finds "red shirt").
+filters: is_active (active=None for all), and a variant with the color and/or size.
+ranked results have no stable cursor, pages go by offset, up to MAX_OFFSET.
+
+instead of LIKE '%..%' on four columns, which reads every product.
+'''
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+from sqlalchemy import column, exists, literal_column, select, table
+from sqlalchemy.dialects.mysql import match
+
+from app.models.products import Product, ProductVariant
+from app.serialization import row_encoder
+
+MAX_TERMS = 8
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+# bm25 weights of product_name, brand, product_category, product_description
+SQLITE_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+RESULT_COLUMNS = (
+    Product.public_product_id,
+    Product.sku,
+    Product.product_name,
+    Product.brand,
+    Product.product_category,
+    Product.is_active,
+)
+encode_result = row_encoder(RESULT_COLUMNS)
+
+_TERM = re.compile(r"\w+")
+products_search = table("products_search", column("rowid"))
+
+
+def query_terms(text: str) -> list[str]:
+    '''Lowercased word terms of the query, in order, without repeats, at most MAX_TERMS.'''
+    terms = []
+    for term in _TERM.findall(text.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _sqlite_search(terms):
+    # terms are \w+ only, nothing to escape inside the quotes
+    expression = " AND ".join(f'"{term}"' for term in terms[:-1])
+    expression = f'{expression} AND "{terms[-1]}"*' if expression else f'"{terms[-1]}"*'
+    bm25 = literal_column(f"bm25(products_search, {', '.join(map(str, SQLITE_WEIGHTS))})")
+    # bm25 is lower for better matches
+    return (
+        select(*RESULT_COLUMNS, (-bm25).label("score"))
+        .join(products_search, products_search.c.rowid == Product.id)
+        .where(literal_column("products_search").op("MATCH")(expression)),
+        bm25.asc(),
+    )
+
+
+def _mysql_search(terms):
+    expression = " ".join(f"+{term}" for term in terms[:-1]) + f" +{terms[-1]}*"
+    relevance = match(
+        Product.product_name, Product.brand, Product.product_category, Product.product_description,
+        against=expression.strip(),
+    ).in_boolean_mode()
+    return select(*RESULT_COLUMNS, relevance.label("score")).where(relevance), relevance.desc()
+
+
+SEARCHERS = {"sqlite": _sqlite_search, "mysql": _mysql_search}
+
+
+def search_query(dialect: str, text: str, active: Optional[bool] = True, color: Optional[str] = None,
+                 size: Optional[str] = None, limit: int = 20, offset: int = 0):
+    '''The SELECT of one page of matches, best first. None when the text has no terms.'''
+    if dialect not in SEARCHERS:
+        raise ValueError(f"product search needs mysql or sqlite, not {dialect}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    if not 0 <= offset <= MAX_OFFSET:
+        raise ValueError(f"offset must be between 0 and {MAX_OFFSET}")
+    terms = query_terms(text)
+    if not terms:
+        return None
+
+    query, rank = SEARCHERS[dialect](terms)
+    if active is not None:
+        query = query.where(Product.is_active.is_(active))
+    if color is not None or size is not None:
+        variant = exists().where(ProductVariant.product_fk_id == Product.id, ProductVariant.is_active.is_(True))
+        if color is not None:
+            variant = variant.where(ProductVariant.color == color)
+        if size is not None:
+            variant = variant.where(ProductVariant.size == size)
+        query = query.where(variant)
+    return query.order_by(rank, Product.id).limit(limit).offset(offset)
+
+
+def search_products(session, text: str, **filters) -> list[dict]:
+    '''Matching products, best first, each with its score. filters: see search_query().'''
+    query = search_query(session.get_bind().dialect.name, text, **filters)
+    if query is None:
+        return []
+    results = []
+    for row in session.execute(query):
+        result = encode_result(row)
+        result["score"] = round(float(row.score), 4)
+        results.append(result)
+    return results
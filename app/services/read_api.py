@@ -0,0 +1,235 @@
+'''
+Read side of the dashboard endpoints: customer lookup, invoice detail, product catalog.
+
+plain functions of a sync Session that return JSON ready dicts. the flask routes call
+them with db.session, the async app (app/asgi.py) runs the very same functions over an
+AsyncSession with session.run_sync(), so both serve identical payloads.
+
+columns only, no ORM entities: nothing lands in the identity map and no lazy load can fire.
+rows become dicts through the encoders precompiled for each column tuple (app/serialization.py).
+'''
+
+from __future__ import annotations
+
+from typing import Any, Mapping, Optional
+
+from sqlalchemy import select
+
+from app.models.aging import CustomerAging
+from app.models.archive import ArchivedInvoice, ArchivedInvoiceItem, ArchivedInvoiceTax, ArchivedPayment
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.serialization import row_encoder
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def parse_page_args(args: Mapping[str, Any], orderings) -> tuple:
+    '''limit, order and after of a query string, raises ValueError with the message for a 400.'''
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    order = args.get("order", "id")
+    if order not in orderings:
+        raise ValueError(f"order must be one of {', '.join(orderings)}")
+    column = orderings[order]
+
+    after = args.get("after")
+    if after is not None and order == "id":
+        try:
+            after = int(after)
+        except ValueError:
+            raise ValueError("after must be an integer when ordering by id") from None
+    return column, after, limit
+
+
+def keyset_page(session, query, column, after, limit):
+    '''One page of rows after the cursor value, plus the cursor of the next page (None on the last page).'''
+    if after is not None:
+        query = query.where(column > after)
+    rows = session.execute(query.order_by(column).limit(limit + 1)).all()
+    next_after = getattr(rows[limit - 1], column.key) if len(rows) > limit else None
+    return rows[:limit], next_after
+
+
+CUSTOMER_DETAIL_COLUMNS = (
+    Customer.customer_id,
+    Customer.customer_name,
+    Customer.customer_email,
+    Customer.customer_phone,
+    Customer.customer_address,
+    Customer.updated,
+    CustomerAging.total_outstanding,
+    CustomerAging.open_invoices,
+    CustomerAging.as_of,
+)
+encode_customer = row_encoder(CUSTOMER_DETAIL_COLUMNS)
+
+
+def customer_detail(session, customer_id: str) -> Optional[dict]:
+    '''A customer with its aging totals, one query on unique keys.'''
+    row = session.execute(
+        select(*CUSTOMER_DETAIL_COLUMNS)
+        .outerjoin(CustomerAging, CustomerAging.customer_fk_id == Customer.id)
+        .where(Customer.customer_id == customer_id)
+    ).first()
+    if row is None:
+        return None
+    body = encode_customer(row)
+    if row.as_of is None:
+        # no open balance, no aging row
+        body.update(total_outstanding="0.00", open_invoices=0)
+    return body
+
+
+# (invoice, item, tax, payment) models, live first. archived invoices keep their ids
+INVOICE_MODELS = (
+    (Invoice, InvoiceItem, InvoiceTax, Payment),
+    (ArchivedInvoice, ArchivedInvoiceItem, ArchivedInvoiceTax, ArchivedPayment),
+)
+
+
+def _detail_columns(invoice, item, tax, payment) -> tuple:
+    return (
+        (
+            invoice.id,
+            invoice.public_invoice_id,
+            Customer.customer_id,
+            invoice.status,
+            invoice.subtotal,
+            invoice.tax_amount,
+            invoice.shipping_amount,
+            invoice.total_amount,
+            invoice.outstanding_balance,
+            invoice.invoice_date,
+            invoice.invoice_due_date,
+            invoice.date_fully_paid,
+            invoice.updated,
+        ),
+        (Product.public_product_id, Product.sku, item.quantity, item.unit_price, item.line_total),
+        (tax.tax_rate_percent, tax.tax_amount),
+        (payment.public_payment_id, payment.payment_amount, payment.payment_date, payment.payment_method),
+    )
+
+
+INVOICE_DETAIL_COLUMNS, ITEM_COLUMNS, TAX_COLUMNS, PAYMENT_COLUMNS = _detail_columns(*INVOICE_MODELS[0])
+# the archive tables have the same columns in the same order, these encode their rows too
+encode_invoice = row_encoder(INVOICE_DETAIL_COLUMNS)
+encode_item = row_encoder(ITEM_COLUMNS)
+encode_tax = row_encoder(TAX_COLUMNS)
+encode_payment = row_encoder(PAYMENT_COLUMNS)
+
+
+def invoice_detail(session, public_invoice_id: str) -> Optional[dict]:
+    '''An invoice with its items, taxes and payments, four indexed queries. archived ones too.'''
+    for models in INVOICE_MODELS:
+        body = _invoice_detail(session, public_invoice_id, *models)
+        if body is not None:
+            return body
+    return None
+
+
+def _invoice_detail(session, public_invoice_id, invoice, item, tax, payment) -> Optional[dict]:
+    invoice_columns, item_columns, tax_columns, payment_columns = _detail_columns(invoice, item, tax, payment)
+    header = session.execute(
+        select(*invoice_columns)
+        .join(Customer, invoice.customer_fk_id == Customer.id)
+        .where(invoice.public_invoice_id == public_invoice_id)
+    ).first()
+    if header is None:
+        return None
+    body = encode_invoice(header)
+    invoice_id = body.pop("id")
+    body["items"] = encode_item.many(session.execute(
+        select(*item_columns)
+        .join(Product, item.product_fk_id == Product.id)
+        .where(item.invoice_fk_id == invoice_id)
+        .order_by(item.id)
+    ))
+    body["taxes"] = encode_tax.many(session.execute(
+        select(*tax_columns).where(tax.invoice_fk_id == invoice_id).order_by(tax.id)
+    ))
+    body["payments"] = encode_payment.many(session.execute(
+        select(*payment_columns).where(payment.invoice_fk_id == invoice_id).order_by(payment.payment_date)
+    ))
+    return body
+
+
+PRODUCT_COLUMNS = (
+    Product.id,
+    Product.public_product_id,
+    Product.sku,
+    Product.product_name,
+    Product.brand,
+    Product.product_category,
+    Product.is_active,
+    Product.updated,
+)
+VARIANT_COLUMNS = (
+    ProductVariant.product_fk_id,
+    ProductVariant.color,
+    ProductVariant.size,
+    ProductVariant.price,
+    ProductVariant.has_stock,
+    ProductVariant.inventory_stock,
+)
+PRODUCT_DETAIL_COLUMNS = PRODUCT_COLUMNS + (Product.product_description,)
+VARIANT_DETAIL_COLUMNS = VARIANT_COLUMNS[1:] + (ProductVariant.is_active,)
+encode_product = row_encoder(PRODUCT_COLUMNS)
+encode_variant = row_encoder(VARIANT_COLUMNS)
+encode_product_detail = row_encoder(PRODUCT_DETAIL_COLUMNS)
+encode_variant_detail = row_encoder(VARIANT_DETAIL_COLUMNS)
+PRODUCT_ORDERINGS = {"id": Product.id, "sku": Product.sku}
+PRODUCT_FILTERS = ("category", "brand")
+
+
+def product_page(session, args: Mapping[str, Any]) -> dict:
+    '''One keyset page of active products with their active variants (?category= ?brand=).'''
+    column, after, limit = parse_page_args(args, PRODUCT_ORDERINGS)
+    query = select(*PRODUCT_COLUMNS).where(Product.is_active.is_(True))
+    if args.get("category"):
+        query = query.where(Product.product_category == args["category"])
+    if args.get("brand"):
+        query = query.where(Product.brand == args["brand"])
+    rows, next_after = keyset_page(session, query, column, after, limit)
+
+    variants: dict[int, list] = {row.id: [] for row in rows}
+    if variants:
+        for variant in session.execute(
+            select(*VARIANT_COLUMNS)
+            .where(ProductVariant.product_fk_id.in_(variants), ProductVariant.is_active.is_(True))
+            .order_by(ProductVariant.id)
+        ):
+            body = encode_variant(variant)
+            variants[body.pop("product_fk_id")].append(body)
+
+    items = []
+    for row in rows:
+        body = encode_product(row)
+        body["variants"] = variants[body.pop("id")]
+        items.append(body)
+    return {"items": items, "next_after": next_after}
+
+
+def product_detail(session, public_product_id: str) -> Optional[dict]:
+    '''A product with all its variants, active or not, two indexed queries.'''
+    row = session.execute(
+        select(*PRODUCT_DETAIL_COLUMNS).where(Product.public_product_id == public_product_id)
+    ).first()
+    if row is None:
+        return None
+    body = encode_product_detail(row)
+    product_id = body.pop("id")
+    body["variants"] = encode_variant_detail.many(session.execute(
+        select(*VARIANT_DETAIL_COLUMNS)
+        .where(ProductVariant.product_fk_id == product_id)
+        .order_by(ProductVariant.id)
+    ))
+    return body
@@ -0,0 +1,319 @@
+'''
+Response cache with ETags for the invoice and product documents
+(GET /invoices/<public_invoice_id>, GET /products/<public_product_id>).
+
+- every request runs a version query first: one indexed row with the updated column and
+  the few values that change without much else changing (balance, status, payment count
+  and amounts, tax amounts, variant stock, the latest update of an invoice's lines, taxes,
+  payments and of their products). its hash is the ETag. archived invoices are answered
+  from the archive tables. writes through sqlalchemy, bulk ones included, bump updated
+  (TimeStampModel onupdate), so the ETag is never stale
+- If-None-Match with the current ETag returns 304, the document is neither loaded nor
+  serialized
+- serialized bodies are kept in a store under their ETag: LRUStore in process by default,
+  SharedStore for a cache shared by all workers (redis or memcached like client with
+  get/set/delete, LocalSharedClient stands in for it locally). RESPONSE_CACHE picks one
+- Invoice/InvoiceItem/InvoiceTax/Payment and Product/ProductVariant changes flushed through
+  db.session drop their document from the store, on flush and again on commit (same as
+  app/services/catalog_cache.py). a stale entry that slips through is never served, its
+  ETag no longer matches
+
+mysql DATETIME has no fractional seconds, that is why updated alone is not the version.
+'''
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Callable, Iterable, Optional
+
+from flask import Response, abort, request
+from sqlalchemy import event, func, select, union_all
+
+from app.db_routing import RoutingSession
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.serialization import dumps
+from app.services.read_api import INVOICE_MODELS, invoice_detail, product_detail
+
+
+class LRUStore:
+    '''In-process store, size bounded, least recently used entries go first.'''
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'store': 'lru', 'size': len(self._entries), 'maxsize': self.maxsize, 'evictions': self.evictions}
+
+
+class LocalSharedClient:
+    '''Stand-in for a redis client: get, set with ex (seconds) and delete of bytes values.'''
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values: dict[str, tuple[Optional[float], bytes]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= self._clock():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[key] = (self._clock() + ex if ex else None, value)
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._values.pop(key, None) is not None for key in keys)
+
+    def flushdb(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class SharedStore:
+    '''Store in a cache all workers see, entries expire after ttl seconds.'''
+
+    def __init__(self, client=None, prefix: str = 'erp:response:', ttl: float = 300.0):
+        self.client = client if client is not None else LocalSharedClient()
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[tuple[str, bytes]]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b'\n')
+        return etag.decode(), body
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        self.client.set(self.prefix + key, etag.encode() + b'\n' + body, ex=self.ttl)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self) -> None:
+        self.client.flushdb()
+
+    def stats(self) -> dict:
+        return {'store': 'shared', 'prefix': self.prefix, 'ttl': self.ttl}
+
+
+def make_store(kind: str, maxsize: int = 10000, ttl: float = 300.0, prefix: str = 'erp:response:'):
+    if kind == 'lru':
+        return LRUStore(maxsize)
+    if kind == 'shared':
+        return SharedStore(prefix=prefix, ttl=ttl)
+    raise ValueError(f"unknown {prefix.strip(':')} store {kind!r}, expected lru or shared")
+
+
+@dataclass(frozen=True)
+class Document:
+    '''A cached document kind: its version query and its loader (app/services/read_api.py).'''
+    name: str
+    version: Callable  # public id -> select of (id, *version columns)
+    load: Callable  # (session, public id) -> dict
+
+
+def _invoice_version(public_invoice_id: str, invoice, item, tax, payment):
+    def children(model, *columns):
+        return [select(column).where(model.invoice_fk_id == invoice.id).scalar_subquery() for column in columns]
+
+    # updated has second resolution on mysql, the sums catch a second edit within the same second
+    payments = children(payment, func.count(), func.max(payment.updated), func.sum(payment.payment_amount))
+    taxes = children(tax, func.max(tax.updated), func.sum(tax.tax_amount))
+    items = children(item, func.max(item.updated))
+    # the document shows the public_product_id and sku of every line
+    products = (
+        select(func.max(Product.updated))
+        .join(item, item.product_fk_id == Product.id)
+        .where(item.invoice_fk_id == invoice.id)
+        .scalar_subquery()
+    )
+    return select(
+        invoice.id, invoice.updated, invoice.status, invoice.outstanding_balance, invoice.total_amount,
+        *payments, *taxes, *items, products,
+    ).where(invoice.public_invoice_id == public_invoice_id)
+
+
+def invoice_version(public_invoice_id: str):
+    '''Live or archived, an invoice is in one of the two. it keeps its id, and its store key.'''
+    return union_all(*(
+        _invoice_version(public_invoice_id, *models) for models in INVOICE_MODELS
+    ))
+
+
+def _variants(column):
+    return select(column).where(ProductVariant.product_fk_id == Product.id).scalar_subquery()
+
+
+def product_version(public_product_id: str):
+    return select(
+        Product.id, Product.updated, Product.is_active,
+        _variants(func.count()), _variants(func.max(ProductVariant.updated)),
+        _variants(func.sum(ProductVariant.inventory_stock)),
+    ).where(Product.public_product_id == public_product_id)
+
+
+INVOICE = Document('invoice', invoice_version, invoice_detail)
+PRODUCT = Document('product', product_version, product_detail)
+
+
+def etag_of(name: str, version) -> str:
+    digest = hashlib.blake2b(repr((name, *version)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+class ResponseCache:
+    def __init__(self, store=None):
+        self.store = store if store is not None else LRUStore()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.not_modified = self.invalidations = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def respond(self, document: Document, session, public_id: str) -> Response:
+        '''304 when If-None-Match is current, else the body from the store or freshly loaded. 404 if missing.'''
+        version = session.execute(document.version(public_id)).first()
+        if version is None:
+            abort(404)
+        etag = etag_of(document.name, version)
+        if request.if_none_match.contains_weak(etag.strip('"')):
+            self._count('not_modified')
+            return self._response(etag, status=304)
+
+        key = f"{document.name}:{version[0]}"
+        entry = self.store.get(key)
+        if entry is not None and entry[0] == etag:
+            self._count('hits')
+            return self._response(etag, entry[1])
+
+        self._count('misses')
+        body = document.load(session, public_id)
+        if body is None:
+            abort(404)
+        data = dumps(body)
+        self.store.set(key, etag, data)
+        return self._response(etag, data)
+
+    @staticmethod
+    def _response(etag: str, body: bytes = b'', status: int = 200) -> Response:
+        response = Response(body, status=status, mimetype='application/json')
+        response.headers['ETag'] = etag
+        # clients may keep the document but revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if keys:
+            self.store.delete(keys)
+            with self._lock:
+                self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.hits + self.misses + self.not_modified
+            return {
+                **self.store.stats(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_ratio': round((self.hits + self.not_modified) / served, 4) if served else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def init_response_cache(app) -> None:
+    response_cache.store = make_store(
+        app.config.get('RESPONSE_CACHE', 'lru'),
+        maxsize=app.config.get('RESPONSE_CACHE_SIZE', 10000),
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 300.0),
+    )
+
+
+def _changed_keys(session) -> set[str]:
+    keys = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Invoice):
+            keys.add(f"invoice:{obj.id}")
+        elif isinstance(obj, (InvoiceItem, InvoiceTax, Payment)):
+            keys.add(f"invoice:{obj.invoice_fk_id}")
+        elif isinstance(obj, Product):
+            keys.add(f"product:{obj.id}")
+        elif isinstance(obj, ProductVariant):
+            keys.add(f"product:{obj.product_fk_id}")
+    keys.discard("invoice:None")
+    keys.discard("product:None")
+    return keys
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _invalidate_on_flush(session, flush_context):
+    keys = _changed_keys(session)
+    if keys:
+        response_cache.invalidate(keys)
+        session.info.setdefault('response_cache_keys', set()).update(keys)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_on_commit(session):
+    keys = session.info.pop('response_cache_keys', None)
+    if keys:
+        response_cache.invalidate(keys)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop('response_cache_keys', None)
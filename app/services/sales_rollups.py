@@ -0,0 +1,436 @@
+'''
+Daily sales rollups: sales_daily_product, sales_daily_customer and sales_daily_tax_rate
+(app/models/sales.py), one row per day and product / customer / tax rate.
+
+- a day's rows are recomputed from the invoices dated that day, live and archived
+  (the archiver moves rows, it does not change a day's sales). cancelled invoices do not count
+- catch_up(): queues the days of the invoices updated since the invoices.updated
+  watermark (job_checkpoints 'sales_rollups', microseconds since the epoch) in
+  sales_stale_days, then recomputes the queued days a chunk at a time, one transaction
+  each. a run stopped by its time budget leaves the rest queued for the next one
+- the watermark scan starts WATERMARK_OVERLAP before the watermark, a transaction that
+  stamped updated earlier but committed after the last scan is not missed. recomputing
+  a day twice gives the same rows
+- Core bulk writers (ingestion, the totals engine, the sweeper) stamp invoices.updated,
+  the watermark sees them. what it cannot see is queued by the session events below:
+  deleted invoices, invoices moved to another day, and lines or taxes changed without
+  touching their invoice
+- rebuild_rollups(): every day from scratch (flask sales rollup --rebuild)
+- sales_summary() / sales_by_day(): answer a date range by summing the rollup rows,
+  raw_summary() computes the same from the invoice tables (benchmarks, checks)
+'''
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import chain
+from time import perf_counter
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import Date, delete, distinct, event, func, insert, inspect, literal, select, union_all
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.db_routing import RoutingSession
+from app.extensions import db
+from app.models.archive import ArchivedInvoice, ArchivedInvoiceItem, ArchivedInvoiceTax
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.jobs import JobCheckpoint
+from app.models.sales import SalesDailyCustomer, SalesDailyProduct, SalesDailyTaxRate, SalesStaleDay
+
+CHECKPOINT_NAME = 'sales_rollups'
+WATERMARK_OVERLAP = timedelta(minutes=5)
+CHUNK_DAYS = 31
+EPOCH = datetime(1970, 1, 1)
+
+# (invoices, invoice lines, invoice taxes) of the live and the archive tables
+TABLE_SETS = (
+    (Invoice.__table__, InvoiceItem.__table__, InvoiceTax.__table__),
+    (ArchivedInvoice.__table__, ArchivedInvoiceItem.__table__, ArchivedInvoiceTax.__table__),
+)
+
+
+@dataclass
+class RollupReport:
+    days_queued: int = 0
+    days: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    completed: bool = False # False when the time budget ran out, the queued days wait for the next run
+
+    @property
+    def days_per_second(self) -> float:
+        return self.days / self.seconds if self.seconds else 0.0
+
+
+# sources: (from clause, key column, {measure: aggregate}) of one table set
+
+def _day(invoices):
+    return func.date(invoices.c.invoice_date, type_=Date)
+
+
+def _per_invoice(invoices, child, amount, where):
+    '''Sum of a child amount per invoice, for the invoices matching where.'''
+    return (
+        select(child.c.invoice_fk_id, func.sum(amount).label('amount'))
+        .join(invoices, child.c.invoice_fk_id == invoices.c.id)
+        .where(*where)
+        .group_by(child.c.invoice_fk_id)
+        .subquery()
+    )
+
+
+def _product_source(invoices, items, taxes, where):
+    return (
+        items.join(invoices, items.c.invoice_fk_id == invoices.c.id),
+        items.c.product_fk_id,
+        {
+            'quantity': func.sum(items.c.quantity),
+            'revenue': func.sum(items.c.line_total),
+            'lines': func.count(),
+            'invoices': func.count(distinct(invoices.c.id)),
+        },
+    )
+
+
+def _customer_source(invoices, items, taxes, where):
+    revenue = _per_invoice(invoices, items, items.c.line_total, where)
+    tax = _per_invoice(invoices, taxes, taxes.c.tax_amount, where)
+    return (
+        invoices
+        .outerjoin(revenue, revenue.c.invoice_fk_id == invoices.c.id)
+        .outerjoin(tax, tax.c.invoice_fk_id == invoices.c.id),
+        invoices.c.customer_fk_id,
+        {
+            'invoices': func.count(),
+            'revenue': func.coalesce(func.sum(revenue.c.amount), 0),
+            'tax_amount': func.coalesce(func.sum(tax.c.amount), 0),
+        },
+    )
+
+
+def _tax_rate_source(invoices, items, taxes, where):
+    revenue = _per_invoice(invoices, items, items.c.line_total, where)
+    return (
+        taxes
+        .join(invoices, taxes.c.invoice_fk_id == invoices.c.id)
+        .outerjoin(revenue, revenue.c.invoice_fk_id == invoices.c.id),
+        taxes.c.tax_rate_percent,
+        {
+            'invoices': func.count(distinct(invoices.c.id)),
+            'taxable_amount': func.coalesce(func.sum(revenue.c.amount), 0),
+            'tax_amount': func.sum(taxes.c.tax_amount),
+        },
+    )
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    model: type
+    key: str
+    measures: tuple[str, ...]
+    source: Callable
+    rank: str # measure the summaries are ordered by
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+
+ROLLUPS = {
+    rollup.name: rollup for rollup in (
+        Rollup('product', SalesDailyProduct, 'product_fk_id',
+               ('quantity', 'revenue', 'lines', 'invoices'), _product_source, 'revenue'),
+        Rollup('customer', SalesDailyCustomer, 'customer_fk_id',
+               ('invoices', 'revenue', 'tax_amount'), _customer_source, 'revenue'),
+        Rollup('tax_rate', SalesDailyTaxRate, 'tax_rate_percent',
+               ('invoices', 'taxable_amount', 'tax_amount'), _tax_rate_source, 'taxable_amount'),
+    )
+}
+
+
+def _raw(rollup: Rollup, where_of: Callable, by_day: bool):
+    '''SELECT key[, day], measures from the live and archived invoices matching where_of(invoices).'''
+    branches = []
+    for invoices, items, taxes in TABLE_SETS:
+        where = [invoices.c.status != InvoiceStatus.cancelled.value, *where_of(invoices)]
+        from_, key, measures = rollup.source(invoices, items, taxes, where)
+        groups = [key] + ([_day(invoices)] if by_day else [])
+        labels = [rollup.key] + (['day'] if by_day else [])
+        branches.append(
+            select(*(column.label(label) for column, label in zip(groups, labels)),
+                   *(measure.label(name) for name, measure in measures.items()))
+            .select_from(from_)
+            .where(*where)
+            .group_by(*groups)
+        )
+    # an invoice is either live or archived, the branches add up
+    union = union_all(*branches).subquery()
+    dimensions = [union.c[rollup.key]] + ([union.c.day] if by_day else [])
+    query = select(*dimensions, *(func.sum(union.c[name]).label(name) for name in rollup.measures))
+    return query.group_by(*dimensions), union
+
+
+def _days_where(days: list[date]):
+    start, end = datetime.combine(days[0], time.min), datetime.combine(days[-1] + timedelta(days=1), time.min)
+    # the range reads ix_invoices_invoice_date, the list drops the days in between
+    return lambda invoices: (
+        invoices.c.invoice_date >= start, invoices.c.invoice_date < end, _day(invoices).in_(days),
+    )
+
+
+def recompute_query(rollup: Rollup, days: Optional[list[date]] = None):
+    '''The rollup rows of the given sorted days (every day when None) from the invoice tables.'''
+    where_of = (lambda invoices: ()) if days is None else _days_where(days)
+    return _raw(rollup, where_of, by_day=True)[0]
+
+
+def _recompute(connection, rollup: Rollup, days: Optional[list[date]], now: datetime) -> None:
+    table = rollup.table
+    if days is None:
+        connection.execute(delete(table))
+    else:
+        connection.execute(delete(table).where(table.c.day.in_(days)))
+    source = recompute_query(rollup, days).add_columns(literal(now), literal(now))
+    connection.execute(insert(table).from_select(
+        [rollup.key, 'day', *rollup.measures, 'created', 'updated'], source,
+    ))
+
+
+def refresh_days(session=None, days: Iterable[date] = ()) -> None:
+    '''Recompute the rollup rows of the given days inside the current transaction.'''
+    session = session or db.session
+    days = sorted(set(days))
+    connection = session.connection()
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(days), CHUNK_DAYS):
+        chunk = days[start:start + CHUNK_DAYS]
+        for rollup in ROLLUPS.values():
+            _recompute(connection, rollup, chunk, now)
+
+
+def _checkpoint(session) -> JobCheckpoint:
+    checkpoint = session.get(JobCheckpoint, CHECKPOINT_NAME)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=CHECKPOINT_NAME, position=0)
+        session.add(checkpoint)
+    return checkpoint
+
+
+def _to_position(moment: datetime) -> int:
+    return (moment.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_position(position: int) -> datetime:
+    return EPOCH + timedelta(microseconds=position)
+
+
+QUEUE_DIALECTS = ('mysql', 'sqlite')
+
+
+def queue_days(connection, days: Iterable[date]) -> None:
+    '''Add days to sales_stale_days, days already queued stay as they are.'''
+    now = datetime.now(timezone.utc)
+    rows = [{'day': day, 'created': now, 'updated': now} for day in sorted(set(days))]
+    if not rows:
+        return
+    table = SalesStaleDay.__table__
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(table).prefix_with('IGNORE')
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(table).on_conflict_do_nothing(index_elements=['day'])
+    else:
+        raise RuntimeError(f"no insert ignore for dialect {dialect!r}, sales rollups need mysql or sqlite")
+    connection.execute(statement, rows)
+
+
+def changed_days_query(since: datetime):
+    '''Days of the invoices updated after since.'''
+    invoices = Invoice.__table__
+    return select(_day(invoices)).where(invoices.c.updated > since).distinct()
+
+
+def _queue_changes(session, report: RollupReport, overlap: timedelta) -> None:
+    '''Queue the days changed since the watermark and move the watermark, in one transaction.'''
+    checkpoint = _checkpoint(session)
+    first_run = not checkpoint.position
+    latest = session.scalar(select(func.max(Invoice.updated)))
+    days = set()
+    if latest is not None:
+        since = EPOCH if first_run else _from_position(checkpoint.position) - overlap
+        days.update(session.scalars(changed_days_query(since)))
+        checkpoint.position = max(checkpoint.position, _to_position(latest))
+    if first_run:
+        # first run: the archived days too, they are never updated
+        archive = ArchivedInvoice.__table__
+        days.update(session.scalars(select(_day(archive)).distinct()))
+    queue_days(session.connection(), days)
+    report.days_queued = len(days)
+    session.commit()
+
+
+def catch_up(session=None, chunk_days: int = CHUNK_DAYS, time_budget: Optional[float] = None,
+             overlap: timedelta = WATERMARK_OVERLAP) -> RollupReport:
+    '''Bring the rollups up to date with the invoices. time_budget is in seconds.'''
+    session = session or db.session
+    started = perf_counter()
+    report = RollupReport()
+    _queue_changes(session, report, overlap)
+
+    stale = SalesStaleDay.__table__
+    now = datetime.now(timezone.utc)
+    while True:
+        if time_budget is not None and perf_counter() - started >= time_budget:
+            break
+        days = list(session.scalars(select(stale.c.day).order_by(stale.c.day).limit(chunk_days)))
+        if not days:
+            report.completed = True
+            break
+        connection = session.connection()
+        for rollup in ROLLUPS.values():
+            _recompute(connection, rollup, days, now)
+        connection.execute(delete(stale).where(stale.c.day.in_(days)))
+        session.commit()
+        report.days += len(days)
+        report.chunks += 1
+
+    report.seconds = perf_counter() - started
+    return report
+
+
+def rebuild_rollups(session=None, commit: bool = True) -> int:
+    '''Recompute every rollup from scratch and clear the queue. returns the number of days with sales.'''
+    session = session or db.session
+    # the watermark first: changes made while the rebuild runs are queued by the next catch up
+    _checkpoint(session).position = _to_position(datetime.now(timezone.utc))
+    connection = session.connection()
+    now = datetime.now(timezone.utc)
+    for rollup in ROLLUPS.values():
+        _recompute(connection, rollup, None, now)
+    connection.execute(delete(SalesStaleDay.__table__))
+    count = session.scalar(select(func.count(distinct(SalesDailyCustomer.day))))
+    if commit:
+        session.commit()
+    return count
+
+
+# queries
+
+SUMMARY_COLUMNS = {
+    name: (rollup.table.c[rollup.key], *(func.sum(rollup.table.c[measure]).label(measure) for measure in rollup.measures))
+    for name, rollup in ROLLUPS.items()
+}
+DAY_COLUMNS = (
+    SalesDailyCustomer.day,
+    *(func.sum(SalesDailyCustomer.__table__.c[measure]).label(measure) for measure in ROLLUPS['customer'].measures),
+)
+
+
+def _rollup(by: str) -> Rollup:
+    if by not in ROLLUPS:
+        raise ValueError(f"by must be one of {', '.join(ROLLUPS)}")
+    return ROLLUPS[by]
+
+
+def _check_range(date_from: date, date_to: date) -> None:
+    if date_from > date_to:
+        raise ValueError("date_from is after date_to")
+
+
+def summary_query(by: str, date_from: date, date_to: date, keys: Optional[Iterable] = None, limit: Optional[int] = None):
+    '''Totals per key over the days date_from..date_to (both included), from the rollup rows.'''
+    rollup = _rollup(by)
+    _check_range(date_from, date_to)
+    table = rollup.table
+    query = (
+        select(*SUMMARY_COLUMNS[by])
+        .where(table.c.day >= date_from, table.c.day <= date_to)
+        .group_by(table.c[rollup.key])
+    )
+    if keys is not None:
+        query = query.where(table.c[rollup.key].in_(list(keys)))
+    query = query.order_by(func.sum(table.c[rollup.rank]).desc(), table.c[rollup.key])
+    return query.limit(limit) if limit is not None else query
+
+
+def raw_summary_query(by: str, date_from: date, date_to: date, keys: Optional[Iterable] = None, limit: Optional[int] = None):
+    '''summary_query() computed from the invoice tables, what the rollups save.'''
+    rollup = _rollup(by)
+    _check_range(date_from, date_to)
+    start, end = datetime.combine(date_from, time.min), datetime.combine(date_to + timedelta(days=1), time.min)
+    query, union = _raw(
+        rollup, lambda invoices: (invoices.c.invoice_date >= start, invoices.c.invoice_date < end), by_day=False,
+    )
+    if keys is not None:
+        query = query.where(union.c[rollup.key].in_(list(keys)))
+    query = query.order_by(func.sum(union.c[rollup.rank]).desc(), union.c[rollup.key])
+    return query.limit(limit) if limit is not None else query
+
+
+def sales_summary(by: str, date_from: date, date_to: date, keys: Optional[Iterable] = None,
+                  limit: Optional[int] = None, session=None) -> list:
+    '''Rows of (key, *measures) of the rollup named by, best first.'''
+    session = session or db.session
+    return session.execute(summary_query(by, date_from, date_to, keys, limit)).all()
+
+
+def raw_summary(by: str, date_from: date, date_to: date, keys: Optional[Iterable] = None,
+                limit: Optional[int] = None, session=None) -> list:
+    session = session or db.session
+    return session.execute(raw_summary_query(by, date_from, date_to, keys, limit)).all()
+
+
+def by_day_query(date_from: date, date_to: date):
+    _check_range(date_from, date_to)
+    return (
+        select(*DAY_COLUMNS)
+        .where(SalesDailyCustomer.day >= date_from, SalesDailyCustomer.day <= date_to)
+        .group_by(SalesDailyCustomer.day)
+        .order_by(SalesDailyCustomer.day)
+    )
+
+
+def sales_by_day(date_from: date, date_to: date, session=None) -> list:
+    '''Rows of (day, invoices, revenue, tax_amount) for the days with sales, in order.'''
+    session = session or db.session
+    return session.execute(by_day_query(date_from, date_to)).all()
+
+
+# session events
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changes(session, flush_context):
+    '''Remember the days the watermark will not see.'''
+    days = session.info.setdefault('sales_days', set())
+    invoices = session.info.setdefault('sales_invoices', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Invoice):
+            if obj in session.deleted:
+                days.add(obj.invoice_date.date())
+            else:
+                # moved to another day: the old day loses it, the watermark sees the new one
+                days.update(value.date() for value in inspect(obj).attrs.invoice_date.history.deleted or ())
+        elif isinstance(obj, (InvoiceItem, InvoiceTax)):
+            invoices.add(obj.invoice_fk_id)
+            invoices.update(inspect(obj).attrs.invoice_fk_id.history.deleted or ())
+
+
+@event.listens_for(RoutingSession, "after_flush_postexec")
+def _queue_collected(session, flush_context):
+    days = session.info.pop('sales_days', set())
+    invoices = session.info.pop('sales_invoices', set())
+    invoices.discard(None)
+    if session.get_bind().dialect.name not in QUEUE_DIALECTS:
+        # no rollups on this database, its writes must not fail over them
+        return
+    connection = None
+    if invoices:
+        connection = session.connection()
+        days.update(value.date() for value in connection.scalars(
+            select(Invoice.invoice_date).where(Invoice.id.in_(invoices))
+        ))
+    if days:
+        queue_days(connection or session.connection(), days)
@@ -0,0 +1,78 @@
+'''
+Rows per second per stage of the streaming import, first load and rerun (upsert).
+
+peak RSS is printed after each run, it should stay flat as --rows grows.
+
+python -m benchmarks.bench_bulk_import --rows 200000
+'''
+
+import csv
+import json
+import os
+import resource
+import tempfile
+
+from app.services.bulk_import import import_file
+from benchmarks.common import bench_app, bench_parser
+
+
+def write_customers(path, rows):
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["customer_id", "customer_name", "customer_address", "customer_email"])
+        for i in range(rows):
+            writer.writerow([f"C{i}", f"Customer {i}", f"{i} Main St", f"c{i}@example.com"])
+
+
+def write_products(path, rows, variants):
+    with open(path, "w") as handle:
+        for i in range(rows):
+            handle.write(json.dumps({
+                "sku": f"SKU{i}", "product_name": f"Product {i}", "brand": "Brand",
+                "product_category": "Category", "product_description": "Bench",
+                "url": f"https://shop.example.com/p/{i}",
+                "variants": [
+                    {"color": f"color{j}", "size": "M", "price": "19.99", "inventory_stock": j}
+                    for j in range(variants)
+                ],
+            }) + "\n")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def show(label, report):
+    print(f"{label}: {report.rows_read} rows, {report.rejected} rejected, "
+          f"{report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s), peak rss {peak_rss_mb():.0f} MB")
+    for stage in report.stages:
+        print(f"  {stage.name:<9} {stage.rows:>9} rows {stage.seconds:>8.2f}s {stage.rows_per_second:>10.0f} rows/s")
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--variants", type=int, default=2, help="variants per product")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    directory = tempfile.mkdtemp(prefix="erp_import_")
+    customers = os.path.join(directory, "customers.csv")
+    products = os.path.join(directory, "products.ndjson")
+    write_customers(customers, args.rows)
+    write_products(products, args.rows, args.variants)
+
+    try:
+        with app.app_context():
+            for label in ("first load", "rerun (upsert)"):
+                show(f"customers, {label}", import_file("customers", customers, chunk_size=args.chunk_size))
+                show(f"products, {label}", import_file("products", products, chunk_size=args.chunk_size))
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+'''
+Multi-threaded stress of reserve_stock: reservations per second and no overselling.
+
+every thread checks out random baskets of hot variants until the stock runs out,
+then the sold quantities are compared with the stock that disappeared.
+
+python -m benchmarks.bench_inventory --threads 8 --variants 20 --stock 500
+'''
+
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+
+from app.extensions import db
+from app.models.products import Product, ProductVariant
+from app.services.inventory import InsufficientStock, reserve_stock
+from benchmarks.common import bench_app, bench_parser
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--variants", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--basket", type=int, default=3, help="variants per reservation")
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    with app.app_context():
+        db.session.execute(insert(Product), [{
+            "public_product_id": "P0", "product_name": "Hot product", "sku": "SKU0",
+            "brand": "Brand", "product_category": "Category", "product_description": "Bench",
+        }])
+        db.session.execute(insert(ProductVariant), [
+            {"product_fk_id": 1, "price": Decimal("1.00"), "inventory_stock": args.stock, "has_stock": True}
+            for _ in range(args.variants)
+        ])
+        db.session.commit()
+        ids = db.session.scalars(select(ProductVariant.id)).all()
+        db.session.remove()
+
+    sold = Counter()
+    counts = Counter()
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            while True:
+                basket = {variant_id: rng.randint(1, 3) for variant_id in rng.sample(ids, args.basket)}
+                try:
+                    reserve_stock(basket)
+                except InsufficientStock:
+                    with lock:
+                        counts["rejected"] += 1
+                        if counts["rejected"] > 50 * args.threads:
+                            break
+                    continue
+                with lock:
+                    counts["reserved"] += 1
+                    sold.update(basket)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        negative = db.session.scalar(
+            select(func.count()).select_from(ProductVariant).where(ProductVariant.inventory_stock < 0)
+        )
+        remaining = dict(db.session.execute(select(ProductVariant.id, ProductVariant.inventory_stock)).all())
+
+    oversold = [vid for vid in ids if args.stock - remaining[vid] != sold[vid]]
+    print(f"threads {args.threads}, variants {args.variants}, stock {args.stock} each")
+    print(f"{counts['reserved']} reservations, {counts['rejected']} rejected in {elapsed:.2f}s "
+          f"({counts['reserved'] / elapsed:.0f} reservations/s)")
+    print(f"negative stock rows: {negative}, mismatched variants: {len(oversold)}")
+    assert negative == 0 and not oversold
+
+
+if __name__ == "__main__":
+    main()
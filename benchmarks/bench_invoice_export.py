@@ -0,0 +1,140 @@
+'''
+Peak RSS of the streaming invoice export as the invoice count grows.
+
+each export runs in a fresh process so its peak RSS is its own. the ORM baseline
+loads every invoice with selectinload(items, taxes) and then writes NDJSON,
+its memory grows with the data, the streaming export stays flat.
+
+python -m benchmarks.bench_invoice_export --steps 20000 40000 80000
+'''
+
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.products import Product
+from app.services.invoice_export import export_invoices
+from benchmarks.common import bench_app, bench_parser, jsonable
+
+
+def seed(start, stop, items, customer_id, product_id):
+    '''invoices with ids start..stop-1, each with items and one tax.'''
+    for low in range(start, stop, 10000):
+        high = min(low + 10000, stop)
+        db.session.execute(insert(Invoice), [
+            {
+                "id": i, "public_invoice_id": f"INV{i}", "customer_fk_id": customer_id,
+                "subtotal": "29.97", "tax_amount": "3.90", "total_amount": "33.87",
+                "outstanding_balance": "33.87", "invoice_date": datetime(2025, 1, 1) + timedelta(minutes=i),
+                "invoice_due_date": datetime(2025, 2, 1),
+            }
+            for i in range(low, high)
+        ])
+        db.session.execute(insert(InvoiceItem), [
+            {"invoice_fk_id": i, "product_fk_id": product_id, "quantity": 1,
+             "unit_price": "9.99", "line_total": "9.99"}
+            for i in range(low, high) for _ in range(items)
+        ])
+        db.session.execute(insert(InvoiceTax), [
+            {"invoice_fk_id": i, "tax_rate_percent": "13.00", "tax_amount": "3.90"}
+            for i in range(low, high)
+        ])
+        db.session.commit()
+
+
+def orm_export(path):
+    invoices = db.session.scalars(
+        select(Invoice).options(selectinload(Invoice.items), selectinload(Invoice.taxes)).order_by(Invoice.id)
+    ).all()
+    with open(path, "w") as handle:
+        for invoice in invoices:
+            handle.write(json.dumps({
+                "public_invoice_id": invoice.public_invoice_id,
+                "total_amount": jsonable(invoice.total_amount),
+                "items": [{"quantity": item.quantity, "line_total": jsonable(item.line_total)}
+                          for item in invoice.items],
+                "taxes": [{"tax_amount": jsonable(tax.tax_amount)} for tax in invoice.taxes],
+            }) + "\n")
+
+
+def run_export(database_url, mode, path, chunk_size, queue):
+    app = bench_app(database_url, reset=False)
+    with app.app_context():
+        start = time.perf_counter()
+        if mode == "orm":
+            orm_export(path)
+        else:
+            export_invoices(path, fmt=mode, chunk_size=chunk_size)
+        seconds = time.perf_counter() - start
+    queue.put((seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(database_url, mode, path, chunk_size):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_export, args=(database_url, mode, path, chunk_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--steps", type=int, nargs="+", default=[10000, 20000, 40000],
+                        help="invoice counts to export at")
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", default=["ndjson", "csv", "columnar", "orm"])
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        handle, path = tempfile.mkstemp(prefix="erp_bench_", suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{path}"
+    app = bench_app(database_url)
+    out = tempfile.mkdtemp(prefix="erp_export_")
+
+    try:
+        with app.app_context():
+            db.session.add(Customer(customer_id="C0", customer_name="Customer", customer_address="Street"))
+            db.session.add(Product(
+                public_product_id="P0", product_name="Product", sku="SKU0",
+                brand="Brand", product_category="Category", product_description="Bench",
+            ))
+            db.session.commit()
+            customer_id = db.session.scalar(select(Customer.id))
+            product_id = db.session.scalar(select(Product.id))
+
+            print(f"{'invoices':>9} {'mode':<9} {'seconds':>8} {'invoices/s':>11} {'peak rss MB':>12}")
+            for count in args.steps:
+                existing = db.session.scalar(select(func.count(Invoice.id)))
+                seed(existing + 1, count + 1, args.items, customer_id, product_id)
+                for mode in args.modes:
+                    target = os.path.join(out, mode)
+                    seconds, rss = measure(database_url, mode, target, args.chunk_size)
+                    print(f"{count:>9} {mode:<9} {seconds:>8.2f} {count / seconds:>11.0f} {rss:>12.0f}")
+    finally:
+        for root, dirs, files in os.walk(out, topdown=False):
+            for name in files:
+                os.remove(os.path.join(root, name))
+            for name in dirs:
+                os.rmdir(os.path.join(root, name))
+        os.rmdir(out)
+        if args.database_url is None:
+            os.remove(database_url[len("sqlite:///"):])
+
+
+if __name__ == "__main__":
+    main()
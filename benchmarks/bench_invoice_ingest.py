@@ -0,0 +1,110 @@
+'''
+Throughput of bulk_create_invoices against the per-object ORM path.
+
+the per-object path builds Invoice, InvoiceItem and InvoiceTax one at a time and
+commits each invoice, the way tests/test_invoice.py does.
+
+python -m benchmarks.bench_invoice_ingest --invoices 5000 --items 3
+'''
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.products import Product
+from app.services.invoice_ingest import bulk_create_invoices
+from benchmarks.common import bench_app, bench_parser, timed
+
+
+def seed(customers, products):
+    db.session.execute(insert(Customer), [
+        {"customer_id": f"C{i}", "customer_name": f"Customer {i}", "customer_address": "Street"}
+        for i in range(customers)
+    ])
+    db.session.execute(insert(Product), [
+        {
+            "public_product_id": f"P{i}", "product_name": f"Product {i}", "sku": f"SKU{i}",
+            "brand": "Brand", "product_category": "Category", "product_description": "Bench",
+        }
+        for i in range(products)
+    ])
+    db.session.commit()
+
+
+def payloads(prefix, count, items, customers, products):
+    due = datetime.now(timezone.utc) + timedelta(days=30)
+    for i in range(count):
+        yield {
+            "public_invoice_id": f"{prefix}{i}",
+            "customer_id": f"C{i % customers}",
+            "invoice_due_date": due,
+            "items": [
+                {"public_product_id": f"P{(i + j) % products}", "quantity": 1 + j, "unit_price": "9.99"}
+                for j in range(items)
+            ],
+            "taxes": [{"tax_rate_percent": "13.00"}],
+        }
+
+
+def per_object(batch):
+    customers = {c.customer_id: c.id for c in db.session.query(Customer)}
+    products = {p.public_product_id: p.id for p in db.session.query(Product)}
+    for payload in batch:
+        invoice = Invoice(
+            public_invoice_id=payload["public_invoice_id"],
+            customer_fk_id=customers[payload["customer_id"]],
+            invoice_due_date=payload["invoice_due_date"],
+        )
+        db.session.add(invoice)
+        db.session.flush()
+        subtotal = Decimal("0.00")
+        for item in payload["items"]:
+            line_total = Decimal(item["unit_price"]) * item["quantity"]
+            subtotal += line_total
+            db.session.add(InvoiceItem(
+                invoice_fk_id=invoice.id,
+                product_fk_id=products[item["public_product_id"]],
+                quantity=item["quantity"],
+                unit_price=Decimal(item["unit_price"]),
+                line_total=line_total,
+            ))
+        db.session.add(InvoiceTax(
+            invoice_fk_id=invoice.id,
+            tax_rate_percent=Decimal("13.00"),
+            tax_amount=(subtotal * Decimal("0.13")).quantize(Decimal("0.01")),
+        ))
+        db.session.commit()
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--products", type=int, default=500)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    with app.app_context():
+        seed(args.customers, args.products)
+
+        batch = list(payloads("OBJ-", args.invoices, args.items, args.customers, args.products))
+        with timed("per-object ORM, commit per invoice", args.invoices) as slow:
+            per_object(batch)
+
+        batch = list(payloads("BULK-", args.invoices, args.items, args.customers, args.products))
+        with timed(f"bulk_create_invoices, batch {args.batch_size}", args.invoices) as fast:
+            for start in range(0, len(batch), args.batch_size):
+                result = bulk_create_invoices(batch[start:start + args.batch_size])
+                assert not result.failures, result.failures[:3]
+
+    print(f"speedup: {slow['seconds'] / fast['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+'''
+Money (integer cents, app/money.py) against Decimal for the arithmetic of invoice totals.
+
+- line totals: unit price * quantity
+- sums: one invoice's worth of line totals at a time, then the whole list
+- tax: tax_rate_percent of a subtotal, rounded half up to the cent
+- read: the same Numeric column fetched as Decimal and as Money (MoneyType)
+
+python -m benchmarks.bench_money --amounts 1000000
+'''
+
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import insert, select, type_coerce
+
+from app.extensions import db
+from app.models.products import Product, ProductVariant
+from app.money import Money, MoneyType, rate_hundredths, tax_minor
+from benchmarks.common import bench_app, bench_parser, timed
+
+CENTS = Decimal("0.01")
+LINES_PER_INVOICE = 50
+RATE = Decimal("8.25")
+
+
+def arithmetic(amounts):
+    rng = random.Random(5)
+    minors = [rng.randint(1, 500000) for _ in range(amounts)]
+    quantities = [rng.randint(1, 10) for _ in range(amounts)]
+    decimals = [Decimal(minor).scaleb(-2) for minor in minors]
+    moneys = [Money(minor) for minor in minors]
+    invoices = range(0, amounts, LINES_PER_INVOICE)
+
+    print(f"{amounts} amounts, {LINES_PER_INVOICE} lines per invoice")
+    with timed("line totals Decimal", amounts):
+        decimal_lines = [price * quantity for price, quantity in zip(decimals, quantities)]
+    with timed("line totals Money", amounts):
+        money_lines = [price * quantity for price, quantity in zip(moneys, quantities)]
+
+    with timed("invoice subtotals Decimal sum()", amounts):
+        decimal_subtotals = [sum(decimal_lines[start:start + LINES_PER_INVOICE]) for start in invoices]
+    with timed("invoice subtotals Money sum()", amounts):
+        money_subtotals = [sum(money_lines[start:start + LINES_PER_INVOICE]) for start in invoices]
+    with timed("invoice subtotals Money.total()", amounts):
+        money_subtotals = [Money.total(money_lines[start:start + LINES_PER_INVOICE]) for start in invoices]
+
+    with timed("grand total Decimal sum()", amounts):
+        decimal_total = sum(decimal_lines)
+    with timed("grand total Money.total()", amounts):
+        money_total = Money.total(money_lines)
+    assert money_total.to_decimal() == decimal_total
+
+    with timed("tax Decimal quantize", len(decimal_subtotals)):
+        decimal_taxes = [(subtotal * RATE / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+                         for subtotal in decimal_subtotals]
+    with timed("tax Money.tax()", len(money_subtotals)):
+        money_taxes = [subtotal.tax(RATE) for subtotal in money_subtotals]
+    rate = rate_hundredths(RATE)
+    with timed("tax tax_minor() on ints", len(money_subtotals)):
+        minor_taxes = [tax_minor(subtotal.minor, rate) for subtotal in money_subtotals]
+    assert [tax.to_decimal() for tax in money_taxes] == decimal_taxes
+    assert [tax.minor for tax in money_taxes] == minor_taxes
+
+
+def read_back(rows):
+    rng = random.Random(6)
+    db.session.execute(insert(Product), [{
+        "public_product_id": "P-MONEY", "product_name": "Money", "sku": "SKU-MONEY",
+        "brand": "Brand", "product_category": "Category", "product_description": "Money benchmark",
+    }])
+    product_id = db.session.scalar(select(Product.id))
+    for start in range(0, rows, 10000):
+        db.session.execute(insert(ProductVariant), [
+            {"product_fk_id": product_id, "price": Decimal(rng.randint(1, 10**9)).scaleb(-2), "inventory_stock": 0}
+            for _ in range(start, min(start + 10000, rows))
+        ])
+    db.session.commit()
+
+    print(f"\n{rows} prices read back from {db.engine.dialect.name}")
+    with timed("read Numeric as Decimal", rows):
+        decimals = db.session.scalars(select(ProductVariant.price).order_by(ProductVariant.id)).all()
+    with timed("read Numeric as Money (MoneyType)", rows):
+        moneys = db.session.scalars(
+            select(type_coerce(ProductVariant.price, MoneyType())).order_by(ProductVariant.id)
+        ).all()
+    assert [money.to_decimal() for money in moneys] == decimals
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--amounts", type=int, default=1000000)
+    parser.add_argument("--rows", type=int, default=200000, help="prices read back from the database")
+    args = parser.parse_args()
+
+    arithmetic(args.amounts)
+    app = bench_app(args.database_url)
+    with app.app_context():
+        read_back(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+'''
+Latency of deep pages: keyset pagination (GET /customers) against OFFSET.
+
+python -m benchmarks.bench_pagination --customers 200000 --repeat 20
+'''
+
+import time
+
+from sqlalchemy import insert, select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.routes.customers import CUSTOMER_COLUMNS
+from app.routes.listing import keyset_page
+from benchmarks.common import bench_app, bench_parser
+
+
+def seed(count, batch=10000):
+    for start in range(0, count, batch):
+        db.session.execute(insert(Customer), [
+            {"customer_id": f"C{i:09d}", "customer_name": f"Customer {i}", "customer_address": "Street"}
+            for i in range(start, min(start + batch, count))
+        ])
+    db.session.commit()
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--customers", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    with app.app_context():
+        seed(args.customers)
+        query = select(*CUSTOMER_COLUMNS)
+        ids = db.session.scalars(select(Customer.id).order_by(Customer.id)).all()
+
+        print(f"{'page depth':>12} {'offset ms':>12} {'keyset ms':>12}")
+        for depth in (0.0, 0.25, 0.5, 0.75, 0.99):
+            position = int((len(ids) - args.limit) * depth)
+            after = ids[position - 1] if position else None
+
+            offset_ms = best_of(args.repeat, lambda: db.session.execute(
+                query.order_by(Customer.id).offset(position).limit(args.limit)
+            ).all())
+            keyset_ms = best_of(args.repeat, lambda: keyset_page(
+                query, Customer.id, after, args.limit
+            ))
+            print(f"{position:>12} {offset_ms:>12.3f} {keyset_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+'''
+Throughput of apply_settlement_file over a synthetic settlement CSV.
+
+the per-object path looks up each invoice, adds the Payment, recomputes the balance
+from invoice.payments and commits per payment. it runs on a subset (--per-object)
+because it is orders of magnitude slower.
+
+python -m benchmarks.bench_payment_application --payments 100000 --invoices 25000
+'''
+
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payments import Payment
+from app.services.payment_application import SETTLEMENT_COLUMNS, apply_settlement_file
+from benchmarks.common import bench_app, bench_parser, timed
+
+INVOICE_TOTAL = Decimal("100.00")
+
+
+def seed(invoices, customers):
+    db.session.execute(insert(Customer), [
+        {"customer_id": f"C{i}", "customer_name": f"Customer {i}", "customer_address": "Street"}
+        for i in range(customers)
+    ])
+    customer_ids = list(db.session.scalars(select(Customer.id).order_by(Customer.id)))
+    due = datetime.now(timezone.utc) + timedelta(days=30)
+    for start in range(0, invoices, 10000):
+        db.session.execute(insert(Invoice), [
+            {
+                "public_invoice_id": f"INV{i}",
+                "customer_fk_id": customer_ids[i % customers],
+                "subtotal": INVOICE_TOTAL,
+                "total_amount": INVOICE_TOTAL,
+                "outstanding_balance": INVOICE_TOTAL,
+                "invoice_due_date": due,
+            }
+            for i in range(start, min(start + 10000, invoices))
+        ])
+    db.session.commit()
+
+
+def write_settlement(path, prefix, payments, invoices):
+    '''four 25.00 payments settle an invoice, so most invoices end up paid.'''
+    paid_on = datetime(2025, 1, 1)
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(SETTLEMENT_COLUMNS)
+        for i in range(payments):
+            writer.writerow([
+                f"{prefix}{i}", f"REF-{prefix}{i}", f"INV{i % invoices}", "25.00",
+                (paid_on + timedelta(minutes=i)).isoformat(), "bank_transfer", "",
+            ])
+
+
+def per_object(path):
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            invoice = db.session.scalar(
+                select(Invoice).where(Invoice.public_invoice_id == row["public_invoice_id"])
+            )
+            payment = Payment(
+                public_payment_id=row["public_payment_id"],
+                payment_reference=row["payment_reference"],
+                payment_amount=Decimal(row["payment_amount"]),
+                payment_date=datetime.fromisoformat(row["payment_date"]),
+                payment_method=row["payment_method"],
+            )
+            invoice.payments.append(payment)
+            paid = sum((p.payment_amount for p in invoice.payments), Decimal("0.00"))
+            invoice.outstanding_balance = max(invoice.total_amount - paid, Decimal("0.00"))
+            if invoice.outstanding_balance == 0:
+                invoice.status = InvoiceStatus.paid.value
+                invoice.date_fully_paid = payment.payment_date
+            db.session.commit()
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--payments", type=int, default=100000)
+    parser.add_argument("--invoices", type=int, default=25000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--per-object", type=int, default=2000, help="payments for the per-object run")
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    handle, path = tempfile.mkstemp(prefix="erp_settlement_", suffix=".csv")
+    os.close(handle)
+    try:
+        with app.app_context():
+            seed(args.invoices, args.customers)
+
+            if args.per_object:
+                write_settlement(path, "OBJ", args.per_object, args.invoices)
+                with timed("per-object ORM, commit per payment", args.per_object) as slow:
+                    per_object(path)
+
+            write_settlement(path, "BULK", args.payments, args.invoices)
+            with timed(f"apply_settlement_file, batch {args.batch_size}", args.payments) as fast:
+                result = apply_settlement_file(path, batch_size=args.batch_size)
+            assert not result.failures, result.failures[:3]
+            assert len(result.applied) == args.payments
+
+            paid = db.session.scalar(
+                select(func.count(Invoice.id)).where(Invoice.status == InvoiceStatus.paid.value)
+            )
+            print(f"{paid} of {args.invoices} invoices fully paid")
+
+            with timed("re-apply same file (all duplicates)", args.payments):
+                again = apply_settlement_file(path, batch_size=args.batch_size)
+            assert not again.applied and len(again.duplicates) == args.payments
+    finally:
+        os.remove(path)
+
+    if args.per_object:
+        print(f"speedup: {fast['rows_per_second'] / slow['rows_per_second']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+'''
+Sales analytics over a date range: summing the daily rollups (app/services/sales_rollups.py)
+against aggregating the invoice lines and taxes on every request.
+
+- builds a benchmark dataset (benchmarks/datasets.py, a year of invoices)
+- times the full rollup rebuild, and a catch up after a bulk update of the invoices of the
+  last --changed-days days (the watermark path). the catch up recomputes whole days, edits
+  spread over the whole year cost about as much as a rebuild
+- for each rollup and range of 7, 30 and 365 days: median of --runs queries, raw and
+  rollup, the two results are compared
+
+python -m benchmarks.bench_sales_rollups --scale medium
+'''
+
+import statistics
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.invoice import Invoice
+from app.services.sales_rollups import ROLLUPS, catch_up, raw_summary, rebuild_rollups, sales_summary
+from benchmarks.common import bench_app, bench_parser, timed
+from benchmarks.datasets import EPOCH, SCALES, build_dataset
+
+RANGES = (7, 30, 365)
+
+
+def median_ms(fn, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), result
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--scale", choices=SCALES, default="medium")
+    parser.add_argument("--changed-days", type=int, default=7, help="days of invoices updated before the catch up")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100, help="rows per summary, best first")
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    with app.app_context():
+        scale = SCALES[args.scale]
+        with timed(f"dataset {args.scale}", scale.invoices):
+            build_dataset(scale)
+        session = db.session
+
+        with timed("rollup rebuild", scale.invoices):
+            days = rebuild_rollups(session)
+        print(f"{days} days with sales")
+
+        last = session.scalar(select(func.max(Invoice.invoice_date)))
+        changed = session.execute(
+            update(Invoice)
+            .where(Invoice.invoice_date >= last - timedelta(days=args.changed_days))
+            .values(additional_notes="changed")
+        ).rowcount
+        session.commit()
+        with timed(f"catch up after {changed} changed invoices", changed):
+            # nothing else writes, no need to look back WATERMARK_OVERLAP for late commits
+            report = catch_up(session, overlap=timedelta(0))
+        print(f"{report.days} days recomputed in {report.chunks} chunks")
+
+        start_day = EPOCH.date()
+        print(f"\n{'by':<10} {'days':>5} {'raw ms':>10} {'rollup ms':>10} {'speedup':>8}")
+        for by in ROLLUPS:
+            for days in RANGES:
+                date_to = start_day + timedelta(days=days - 1)
+                raw_ms, raw = median_ms(
+                    lambda: raw_summary(by, start_day, date_to, limit=args.limit, session=session), args.runs,
+                )
+                rollup_ms, rollup = median_ms(
+                    lambda: sales_summary(by, start_day, date_to, limit=args.limit, session=session), args.runs,
+                )
+                if [tuple(row) for row in raw] != [tuple(row) for row in rollup]:
+                    raise SystemExit(f"rollup and raw results differ for {by} over {days} days")
+                print(f"{by:<10} {days:>5} {raw_ms:>10.2f} {rollup_ms:>10.2f} {raw_ms / rollup_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+'''
+Serialization of invoices: the naive dict building against the compiled encoders of
+app/serialization.py, on ORM instances and on Core rows.
+
+- naive: {attr.key: jsonable(getattr(obj, attr.key)) for attr in mapper.column_attrs} per
+  instance, {key: jsonable(value) for key, value in row._mapping.items()} per row, json.dumps
+- compiled: encoder_for(Invoice) / row_encoder(columns)
+- the dicts to JSON: json.dumps, dumps() with the standard library and with orjson (if installed),
+  and the whole way with dumpable(), the datetimes formatted by orjson
+- loading is timed on its own: hydrating ORM instances costs more than the encoding
+
+python -m benchmarks.bench_serialization --invoices 100000
+'''
+
+import gc
+import json
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import inspect, insert, select
+
+from app import serialization
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceStatus
+from app.serialization import dumps, encoder_for, row_encoder
+from benchmarks.common import bench_app, bench_parser, jsonable, timed
+
+CUSTOMERS = 1000
+COLUMNS = tuple(getattr(Invoice, attr.key) for attr in inspect(Invoice).column_attrs)
+
+
+def seed(invoices, rng):
+    db.session.execute(insert(Customer), [
+        {"customer_id": f"C{i:08d}", "customer_name": f"Customer {i}", "customer_address": "Bench St"}
+        for i in range(1, CUSTOMERS + 1)
+    ])
+    statuses = [status.value for status in InvoiceStatus]
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, invoices + 1):
+        total = Decimal(rng.randrange(1000, 500000)) / 100
+        invoice_date = start + timedelta(minutes=i)
+        rows.append({
+            "public_invoice_id": f"INV{i:09d}",
+            "customer_fk_id": rng.randrange(1, CUSTOMERS + 1),
+            "status": rng.choice(statuses),
+            "subtotal": total,
+            "total_amount": total,
+            "outstanding_balance": total,
+            "invoice_date": invoice_date,
+            "invoice_due_date": invoice_date + timedelta(days=30),
+            "created": invoice_date,
+            "updated": invoice_date,
+        })
+        if len(rows) == 10000:
+            db.session.execute(insert(Invoice), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Invoice), rows)
+    db.session.commit()
+
+
+def naive_instance(obj, attrs):
+    return {attr.key: jsonable(getattr(obj, attr.key)) for attr in attrs}
+
+
+def naive_row(row):
+    return {key: jsonable(value) for key, value in row._mapping.items()}
+
+
+def main():
+    parser = bench_parser(__doc__)
+    parser.add_argument("--invoices", type=int, default=100000)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    n = args.invoices
+    with app.app_context():
+        seed(n, random.Random(7))
+        print(f"{n} invoices, json backend of dumps(): {serialization.BACKEND}\n")
+
+        with timed("load rows select(*columns)", n):
+            rows = db.session.execute(select(*COLUMNS)).all()
+        with timed("load ORM instances select(Invoice)", n):
+            instances = db.session.scalars(select(Invoice)).all()
+        # the loaded objects live until the end, and the collector out of the timings
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+
+        attrs = inspect(Invoice).column_attrs
+        encoder = encoder_for(Invoice)
+        encode_rows = row_encoder(COLUMNS)
+        with timed("naive instances to dicts", n):
+            naive = [naive_instance(obj, attrs) for obj in instances]
+        with timed("compiled instances to dicts", n):
+            compiled = encoder.many(instances)
+        with timed("naive rows to dicts", n):
+            naive_rows = [naive_row(row) for row in rows]
+        with timed("compiled rows to dicts", n):
+            compiled_rows = encode_rows.many(rows)
+
+        with timed("json.dumps", n):
+            json.dumps(compiled_rows)
+        backend, serialization.orjson = serialization.orjson, None
+        try:
+            with timed("dumps() stdlib json", n):
+                dumps(compiled_rows)
+        finally:
+            serialization.orjson = backend
+        if backend is not None:
+            with timed("dumps() orjson", n):
+                dumps(compiled_rows)
+            with timed("compiled rows dumpable() + orjson", n):
+                dumps(encode_rows.dumpable(rows))
+
+        assert compiled == naive and compiled_rows == naive_rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+'''
+Shared helpers for the benchmark scripts.
+
+benchmarks run against a throwaway SQLite file by default,
+pass --database-url (or BENCH_DATABASE_URL) to point them at MySQL instead
+
+run from the project root:
+python -m benchmarks.bench_invoice_ingest --invoices 5000
+'''
+
+import argparse
+import atexit
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import create_app
+from app.extensions import db
+
+
+def bench_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("BENCH_DATABASE_URL"),
+        help="database to run against (default: temporary sqlite file)",
+    )
+    return parser
+
+
+def bench_app(database_url=None, reset=True):
+    '''Flask app on a fresh schema (reset=False keeps the data). the caller runs inside app.app_context().'''
+    if database_url is None:
+        handle, path = tempfile.mkstemp(prefix="erp_bench_", suffix=".db")
+        os.close(handle)
+        atexit.register(os.remove, path)
+        database_url = f"sqlite:///{path}"
+
+    class BenchConfig:
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    app = create_app(BenchConfig)
+    if reset:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+    return app
+
+
+@contextmanager
+def timed(label, rows):
+    '''Print elapsed time and rows per second for the block.'''
+    start = time.perf_counter()
+    timing = {}
+    yield timing
+    elapsed = time.perf_counter() - start
+    timing["seconds"] = elapsed
+    timing["rows_per_second"] = rows / elapsed if elapsed else float("inf")
+    print(f"{label:<40} {rows:>9} rows {elapsed:>9.3f}s {timing['rows_per_second']:>12.0f} rows/s")
+
+
+def jsonable(value):
+    '''One value at a time, the naive baseline the compiled encoders (app/serialization.py) are timed against.'''
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,184 @@
+'''
+Synthetic datasets for the benchmark suite, at a configurable scale.
+
+everything is written with executemany inserts, then derived amounts and the aging
+summary come from the same set based services the app uses. generation is seeded,
+two runs at the same scale produce the same rows.
+'''
+
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.services.ar_aging import rebuild_aging
+from app.services.invoice_totals import recalculate_totals
+
+BATCH = 5000
+EPOCH = datetime(2025, 1, 1)
+
+
+@dataclass(frozen=True)
+class Scale:
+    customers: int
+    products: int
+    variants_per_product: int
+    invoices_per_customer: int
+    items_per_invoice: int
+    paid_ratio: float = 0.3 # share of invoices with a payment
+
+    @property
+    def invoices(self) -> int:
+        return self.customers * self.invoices_per_customer
+
+
+SCALES = {
+    "tiny": Scale(customers=50, products=100, variants_per_product=2, invoices_per_customer=4, items_per_invoice=2),
+    "small": Scale(customers=1000, products=2000, variants_per_product=3, invoices_per_customer=10, items_per_invoice=3),
+    "medium": Scale(customers=10000, products=20000, variants_per_product=3, invoices_per_customer=10, items_per_invoice=3),
+    "large": Scale(customers=50000, products=100000, variants_per_product=4, invoices_per_customer=20, items_per_invoice=4),
+}
+
+
+@dataclass
+class Dataset:
+    scale: Scale
+    seed: int
+    customer_ids: list[str] = field(default_factory=list) # Customer.customer_id
+    customer_pks: list[int] = field(default_factory=list)
+    skus: list[str] = field(default_factory=list)
+    public_product_ids: list[str] = field(default_factory=list)
+    open_invoice_ids: list[str] = field(default_factory=list) # public ids of unpaid invoices
+    rows: dict[str, int] = field(default_factory=dict)
+
+    def describe(self) -> dict:
+        return {"scale": asdict(self.scale), "seed": self.seed, "rows": self.rows}
+
+
+def _insert(model, rows) -> int:
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            db.session.execute(insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        count += len(batch)
+    return count
+
+
+def build_dataset(scale: Scale, seed: int = 1) -> Dataset:
+    '''Fill an empty schema. the caller runs inside an app context.'''
+    rng = random.Random(seed)
+    dataset = Dataset(scale=scale, seed=seed)
+    rows = dataset.rows
+
+    rows["customers"] = _insert(Customer, (
+        {
+            "customer_id": f"C{i:08d}",
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@example.com",
+            "customer_address": f"{i} Main St",
+        }
+        for i in range(scale.customers)
+    ))
+    rows["products"] = _insert(Product, (
+        {
+            "public_product_id": f"P{i:08d}",
+            "product_name": f"Product {i}",
+            "sku": f"SKU{i:08d}",
+            "brand": f"Brand {i % 50}",
+            "product_category": f"Category {i % 20}",
+            "product_description": "Synthetic benchmark product",
+            "url": f"https://shop.example.com/p/{i}",
+        }
+        for i in range(scale.products)
+    ))
+    db.session.commit()
+
+    customers = db.session.execute(select(Customer.customer_id, Customer.id).order_by(Customer.id)).all()
+    products = db.session.execute(select(Product.sku, Product.id, Product.public_product_id).order_by(Product.id)).all()
+    dataset.customer_ids = [row[0] for row in customers]
+    dataset.customer_pks = [row[1] for row in customers]
+    dataset.skus = [row[0] for row in products]
+    dataset.public_product_ids = [row[2] for row in products]
+    product_pks = [row[1] for row in products]
+
+    sizes = ("S", "M", "L", "XL")
+    rows["product_variants"] = _insert(ProductVariant, (
+        {
+            "product_fk_id": product_id,
+            "color": f"color{v}",
+            "size": sizes[v % len(sizes)],
+            "price": Decimal(rng.randint(100, 20000)).scaleb(-2),
+            "inventory_stock": stock,
+            "has_stock": stock > 0,
+        }
+        for product_id in product_pks
+        for v in range(scale.variants_per_product)
+        for stock in (rng.randint(0, 500),)
+    ))
+
+    rows["invoices"] = _insert(Invoice, (
+        {
+            "public_invoice_id": f"INV{n:09d}",
+            "customer_fk_id": dataset.customer_pks[n // scale.invoices_per_customer],
+            "status": InvoiceStatus.pending.value,
+            "shipping_amount": Decimal("4.99"),
+            "invoice_date": EPOCH + timedelta(hours=n % 8760),
+            "invoice_due_date": EPOCH + timedelta(hours=n % 8760, days=30),
+        }
+        for n in range(scale.invoices)
+    ))
+    db.session.commit()
+
+    first_invoice = db.session.scalar(select(Invoice.id).order_by(Invoice.id).limit(1)) or 0
+    invoice_pks = range(first_invoice, first_invoice + scale.invoices)
+    rows["invoice_items"] = _insert(InvoiceItem, (
+        {
+            "invoice_fk_id": invoice_id,
+            "product_fk_id": rng.choice(product_pks),
+            "quantity": quantity,
+            "unit_price": price,
+            "line_total": price * quantity,
+        }
+        for invoice_id in invoice_pks
+        for _ in range(scale.items_per_invoice)
+        for quantity, price in ((rng.randint(1, 5), Decimal(rng.randint(100, 5000)).scaleb(-2)),)
+    ))
+    rows["invoice_taxes"] = _insert(InvoiceTax, (
+        {"invoice_fk_id": invoice_id, "tax_rate_percent": Decimal("13.00"), "tax_amount": Decimal("0.00")}
+        for invoice_id in invoice_pks
+    ))
+    paid = set(rng.sample(range(scale.invoices), int(scale.invoices * scale.paid_ratio)))
+    rows["payments"] = _insert(Payment, (
+        {
+            "public_payment_id": f"PAY{n:09d}",
+            "payment_reference": f"REF{n:09d}",
+            "invoice_fk_id": first_invoice + n,
+            "payment_amount": Decimal("10.00"),
+            "payment_date": EPOCH + timedelta(hours=n % 8760, days=5),
+            "payment_method": "card",
+        }
+        for n in sorted(paid)
+    ))
+    db.session.commit()
+
+    recalculate_totals(db.session, chunk_size=2000)
+    rebuild_aging(db.session)
+    dataset.open_invoice_ids = list(db.session.scalars(
+        select(Invoice.public_invoice_id)
+        .where(Invoice.status == InvoiceStatus.pending.value)
+        .order_by(Invoice.id)
+    ))
+    return dataset
@@ -0,0 +1,46 @@
+"""customer ar aging
+
+customer_ar_aging (app/models/aging.py), materialized per customer aging
+(app/services/ar_aging.py). fill it with flask aging rebuild.
+
+split out of 0001: a database that had the schema before the aging table, stamped at
+0001, gets it here. one built by the earlier 0001 already has it and skips the create.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 16:51:04.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('customer_ar_aging'):
+        return
+    op.create_table('customer_ar_aging',
+    sa.Column('customer_fk_id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('current_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('days_1_30', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('days_31_60', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('days_61_90', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('days_over_90', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_outstanding', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('open_invoices', sa.BigInteger(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.Column('updated', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_fk_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('customer_fk_id')
+    )
+
+
+def downgrade():
+    op.drop_table('customer_ar_aging')
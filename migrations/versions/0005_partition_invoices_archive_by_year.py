@@ -0,0 +1,50 @@
+"""partition invoices archive by year
+
+mysql only, other databases skip it. RANGE partitions on YEAR(invoice_date), a scan of
+a date range reads only its years and a year can be dropped with DROP PARTITION.
+years after FIRST_YEAR + len land in pmax until `flask invoices archive-partitions`
+splits new ones off it.
+
+the live invoices table is not partitioned: mysql does not partition tables that have
+or are referenced by foreign keys, see app/models/archive.py
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:15:02.661482
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+FIRST_YEAR = 2020
+LAST_YEAR = 2027
+
+
+def _mysql():
+    return op.get_bind().dialect.name == 'mysql'
+
+
+def upgrade():
+    if not _mysql():
+        return
+    partitions = ", ".join(
+        f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in range(FIRST_YEAR, LAST_YEAR + 1)
+    )
+    op.execute(
+        "ALTER TABLE invoices_archive PARTITION BY RANGE (YEAR(invoice_date)) "
+        f"(PARTITION p{FIRST_YEAR - 1} VALUES LESS THAN ({FIRST_YEAR}), {partitions}, "
+        "PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    )
+
+
+def downgrade():
+    if not _mysql():
+        return
+    op.execute("ALTER TABLE invoices_archive REMOVE PARTITIONING")
@@ -0,0 +1,60 @@
+"""product search index
+
+full text index over product_name, brand, product_category and product_description
+(app/services/product_search.py):
+- mysql: FULLTEXT index ft_products_search (innodb), built in place from the existing rows
+- sqlite: FTS5 table products_search with content from products and sync triggers,
+  filled from the existing rows by 'rebuild'
+other databases skip it. autogenerate does not see either (app/extensions.py).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:32:12.238152
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = ['product_name', 'brand', 'product_category', 'product_description']
+_columns = ", ".join(COLUMNS)
+_new = ", ".join(f"new.{column}" for column in COLUMNS)
+_old = ", ".join(f"old.{column}" for column in COLUMNS)
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE products_search USING fts5({_columns}, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER products_search_insert AFTER INSERT ON products BEGIN "
+    f"INSERT INTO products_search(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER products_search_delete AFTER DELETE ON products BEGIN "
+    f"INSERT INTO products_search(products_search, rowid, {_columns}) VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER products_search_update AFTER UPDATE OF {_columns} ON products BEGIN "
+    f"INSERT INTO products_search(products_search, rowid, {_columns}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO products_search(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    "INSERT INTO products_search(products_search) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ft_products_search', 'products', COLUMNS, unique=False, mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_products_search', table_name='products')
+    elif dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS products_search_{trigger}")
+        op.execute("DROP TABLE IF EXISTS products_search")
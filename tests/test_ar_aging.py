@@ -0,0 +1,135 @@
+#!/bin/env python
+
+'''
+Tests for the materialized accounts receivable aging (app/services/ar_aging.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Buckets are computed against a fixed as_of day or against today's date.
+'''
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete
+
+from app.models.aging import CustomerAging
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payments import Payment
+from app.services.ar_aging import get_customer_aging, rebuild_aging, today
+from app.services.invoice_totals import recalculate_totals
+
+
+def _customer(session, customer_id):
+    customer = Customer(
+        customer_id=customer_id,
+        customer_name="Aging Customer",
+        customer_address="Aging St",
+    )
+    session.add(customer)
+    session.commit()
+    return customer
+
+
+def _invoice(session, customer, public_invoice_id, days_overdue, balance, status=InvoiceStatus.pending):
+    due = datetime.combine(today() - timedelta(days=days_overdue), time(12))
+    invoice = Invoice(
+        public_invoice_id=public_invoice_id,
+        customer_fk_id=customer.id,
+        invoice_due_date=due,
+        status=status.value,
+        total_amount=Decimal(balance),
+        outstanding_balance=Decimal(balance),
+    )
+    session.add(invoice)
+    return invoice
+
+
+def test_aging_refreshed_on_commit(session):
+    """Flushing invoices refreshes the customer's aging row in the same transaction."""
+    customer = _customer(session, "CUST-AGE-001")
+    _invoice(session, customer, "INV-AGE-001", -5, "100.00")
+    _invoice(session, customer, "INV-AGE-002", 10, "50.00")
+    _invoice(session, customer, "INV-AGE-003", 45, "20.00", InvoiceStatus.overdue)
+    _invoice(session, customer, "INV-AGE-004", 75, "5.00", InvoiceStatus.overdue)
+    _invoice(session, customer, "INV-AGE-005", 120, "1.25", InvoiceStatus.overdue)
+    _invoice(session, customer, "INV-AGE-006", 120, "999.00", InvoiceStatus.paid)
+    session.commit()
+
+    aging = get_customer_aging(customer.id, session=session)
+    assert aging.current_amount == Decimal("100.00")
+    assert aging.days_1_30 == Decimal("50.00")
+    assert aging.days_31_60 == Decimal("20.00")
+    assert aging.days_61_90 == Decimal("5.00")
+    assert aging.days_over_90 == Decimal("1.25")
+    assert aging.total_outstanding == Decimal("176.25")
+    assert aging.open_invoices == 5
+    assert aging.as_of == today()
+
+
+def test_aging_follows_invoice_and_payment_changes(session):
+    """Updating an invoice or adding a payment refreshes only that customer."""
+    customer = _customer(session, "CUST-AGE-002")
+    invoice = _invoice(session, customer, "INV-AGE-010", 10, "40.00")
+    session.commit()
+    assert get_customer_aging(customer.id, session=session).days_1_30 == Decimal("40.00")
+
+    invoice.status = InvoiceStatus.paid.value
+    session.commit()
+    session.expire_all()
+    assert get_customer_aging(customer.id, session=session) is None
+
+    other = _invoice(session, customer, "INV-AGE-011", 0, "12.00")
+    session.commit()
+    session.add(Payment(
+        public_payment_id="PAY-AGE-011",
+        invoice_fk_id=other.id,
+        payment_amount=Decimal("2.00"),
+        payment_reference="REF-AGE-011",
+        payment_method="card",
+    ))
+    session.commit()
+    recalculate_totals(session, invoice_ids=[other.id])
+    session.expire_all()
+    # no items, so the totals engine zeroes the invoice and the aging follows
+    assert get_customer_aging(customer.id, session=session) is None
+
+
+def test_rebuild_command(app, session):
+    """flask aging rebuild recomputes every customer."""
+    customer = _customer(session, "CUST-AGE-003")
+    _invoice(session, customer, "INV-AGE-020", 35, "7.50")
+    session.commit()
+    session.execute(delete(CustomerAging).where(CustomerAging.customer_fk_id == customer.id))
+    session.commit()
+    assert get_customer_aging(customer.id, session=session) is None
+
+    result = app.test_cli_runner().invoke(args=["aging", "rebuild"])
+    assert result.exit_code == 0, result.output
+    session.expire_all()
+    assert get_customer_aging(customer.id, session=session).days_31_60 == Decimal("7.50")
+
+
+def test_rebuild_as_of(session):
+    """Buckets are relative to the as_of day."""
+    customer = _customer(session, "CUST-AGE-004")
+    _invoice(session, customer, "INV-AGE-030", 0, "3.00")
+    session.commit()
+
+    rebuild_aging(session, as_of=today() + timedelta(days=61))
+    aging = get_customer_aging(customer.id, session=session)
+    assert aging.days_61_90 == Decimal("3.00")
+    assert aging.current_amount == Decimal("0.00")
+    rebuild_aging(session)
+
+
+def test_aging_route(app, session):
+    customer = _customer(session, "CUST-AGE-005")
+    _invoice(session, customer, "INV-AGE-040", 100, "9.99", InvoiceStatus.overdue)
+    session.commit()
+
+    client = app.test_client()
+    body = client.get("/customers/CUST-AGE-005/aging").get_json()
+    assert body["days_over_90"] == "9.99"
+    assert body["open_invoices"] == 1
+    assert client.get("/customers/CUST-AGE-MISSING/aging").status_code == 404
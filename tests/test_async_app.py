@@ -0,0 +1,124 @@
+#!/bin/env python
+
+'''
+Tests for the async serving mode (app/asgi.py) on aiosqlite.
+
+- The async app gets its own sqlite file, seeded through a sync session, and its
+  payloads are compared with the shared read functions the flask routes call.
+- Requests go straight to the ASGI callable, no server and no http client needed.
+'''
+
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("starlette")
+
+from app.asgi import async_database_uri, create_async_app
+from app.extensions import db
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.services.read_api import customer_detail, invoice_detail, product_page
+
+
+async def _get(app, path, query=""):
+    '''status and decoded JSON body of one GET through the ASGI interface.'''
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [], "server": ("test", 80), "client": ("test", 1),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    status = next(message["status"] for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return status, json.loads(body)
+
+
+@pytest.fixture
+def database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        customer = Customer(customer_id="CUST-ASYNC-1", customer_name="Async", customer_address="Async St")
+        product = Product(
+            public_product_id="PID-ASYNC-1", product_name="Async Product", sku="SKU-ASYNC-1",
+            brand="Brand", product_category="Category", product_description="For async tests",
+        )
+        product.children_variants = [
+            ProductVariant(color="red", size="M", price=Decimal("9.99"), inventory_stock=3, has_stock=True),
+            ProductVariant(color="blue", size="L", price=Decimal("9.99"), inventory_stock=0, is_active=False),
+        ]
+        session.add_all([customer, product])
+        session.flush()
+        invoice = Invoice(
+            public_invoice_id="INV-ASYNC-1", customer_fk_id=customer.id, invoice_due_date=datetime(2099, 1, 1),
+            subtotal=Decimal("19.98"), total_amount=Decimal("19.98"), outstanding_balance=Decimal("9.98"),
+        )
+        invoice.items.append(InvoiceItem(product_fk_id=product.id, quantity=2,
+                                         unit_price=Decimal("9.99"), line_total=Decimal("19.98")))
+        invoice.taxes.append(InvoiceTax(tax_rate_percent=Decimal("13.00"), tax_amount=Decimal("0.00")))
+        invoice.payments.append(Payment(public_payment_id="PAY-ASYNC-1", payment_reference="REF-ASYNC-1",
+                                        payment_amount=Decimal("10.00"), payment_method="card"))
+        session.add(invoice)
+        session.commit()
+    yield url, engine
+    engine.dispose()
+
+
+def _async_app(url):
+    class AsyncConfig:
+        SQLALCHEMY_DATABASE_URI = url
+    return create_async_app(AsyncConfig)
+
+
+def test_async_database_uri():
+    assert async_database_uri("mysql+pymysql://erp:erp@db:3306/erp") == "mysql+aiomysql://erp:erp@db:3306/erp"
+    assert async_database_uri("sqlite:////tmp/erp.db") == "sqlite+aiosqlite:////tmp/erp.db"
+    with pytest.raises(ValueError, match="no async driver"):
+        async_database_uri("postgresql://erp@db/erp")
+
+
+def test_async_payloads_match_sync_reads(database):
+    url, engine = database
+    app = _async_app(url)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                _get(app, "/customers/CUST-ASYNC-1"),
+                _get(app, "/invoices/INV-ASYNC-1"),
+                _get(app, "/products", "limit=10"),
+                _get(app, "/invoices/INV-NOPE"),
+                _get(app, "/products", "limit=0"),
+            )
+        finally:
+            await app.state.engine.dispose()
+
+    customer, invoice, products, missing, bad = asyncio.run(run())
+
+    with Session(engine) as session:
+        assert customer == (200, customer_detail(session, "CUST-ASYNC-1"))
+        assert invoice == (200, invoice_detail(session, "INV-ASYNC-1"))
+        assert products == (200, json.loads(json.dumps(product_page(session, {"limit": "10"}))))
+    assert invoice[1]["items"][0]["sku"] == "SKU-ASYNC-1"
+    assert invoice[1]["payments"][0]["payment_amount"] == "10.00"
+    assert [variant["color"] for variant in products[1]["items"][0]["variants"]] == ["red"]
+    assert missing[0] == 404
+    assert bad == (400, {"error": "limit must be between 1 and 500"})
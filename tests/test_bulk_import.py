@@ -0,0 +1,183 @@
+#!/bin/env python
+
+'''
+Tests for the streaming customer/product import (app/services/bulk_import.py).
+
+- Files are written to tmp_path; keys carry a per-test tag.
+'''
+
+import json
+
+import pytest
+from decimal import Decimal
+from sqlalchemy import select
+
+from app.models.customers import Customer
+from app.models.jobs import JobCheckpoint
+from app.models.products import Product, ProductVariant
+from app.services import bulk_import
+from app.services.bulk_import import checkpoint_name, import_file
+
+
+@pytest.fixture
+def tag(request):
+    return request.node.name[-10:]
+
+
+def _write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(row) for row in rows]) + "\n")
+    return str(path)
+
+
+def _rejects(path):
+    return [json.loads(line) for line in open(path)]
+
+
+def test_import_customers_csv_upserts_on_rerun(session, tmp_path, tag):
+    """A second run updates the rows instead of failing on customer_id."""
+    header = ["customer_id", "customer_name", "customer_address", "customer_email"]
+    path = _write_csv(tmp_path / "customers.csv", header, [
+        [f"C-{tag}-1", "First", "1 Road", "first@example.com"],
+        [f"C-{tag}-2", "Second", "2 Road", ""],
+        [f"C-{tag}-3", "", "3 Road", ""],
+        [f"C-{tag}-4", "Fourth", "4 Road", "not-an-email"],
+        [f"C-{tag}-2", "Second Again", "2 Road", ""],
+    ])
+
+    report = import_file("customers", path, chunk_size=2, session=session)
+
+    assert report.completed
+    assert report.rows_read == 5
+    assert report.rejected == 2
+    assert [reject["line"] for reject in _rejects(f"{path}.rejects.ndjson")] == [3, 4]
+    assert [stage.name for stage in report.stages] == ["read", "validate", "dedupe", "write"]
+    assert report.stages[0].rows == 5 and report.stages[1].rows == 3
+
+    _write_csv(tmp_path / "customers.csv", header, [[f"C-{tag}-1", "First Renamed", "1 Road", ""]])
+    import_file("customers", path, session=session)
+
+    names = dict(session.execute(
+        select(Customer.customer_id, Customer.customer_name)
+        .where(Customer.customer_id.like(f"C-{tag}-%"))
+    ).all())
+    assert names == {f"C-{tag}-1": "First Renamed", f"C-{tag}-2": "Second Again"}
+
+
+def test_import_products_merges_variant_rows(session, tmp_path, tag):
+    """One CSV row per variant; a rerun updates variants matched on color and size."""
+    header = ["sku", "product_name", "brand", "product_category", "product_description",
+              "color", "size", "price", "inventory_stock"]
+    base = [f"SKU-{tag}", f"Shirt {tag}", "Brand", "Tops", "A shirt"]
+    path = _write_csv(tmp_path / "products.csv", header, [
+        base + ["red", "M", "10.00", "5"],
+        base + ["red", "L", "11.00", "0"],
+        base + ["blue", "M", "-1", "1"],
+    ])
+
+    report = import_file("products", path, session=session)
+    assert report.rows_written == 1 and report.rejected == 1
+
+    product = session.scalar(select(Product).where(Product.sku == f"SKU-{tag}"))
+    public_id = product.public_product_id
+    assert public_id
+
+    _write_csv(tmp_path / "products.csv", header, [base + ["red", "M", "12.50", "0"]])
+    import_file("products", path, session=session)
+
+    session.expire_all()
+    variants = {
+        (variant.color, variant.size): (variant.price, variant.inventory_stock, variant.has_stock)
+        for variant in session.scalars(
+            select(ProductVariant).where(ProductVariant.product_fk_id == product.id)
+        )
+    }
+    assert variants == {
+        ("red", "M"): (Decimal("12.50"), 0, False),
+        ("red", "L"): (Decimal("11.00"), 0, False),
+    }
+    assert product.public_product_id == public_id
+
+
+def test_import_products_rejects_names_owned_by_other_skus(session, tmp_path, tag):
+    """product_name and url are unique too, a row reusing them for a new sku is rejected."""
+    lines = [
+        {"sku": f"A-{tag}", "product_name": f"Lamp {tag}", "brand": "B", "product_category": "C",
+         "product_description": "D", "url": f"https://shop/{tag}/lamp",
+         "variants": [{"color": "white", "price": "20.00", "inventory_stock": 3}]},
+        {"sku": f"B-{tag}", "product_name": f"Lamp {tag}", "brand": "B", "product_category": "C",
+         "product_description": "D"},
+        {"sku": f"C-{tag}", "product_name": f"Desk {tag}", "brand": "B", "product_category": "C",
+         "product_description": "D", "url": f"https://shop/{tag}/lamp"},
+    ]
+    path = tmp_path / "products.ndjson"
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n{not json\n")
+
+    report = import_file("products", str(path), session=session)
+
+    assert report.rows_written == 1
+    rejects = _rejects(f"{path}.rejects.ndjson")
+    assert [reject["line"] for reject in rejects] == [2, 3, 4]
+    assert "already belongs to sku" in rejects[0]["reason"]
+    assert "invalid json" in rejects[2]["reason"]
+    assert session.scalar(select(Product.id).where(Product.sku == f"B-{tag}")) is None
+
+
+def test_import_resumes_from_checkpoint(session, tmp_path, tag, monkeypatch):
+    """A run that dies mid-file resumes after the last committed chunk."""
+    header = ["customer_id", "customer_name", "customer_address"]
+    path = _write_csv(tmp_path / f"resume-{tag}.csv", header, [
+        [f"R-{tag}-{i}", f"Customer {i}", "Road"] for i in range(1, 6)
+    ])
+
+    real_write = bulk_import._write_customers
+    calls = []
+
+    def failing_write(session_, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        real_write(session_, rows)
+
+    monkeypatch.setattr(bulk_import, "WRITERS", {"customers": failing_write})
+    with pytest.raises(RuntimeError):
+        import_file("customers", path, chunk_size=2, session=session)
+    session.rollback()
+    assert session.get(JobCheckpoint, checkpoint_name("customers", path)).position == 2
+
+    monkeypatch.setattr(bulk_import, "WRITERS", {"customers": real_write})
+    report = import_file("customers", path, chunk_size=2, session=session)
+
+    assert report.rows_read == 3
+    assert report.completed
+    assert session.get(JobCheckpoint, checkpoint_name("customers", path)).position == 0
+    assert len(session.scalars(
+        select(Customer.id).where(Customer.customer_id.like(f"R-{tag}-%"))
+    ).all()) == 5
+
+
+def test_rejects_are_flushed_every_chunk(session, tmp_path, tag, monkeypatch):
+    """A file of bad rows holds at most chunk_size rejects in memory and moves the checkpoint."""
+    header = ["customer_id", "customer_name", "customer_address"]
+    path = _write_csv(tmp_path / "customers.csv", header, [[f"X-{tag}-{i}", "", "Road"] for i in range(1, 6)])
+    positions = []
+    real_flush = bulk_import._flush_rejects
+
+    def flush(rejects_file, rejects, report):
+        assert len(rejects) <= 2
+        positions.append(report.position)
+        real_flush(rejects_file, rejects, report)
+
+    monkeypatch.setattr(bulk_import, "_flush_rejects", flush)
+    report = import_file("customers", path, chunk_size=2, session=session)
+
+    assert report.rejected == 5 and report.rows_written == 0
+    assert positions[:2] == [2, 4]
+    assert [reject["line"] for reject in _rejects(f"{path}.rejects.ndjson")] == [1, 2, 3, 4, 5]
+
+
+def test_checkpoint_is_per_path(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first, second = tmp_path / "a" / "customers.csv", tmp_path / "b" / "customers.csv"
+    assert checkpoint_name("customers", str(first)) != checkpoint_name("customers", str(second))
+    assert len(checkpoint_name("customers", str(tmp_path / ("x" * 200) / "customers.csv"))) <= 100
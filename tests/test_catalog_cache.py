@@ -0,0 +1,130 @@
+#!/bin/env python
+
+'''
+Tests for the in-process product catalog cache (app/services/catalog_cache.py).
+
+- CatalogCache instances with a fake clock test LRU and TTL behaviour.
+- The shared catalog_cache is used where invalidation through session events is tested.
+'''
+
+import dataclasses
+import pytest
+from decimal import Decimal
+
+from app.models.products import Product, ProductVariant
+from app.services.catalog_cache import CatalogCache, catalog_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _product(session, suffix, price="10.00"):
+    product = session.query(Product).filter_by(public_product_id=f"PID-CACHE-{suffix}").first()
+    if product is not None:
+        return product
+    product = Product(
+        public_product_id=f"PID-CACHE-{suffix}",
+        product_name=f"Cache Product {suffix}",
+        sku=f"SKU-CACHE-{suffix}",
+        brand="Brand",
+        product_category="Category",
+        product_description="For cache tests",
+    )
+    session.add(product)
+    session.flush()
+    session.add(ProductVariant(
+        product_fk_id=product.id, price=Decimal(price), inventory_stock=3, has_stock=True,
+    ))
+    session.commit()
+    return product
+
+
+def test_hit_by_public_id_and_sku(session):
+    """Both keys resolve to one cached snapshot."""
+    product = _product(session, "001")
+    cache = CatalogCache(maxsize=10, ttl=60)
+
+    first = cache.get_by_public_id("PID-CACHE-001", session=session)
+    assert first.id == product.id
+    assert first.variants[0].price == Decimal("10.00")
+    assert cache.get_by_sku("SKU-CACHE-001", session=session) is first
+    assert cache.get_by_public_id("PID-MISSING", session=session) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+
+
+def test_snapshots_are_immutable(session):
+    _product(session, "001")
+    snapshot = CatalogCache().get_by_sku("SKU-CACHE-001", session=session)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.sku = "other"
+
+
+def test_lru_eviction_and_ttl(session):
+    for suffix in ("001", "002", "003"):
+        _product(session, suffix)
+    clock = FakeClock()
+    cache = CatalogCache(maxsize=2, ttl=30, clock=clock)
+
+    cache.get_by_sku("SKU-CACHE-001", session=session)
+    cache.get_by_sku("SKU-CACHE-002", session=session)
+    cache.get_by_sku("SKU-CACHE-001", session=session)  # 002 is now least recently used
+    cache.get_by_sku("SKU-CACHE-003", session=session)
+    assert cache.stats()["evictions"] == 1
+
+    cache.get_by_sku("SKU-CACHE-001", session=session)
+    assert cache.stats()["misses"] == 3
+    cache.get_by_sku("SKU-CACHE-002", session=session)
+    assert cache.stats()["misses"] == 4
+
+    clock.now = 31
+    cache.get_by_sku("SKU-CACHE-002", session=session)
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["misses"] == 5
+
+
+def test_invalidated_on_product_and_variant_writes(session):
+    """Committed writes through the session drop the cached snapshot."""
+    product = _product(session, "004")
+    catalog_cache.clear()
+    assert catalog_cache.get_by_sku("SKU-CACHE-004", session=session).brand == "Brand"
+
+    product.brand = "Renamed"
+    session.commit()
+    assert catalog_cache.get_by_sku("SKU-CACHE-004", session=session).brand == "Renamed"
+
+    variant = session.query(ProductVariant).filter_by(product_fk_id=product.id).one()
+    variant.price = Decimal("12.50")
+    session.commit()
+    snapshot = catalog_cache.get_by_public_id("PID-CACHE-004", session=session)
+    assert snapshot.variants[0].price == Decimal("12.50")
+    assert catalog_cache.stats()["invalidations"] >= 2
+
+
+def test_rolled_back_writes_are_not_cached(session):
+    """A read of a flushed but uncommitted row is not shared, and is gone after the rollback."""
+    product = _product(session, "005")
+    catalog_cache.clear()
+
+    product.brand = "Uncommitted"
+    session.flush()
+    uncommitted = catalog_cache.get_by_sku("SKU-CACHE-005", session=session)
+    assert uncommitted.brand == "Uncommitted"
+    assert catalog_cache.stats()["size"] == 0
+    # as if another request had cached the row meanwhile
+    catalog_cache._store(uncommitted)
+    session.rollback()
+
+    assert catalog_cache.get_by_sku("SKU-CACHE-005", session=session).brand == "Brand"
+
+
+def test_cache_stats_route(app, db_):
+    body = app.test_client().get("/health/catalog-cache").get_json()
+    assert {"hits", "misses", "evictions", "size"} <= set(body)
@@ -0,0 +1,103 @@
+#!/bin/env python
+
+'''
+Tests for read replica routing (app/db_routing.py).
+
+Two SQLite files stand in for the MySQL primary and its replica. There is no
+replication, so a row only visible in one file shows which database answered.
+'''
+
+import pytest
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db
+from app.db_routing import use_primary, use_replica
+from app.models.customers import Customer
+
+
+@pytest.fixture
+def routed_app(tmp_path):
+    class ReplicaConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all()
+        replica = app.extensions["db_replicas"][0]
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(insert(Customer.__table__), [{
+                "customer_id": "CUST-REPLICA",
+                "customer_name": "Only on the replica",
+                "customer_address": "Replica St",
+            }])
+        yield app
+        db.session.remove()
+
+
+def _visible(customer_id):
+    return db.session.query(Customer).filter_by(customer_id=customer_id).first() is not None
+
+
+def test_reads_go_to_replica(routed_app):
+    """A plain read is answered by the replica."""
+    assert _visible("CUST-REPLICA")
+
+
+def test_writes_go_to_primary_and_read_your_writes(routed_app):
+    """Writes land on the primary and reads after them stay there for the rest of the request."""
+    with routed_app.test_request_context():
+        db.session.add(Customer(
+            customer_id="CUST-PRIMARY",
+            customer_name="Written to the primary",
+            customer_address="Primary St",
+        ))
+        db.session.flush()
+        assert _visible("CUST-PRIMARY")
+        assert not _visible("CUST-REPLICA")
+        db.session.commit()
+
+        # committed, a lagging replica may not have it yet: still the primary
+        assert _visible("CUST-PRIMARY")
+
+    # next request, back on the replica which never received the row
+    assert not _visible("CUST-PRIMARY")
+    assert _visible("CUST-REPLICA")
+
+
+def test_use_primary_override(routed_app):
+    """use_primary() pins reads to the primary, as a block or a decorator."""
+    with routed_app.test_request_context():
+        db.session.add(Customer(
+            customer_id="CUST-PINNED",
+            customer_name="Pinned",
+            customer_address="Primary St",
+        ))
+        db.session.commit()
+
+    with use_primary():
+        assert _visible("CUST-PINNED")
+
+    @use_primary()
+    def view():
+        return _visible("CUST-PINNED")
+
+    assert view()
+    assert not _visible("CUST-PINNED")
+
+
+def test_use_replica_override(routed_app):
+    """use_replica() reads from the replica even after the transaction wrote."""
+    db.session.add(Customer(
+        customer_id="CUST-FORCED",
+        customer_name="Forced",
+        customer_address="Primary St",
+    ))
+    db.session.flush()
+    with use_replica():
+        assert _visible("CUST-REPLICA")
+    db.session.rollback()
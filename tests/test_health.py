@@ -0,0 +1,72 @@
+#!/bin/env python
+
+'''
+Tests for the health routes and the pool options read from the environment.
+'''
+
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.config import engine_options_from_env
+from app.routes.health import pool_stats
+
+
+MYSQL_URI = "mysql+pymysql://erp:erp@db:3306/erp"
+
+
+def test_engine_options_defaults():
+    """MySQL gets a sized pool with pre-ping and recycle below wait_timeout."""
+    options = engine_options_from_env(MYSQL_URI, environ={})
+    assert options == {
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+    }
+
+
+def test_engine_options_from_environment():
+    """Every pool setting can be overridden through the environment."""
+    environ = {
+        "DB_POOL_SIZE": "5",
+        "DB_MAX_OVERFLOW": "0",
+        "DB_POOL_TIMEOUT": "3",
+        "DB_POOL_RECYCLE": "600",
+        "DB_POOL_PRE_PING": "false",
+    }
+    options = engine_options_from_env(MYSQL_URI, environ=environ)
+    assert options == {
+        "pool_pre_ping": False,
+        "pool_recycle": 600,
+        "pool_size": 5,
+        "max_overflow": 0,
+        "pool_timeout": 3,
+    }
+
+
+def test_engine_options_nullpool_and_sqlite():
+    """NullPool mode drops pool sizing, sqlite never gets QueuePool sizing."""
+    assert engine_options_from_env(MYSQL_URI, environ={"DB_NULLPOOL": "1"}) == {
+        "poolclass": NullPool
+    }
+    options = engine_options_from_env("sqlite:///erp.db", environ={})
+    assert "pool_size" not in options
+
+
+def test_pool_stats_queue_pool():
+    """QueuePool reports size, checked in/out and overflow."""
+    pool = QueuePool(lambda: None, pool_size=2, max_overflow=1)
+    stats = pool_stats(pool)
+    assert stats["pool"] == "QueuePool"
+    assert stats["size"] == 2
+    assert stats["checkedout"] == 0
+
+
+def test_health_db_route(app, db_):
+    """/health/db checks out a connection and reports pool statistics."""
+    response = app.test_client().get("/health/db")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "ok"
+    assert body["wait_ms"] >= 0
+    assert "pool" in body
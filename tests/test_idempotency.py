@@ -0,0 +1,203 @@
+#!/bin/env python
+
+'''
+Tests for the Idempotency-Key store (app/services/idempotency.py) and the write
+endpoints that use it (POST /invoices, POST /payments).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Each test clears the in-process front store, replays from the database are tested
+  by clearing it again in the middle.
+'''
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.customers import Customer
+from app.models.idempotency import IdempotencyKey
+from app.models.invoice import Invoice
+from app.models.payments import Payment
+from app.models.products import Product
+from app.services.idempotency import idempotency, purge_expired, request_hash
+
+
+@pytest.fixture(autouse=True)
+def front_store():
+    idempotency.clear()
+    yield idempotency.store
+    idempotency.clear()
+
+
+@pytest.fixture
+def shop(session):
+    session.add(Customer(customer_id="CUST-IDEM-001", customer_name="Idempotent", customer_address="Retry St"))
+    session.add(Product(
+        public_product_id="IDEM-PID-001", product_name="Idempotent Product", sku="IDEM-SKU-001",
+        brand="Idem", product_category="Idem", product_description="idempotency test product",
+    ))
+    session.commit()
+
+
+def _invoice_body(public_invoice_id="INV-IDEM-001"):
+    return {
+        "public_invoice_id": public_invoice_id,
+        "customer_id": "CUST-IDEM-001",
+        "invoice_due_date": "2026-12-31T00:00:00",
+        "items": [{"public_product_id": "IDEM-PID-001", "quantity": 2, "unit_price": "12.50"}],
+        "taxes": [{"tax_rate_percent": "10"}],
+    }
+
+
+def _count(session, model):
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_replay_returns_the_first_response(client, session, shop):
+    headers = {"Idempotency-Key": "create-001"}
+    first = client.post("/invoices", json=_invoice_body(), headers=headers)
+    assert first.status_code == 201
+    assert first.get_json()["total_amount"] == "27.50"
+    assert "Idempotent-Replayed" not in first.headers
+    invoices = _count(session, Invoice)
+
+    # from the front store, then from the table
+    replay = client.post("/invoices", json=_invoice_body(), headers=headers)
+    idempotency.clear()
+    replay_from_db = client.post("/invoices", json=_invoice_body(), headers=headers)
+
+    for response in (replay, replay_from_db):
+        assert response.status_code == 201
+        assert response.headers["Idempotent-Replayed"] == "true"
+        assert response.data == first.data
+    assert _count(session, Invoice) == invoices
+    row = session.get(IdempotencyKey, ("invoices.create", "create-001"))
+    assert (row.status_code, row.locked_until) == (201, None)
+
+
+def test_key_reuse_and_plain_retries(client, session, shop):
+    headers = {"Idempotency-Key": "create-002"}
+    assert client.post("/invoices", json=_invoice_body("INV-IDEM-002"), headers=headers).status_code == 201
+    # same key, another body
+    assert client.post("/invoices", json=_invoice_body("INV-IDEM-003"), headers=headers).status_code == 422
+    # no key: the unique public id still catches the retry
+    assert client.post("/invoices", json=_invoice_body("INV-IDEM-002")).status_code == 409
+    # the same key on another endpoint is another key
+    response = client.post("/payments", headers=headers, json={
+        "public_payment_id": "PAY-IDEM-001", "payment_reference": "REF-IDEM-001",
+        "public_invoice_id": "INV-IDEM-002", "payment_amount": "10.00", "payment_method": "card",
+    })
+    assert response.status_code == 201
+    assert response.get_json()["outstanding_balance"] == "17.50"
+    assert client.post("/invoices", json=[], headers={"Idempotency-Key": "x" * 101}).status_code == 400
+
+
+def test_client_errors_are_stored(client, session, shop):
+    body = {
+        "public_payment_id": "PAY-IDEM-002", "payment_reference": "REF-IDEM-002",
+        "public_invoice_id": "INV-IDEM-MISSING", "payment_amount": "10.00", "payment_method": "card",
+    }
+    headers = {"Idempotency-Key": "pay-002"}
+    first = client.post("/payments", json=body, headers=headers)
+    replay = client.post("/payments", json=body, headers=headers)
+
+    assert first.status_code == replay.status_code == 422
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert _count(session, Payment) == 0
+
+
+def test_aborted_requests_are_stored(client, session, shop):
+    """abort(400) in the view is stored like a returned 4xx, the retry does not run the view."""
+    body = dict(_invoice_body("INV-IDEM-004"), invoice_due_date="next tuesday")
+    headers = {"Idempotency-Key": "create-004"}
+    first = client.post("/invoices", json=body, headers=headers)
+    idempotency.clear()
+    replay = client.post("/invoices", json=body, headers=headers)
+
+    assert first.status_code == replay.status_code == 400
+    assert first.get_json() == {"error": "invoice_due_date is not an ISO datetime"}
+    assert replay.headers["Idempotent-Replayed"] == "true" and replay.data == first.data
+    assert session.get(IdempotencyKey, ("invoices.create", "create-004")).status_code == 400
+
+
+def test_server_error_releases_the_key(app, session):
+    calls = []
+
+    def failing():
+        calls.append("failing")
+        raise RuntimeError("database went away")
+
+    def working():
+        calls.append("working")
+        return {"ok": True}, 201
+
+    with app.test_request_context("/things", method="POST", json={"a": 1}, headers={"Idempotency-Key": "k1"}):
+        with pytest.raises(RuntimeError):
+            idempotency.run("things.create", session, failing)
+        assert session.get(IdempotencyKey, ("things.create", "k1")) is None
+        assert idempotency.run("things.create", session, working).status_code == 201
+        assert idempotency.run("things.create", session, working).headers["Idempotent-Replayed"] == "true"
+    assert calls == ["failing", "working"]
+
+
+def test_concurrent_duplicates_run_once(app, session):
+    calls = []
+    statuses = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"ok": True}, 201
+
+    def post():
+        with app.test_request_context("/things", method="POST", json={"a": 1}, headers={"Idempotency-Key": "k2"}):
+            response = idempotency.run("things.create", session, slow)
+            statuses.append((response.status_code, response.headers.get("Idempotent-Replayed")))
+
+    threads = [threading.Thread(target=post) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(statuses, key=lambda status: status[1] or "") == [(201, None)] + [(201, "true")] * 4
+
+
+def test_claim_held_by_another_process(app, session, monkeypatch):
+    now = datetime.utcnow()
+    session.add(IdempotencyKey(
+        scope="things.create", idempotency_key="k3", request_hash="0" * 32,
+        locked_until=now + timedelta(minutes=1), expires=now + timedelta(days=1),
+    ))
+    session.commit()
+    monkeypatch.setattr(idempotency, "wait", 0.1)
+
+    with app.test_request_context("/things", method="POST", json={"a": 1}, headers={"Idempotency-Key": "k3"}):
+        row = session.get(IdempotencyKey, ("things.create", "k3"))
+        row.request_hash = request_hash()
+        session.commit()
+
+        response = idempotency.run("things.create", session, lambda: ({"ok": True}, 201))
+        assert response.status_code == 409 and response.headers["Retry-After"] == "1"
+
+        # the other process died, its claim runs out and the retry runs
+        row.locked_until = now - timedelta(seconds=1)
+        session.commit()
+        response = idempotency.run("things.create", session, lambda: ({"ok": True}, 201))
+        assert response.status_code == 201 and "Idempotent-Replayed" not in response.headers
+
+
+def test_purge_expired(session):
+    now = datetime.utcnow()
+    for number, expires in enumerate((now - timedelta(days=2), now - timedelta(seconds=1), now + timedelta(days=1))):
+        session.add(IdempotencyKey(
+            scope="things.create", idempotency_key=f"purge-{number}", request_hash="0" * 32,
+            status_code=201, response_body=b"{}", expires=expires,
+        ))
+    session.commit()
+
+    assert purge_expired(session, chunk_size=1, now=now) == 2
+    assert [row.idempotency_key for row in session.scalars(select(IdempotencyKey))] == ["purge-2"]
@@ -0,0 +1,61 @@
+#!/bin/env python
+
+'''
+Tests for the index advisor (app/services/index_advisor.py, flask indexes advise).
+
+- every canonical query has an index plan on the current schema, a new query shape or a
+  dropped index that needs a scan or a sort fails here
+'''
+
+from sqlalchemy import create_engine, select
+
+from app.extensions import db
+from app.models.customers import Customer
+from app.services.index_advisor import (
+    CANONICAL_QUERIES,
+    FILESORT,
+    FULL_SCAN,
+    CanonicalQuery,
+    advise,
+    explain,
+)
+
+
+def test_canonical_queries_use_indexes(db_):
+    results = advise()
+
+    assert len(results) == len(CANONICAL_QUERIES)
+    assert {advice.query.name: [finding.detail for finding in advice.findings]
+            for advice in results if not advice.ok} == {}
+
+
+def test_missing_index_is_flagged(app):
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_payments_invoice_payment_date")
+
+    [advice] = advise(["invoice_payments_by_date"], engine=engine)
+
+    assert not advice.ok
+    assert {finding.kind for finding in advice.findings} == {FULL_SCAN, FILESORT}
+    assert advice.findings[0].table == "payments"
+    engine.dispose()
+
+
+def test_allowed_findings_are_kept_apart(db_):
+    query = CanonicalQuery(
+        "customers_by_name", lambda: select(Customer).order_by(Customer.customer_name), "", frozenset({FULL_SCAN}),
+    )
+    with db.engine.connect() as connection:
+        advice = explain(query, connection)
+
+    assert [finding.kind for finding in advice.allowed] == [FULL_SCAN]
+    assert [finding.kind for finding in advice.findings] == [FILESORT]
+
+
+def test_cli_exit_code(app, db_):
+    result = app.test_cli_runner().invoke(args=["indexes", "advise", "--only", "customer_open_invoices"])
+
+    assert result.exit_code == 0, result.output
+    assert "1 queries checked, 0 flagged" in result.output
@@ -0,0 +1,101 @@
+#!/bin/env python
+
+'''
+Tests for the SQL instrumentation (app/instrumentation.py) and /health/queries.
+'''
+
+import logging
+import time
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app import instrumentation
+from app.instrumentation import Histogram, capture_queries, fingerprint, query_stats
+from app.models.customers import Customer
+
+
+def test_fingerprint_collapses_literals_and_lists():
+    """Statements that differ only in values share a fingerprint."""
+    assert fingerprint(
+        "SELECT id FROM invoices WHERE status = 'paid' AND id IN (?, ?, ?)\n  LIMIT 10"
+    ) == "SELECT id FROM invoices WHERE status = ? AND id IN (...) LIMIT ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == (
+        "INSERT INTO t (a, b) VALUES (...)"
+    )
+    assert fingerprint("SELECT t1.x2 FROM t1 WHERE y = 3.5") == "SELECT t1.x2 FROM t1 WHERE y = ?"
+
+
+def test_histogram_buckets():
+    histogram = Histogram(bounds=(1, 10), unit="ms")
+    for value in (0.5, 1, 3, 50):
+        histogram.add(value)
+    result = histogram.to_dict()
+    assert result["histogram"] == {"le_1ms": 2, "le_10ms": 1, "gt_10ms": 1}
+    assert result["count"] == 4 and result["max_ms"] == 50
+
+
+def test_capture_queries_nests(session):
+    with capture_queries() as outer:
+        session.execute(text("SELECT 1"))
+        with capture_queries() as inner:
+            session.scalar(select(Customer.id).limit(1))
+    assert len(outer) == 2
+    assert len(inner) == 1
+    assert "customers" in inner[0].statement
+
+
+def test_failed_statement_leaves_nothing_behind(session):
+    """A statement that raises keeps no start time on the pooled connection, the next one is timed alone."""
+    info = session.connection().info
+
+    def pending():
+        return {key: len(value) for key, value in info.items() if isinstance(value, list)}
+
+    before = pending()
+    with pytest.raises(OperationalError):
+        session.execute(text("SELECT * FROM no_such_table"))
+    session.rollback()
+    time.sleep(0.05)
+    with capture_queries() as statements:
+        session.execute(text("SELECT 1"))
+
+    assert pending() == before
+    assert statements[0].seconds < 0.05
+
+
+def test_max_queries_fails_over_limit(session, max_queries):
+    with max_queries(2):
+        session.execute(text("SELECT 1"))
+        session.execute(text("SELECT 2"))
+
+    with pytest.raises(pytest.fail.Exception, match="expected at most 1 queries, got 2"):
+        with max_queries(1):
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+
+
+def test_slow_queries_are_logged(session, monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation._settings, "slow_query_ms", 0.0)
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        session.execute(text("SELECT 42"))
+    assert any("slow query" in message and "SELECT ?" in message for message in caplog.messages)
+
+
+def test_request_headers_and_histogram_endpoint(client):
+    query_stats.reset()
+    response = client.get("/customers?limit=5")
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    body = client.get("/health/queries?order=count&top=5").get_json()
+    assert body["statements"]["count"] >= 1
+    assert len(body["top"]) <= 5
+    assert body["requests"]["customers.list_customers"]["queries"]["count"] == 1
+    assert client.get("/health/queries?order=nope").status_code == 400
+
+    assert client.delete("/health/queries").status_code == 200
+    assert "customers.list_customers" not in client.get("/health/queries").get_json()["requests"]
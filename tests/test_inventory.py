@@ -0,0 +1,123 @@
+#!/bin/env python
+
+'''
+Tests for stock reservation (app/services/inventory.py).
+
+- Single threaded behaviour uses the session fixture.
+- The stress test runs its own app on a SQLite file so every thread gets its
+  own connection, and checks that stock never goes negative.
+'''
+
+import random
+import threading
+import pytest
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app import create_app
+from app.extensions import db
+from app.models.products import Product, ProductVariant
+from app.services.inventory import InsufficientStock, release_stock, reserve_stock
+
+
+def _variants(session, suffix, *stocks):
+    product = Product(
+        public_product_id=f"PID-STOCK-{suffix}",
+        product_name=f"Stock Product {suffix}",
+        sku=f"SKU-STOCK-{suffix}",
+        brand="Brand",
+        product_category="Category",
+        product_description="For reservation tests",
+    )
+    session.add(product)
+    session.flush()
+    variants = [
+        ProductVariant(product_fk_id=product.id, price=Decimal("1.00"),
+                       inventory_stock=stock, has_stock=stock > 0)
+        for stock in stocks
+    ]
+    session.add_all(variants)
+    session.commit()
+    return variants
+
+
+def _stock(session, variants):
+    session.expire_all()
+    return [(variant.inventory_stock, variant.has_stock) for variant in variants]
+
+
+def test_reserve_decrements_and_keeps_has_stock(session):
+    a, b = _variants(session, "001", 5, 2)
+    reserve_stock({a.id: 3, b.id: 2}, session=session)
+    assert _stock(session, [a, b]) == [(2, True), (0, False)]
+
+    release_stock({b.id: 1}, session=session)
+    assert _stock(session, [a, b]) == [(2, True), (1, True)]
+
+
+def test_reserve_is_all_or_nothing(session):
+    """One short variant fails the whole reservation and names the variant."""
+    a, b = _variants(session, "002", 5, 1)
+    with pytest.raises(InsufficientStock) as excinfo:
+        reserve_stock({a.id: 2, b.id: 2}, session=session)
+    assert excinfo.value.variant_ids == [b.id]
+    assert _stock(session, [a, b]) == [(5, True), (1, True)]
+
+
+def test_reserve_rejects_bad_input(session):
+    (a,) = _variants(session, "003", 5)
+    with pytest.raises(ValueError):
+        reserve_stock({a.id: 0}, session=session)
+    with pytest.raises(ValueError):
+        reserve_stock({a.id: 1, 987654321: 1}, session=session)
+    assert _stock(session, [a]) == [(5, True)]
+
+
+def test_concurrent_reservations_never_oversell(tmp_path):
+    """Threads reserving the same variants in random order sell exactly the stock."""
+    class StressConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'stock.db'}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+
+    app = create_app(StressConfig)
+    with app.app_context():
+        db.create_all()
+        variants = _variants(db.session, "STRESS", 40, 40)
+        ids = [variant.id for variant in variants]
+        db.session.remove()
+
+    sold = []
+    errors = []
+
+    def checkout(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            for _ in range(15):
+                order = dict(rng.sample([(ids[0], 1), (ids[1], 1)], 2))
+                try:
+                    reserve_stock(order)
+                    sold.append(order)
+                except InsufficientStock:
+                    pass
+                except Exception as exc:  # pragma: no cover - reported below
+                    errors.append(exc)
+            db.session.remove()
+
+    threads = [threading.Thread(target=checkout, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(sold) == 40
+    with app.app_context():
+        rows = db.session.execute(
+            select(ProductVariant.inventory_stock, ProductVariant.has_stock)
+            .where(ProductVariant.id.in_(ids))
+        ).all()
+        assert [tuple(row) for row in rows] == [(0, False), (0, False)]
+        db.session.remove()
@@ -46,7 +46,8 @@ def test_create_invoice(session):
     assert retrieved.total_amount == Decimal("0.00")
     assert retrieved.outstanding_balance == Decimal("0.00")
     assert retrieved.invoice_date is not None
-    assert retrieved.invoice_due_date == due
+    # DateTime columns are naive, the value comes back as UTC without tzinfo
+    assert retrieved.invoice_due_date == due.replace(tzinfo=None)
     assert retrieved.date_fully_paid is None
     assert retrieved.additional_notes is None
     assert retrieved.customer is not None
@@ -224,8 +225,10 @@ def test_customer_invoices_relationship(session):
     session.commit()
 
     cust = session.query(Customer).filter_by(customer_id="CUST-INV-006").first()
-    assert len(cust.invoices) == 2
-    ids = {inv.public_invoice_id for inv in cust.invoices}
+    # write only collection, read it through a select
+    invoices = session.scalars(cust.invoices.select()).all()
+    assert len(invoices) == 2
+    ids = {inv.public_invoice_id for inv in invoices}
     assert ids == {"INV-006A", "INV-006B"}
 
 
@@ -0,0 +1,115 @@
+#!/bin/env python
+
+'''
+Tests for the archival of closed invoices (app/services/invoice_archive.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Closed means paid or cancelled before the cutoff, open invoices never move.
+'''
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models.archive import ArchivedInvoice, ArchivedInvoiceItem, ArchivedPayment
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product
+from app.services.invoice_archive import (
+    all_invoices,
+    archive_closed_invoices,
+    customer_invoices,
+    get_invoice,
+)
+
+CUTOFF = datetime(2024, 1, 1)
+
+
+def _seed(session):
+    customer = Customer(customer_id="CUST-ARC-1", customer_name="Archive", customer_address="Archive St")
+    product = Product(
+        public_product_id="PID-ARC-1", product_name="Archive Product", sku="SKU-ARC-1",
+        brand="Brand", product_category="Category", product_description="For archive tests",
+    )
+    session.add_all([customer, product])
+    session.flush()
+
+    def invoice(public_id, status, paid_on, invoice_date):
+        row = Invoice(
+            public_invoice_id=public_id, customer_fk_id=customer.id, status=status,
+            invoice_date=invoice_date, invoice_due_date=invoice_date + timedelta(days=30),
+            date_fully_paid=paid_on, total_amount=Decimal("10.00"), subtotal=Decimal("10.00"),
+        )
+        row.items.append(InvoiceItem(product_fk_id=product.id, quantity=1,
+                                     unit_price=Decimal("10.00"), line_total=Decimal("10.00")))
+        row.taxes.append(InvoiceTax(tax_rate_percent=Decimal("13.00"), tax_amount=Decimal("0.00")))
+        if paid_on:
+            row.payments.append(Payment(public_payment_id=f"PAY-{public_id}", payment_reference=f"REF-{public_id}",
+                                        payment_amount=Decimal("10.00"), payment_date=paid_on,
+                                        payment_method="card"))
+        session.add(row)
+        return row
+
+    invoice("INV-ARC-OLD-1", "paid", datetime(2022, 5, 1), datetime(2022, 4, 1))
+    invoice("INV-ARC-OLD-2", "paid", datetime(2023, 6, 1), datetime(2023, 5, 1))
+    invoice("INV-ARC-NEW", "paid", datetime(2024, 6, 1), datetime(2024, 5, 1))
+    invoice("INV-ARC-OPEN", "pending", None, datetime(2022, 1, 1))
+    session.commit()
+    return customer
+
+
+def _live_ids(session):
+    return set(session.scalars(select(Invoice.public_invoice_id).where(Invoice.public_invoice_id.like("INV-ARC-%"))))
+
+
+def test_archives_closed_invoices_with_children(session):
+    _seed(session)
+
+    report = archive_closed_invoices(session, cutoff=CUTOFF, chunk_size=1)
+
+    assert (report.invoices, report.items, report.taxes, report.payments) == (2, 2, 2, 2)
+    assert report.chunks == 2 and report.completed
+    assert _live_ids(session) == {"INV-ARC-NEW", "INV-ARC-OPEN"}
+    archived = session.scalars(select(ArchivedInvoice).order_by(ArchivedInvoice.id)).all()
+    assert [invoice.public_invoice_id for invoice in archived] == ["INV-ARC-OLD-1", "INV-ARC-OLD-2"]
+    assert all(invoice.archived is not None for invoice in archived)
+    assert session.scalar(select(func.count()).select_from(ArchivedInvoiceItem)) == 2
+    assert session.scalar(select(func.count()).select_from(ArchivedPayment)) == 2
+    assert session.scalar(select(func.count()).select_from(Payment).where(
+        Payment.public_payment_id.like("PAY-INV-ARC-OLD%"))) == 0
+
+    # nothing left to move
+    assert archive_closed_invoices(session, cutoff=CUTOFF).invoices == 0
+
+
+def test_time_budget_stops_early(session):
+    _seed(session)
+
+    report = archive_closed_invoices(session, cutoff=CUTOFF, time_budget=0)
+
+    assert report.invoices == 0 and not report.completed
+    assert len(_live_ids(session)) == 4
+
+
+def test_unified_reads(session):
+    customer = _seed(session)
+    archive_closed_invoices(session, cutoff=CUTOFF)
+
+    old = get_invoice("INV-ARC-OLD-1", session)
+    assert isinstance(old, ArchivedInvoice)
+    assert [item.line_total for item in old.items] == [Decimal("10.00")]
+    assert [payment.public_payment_id for payment in old.payments] == ["PAY-INV-ARC-OLD-1"]
+    assert isinstance(get_invoice("INV-ARC-NEW", session), Invoice)
+    assert get_invoice("INV-ARC-NOPE", session) is None
+
+    history = customer_invoices(customer.id, session=session)
+    assert [(row.public_invoice_id, row.is_archived) for row in history] == [
+        ("INV-ARC-NEW", False), ("INV-ARC-OLD-2", True), ("INV-ARC-OLD-1", True), ("INV-ARC-OPEN", False),
+    ]
+    assert len(customer_invoices(customer.id, date_from=datetime(2023, 1, 1), session=session)) == 2
+
+    invoices = all_invoices(["customer_fk_id", "total_amount"])
+    total = session.scalar(select(func.sum(invoices.c.total_amount)).where(invoices.c.customer_fk_id == customer.id))
+    assert total == Decimal("40.00")
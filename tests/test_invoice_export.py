@@ -0,0 +1,99 @@
+#!/bin/env python
+
+'''
+Tests for the streaming invoice export (app/services/invoice_export.py).
+
+- Invoices here are dated in 1999 (due in 2099), the export is filtered to that year so rows
+  committed by other tests are not part of it.
+- The export reads on its own connections, it cannot see the session fixture's rolled back
+  transaction, so these tests are marked commits.
+'''
+
+import csv
+import json
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+from app.models.customers import Customer
+from app.models.products import Product
+from app.services.invoice_ingest import bulk_create_invoices
+from app.services.invoice_export import export_invoices
+
+YEAR = dict(date_from=datetime(1999, 1, 1), date_to=datetime(2000, 1, 1))
+
+
+@pytest.fixture
+def invoices(session):
+    if session.scalar(select(Customer.id).where(Customer.customer_id == "CUST-EXPORT")) is None:
+        session.add(Customer(customer_id="CUST-EXPORT", customer_name="Export", customer_address="Export St"))
+        session.add(Product(
+            public_product_id="PID-EXPORT", product_name="Export Product", sku="SKU-EXPORT",
+            brand="Brand", product_category="Category", product_description="For export tests",
+        ))
+        session.commit()
+        result = bulk_create_invoices([
+            {
+                "public_invoice_id": f"INV-EXPORT-{i}",
+                "customer_id": "CUST-EXPORT",
+                "invoice_date": datetime(1999, 3, 1) + timedelta(days=i),
+                "invoice_due_date": datetime(2099, 1, 1),  # never a candidate for the overdue sweeper
+                "items": [{"public_product_id": "PID-EXPORT", "quantity": q + 1, "unit_price": "2.50"}
+                          for q in range(i % 3 + 1)],
+                "taxes": [{"tax_rate_percent": "10.00"}] if i % 2 else [],
+            }
+            for i in range(7)
+        ], session=session)
+        assert not result.failures
+    return [f"INV-EXPORT-{i}" for i in range(7)]
+
+
+@pytest.mark.commits
+def test_export_ndjson_nests_children(session, invoices, tmp_path):
+    """Every invoice line carries its own items and taxes, in id order."""
+    path = tmp_path / "invoices.ndjson"
+    report = export_invoices(str(path), fmt="ndjson", chunk_size=3, **YEAR)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["public_invoice_id"] for line in lines] == invoices
+    assert report.invoices == 7 and report.chunks == 3
+    assert [len(line["items"]) for line in lines] == [1, 2, 3, 1, 2, 3, 1]
+    assert [len(line["taxes"]) for line in lines] == [0, 1, 0, 1, 0, 1, 0]
+    second = lines[1]
+    assert second["customer_id"] == "CUST-EXPORT"
+    assert second["subtotal"] == "7.50"
+    assert second["taxes"] == [{"tax_rate_percent": "10.00", "tax_amount": "0.75"}]
+    assert second["items"][1] == {
+        "public_product_id": "PID-EXPORT", "quantity": 2, "unit_price": "2.50", "line_total": "5.00",
+    }
+
+
+@pytest.mark.commits
+def test_export_csv_writes_one_file_per_table(session, invoices, tmp_path):
+    report = export_invoices(str(tmp_path / "out"), fmt="csv", chunk_size=2, **YEAR)
+
+    def read(name):
+        with open(tmp_path / "out" / name, newline="") as handle:
+            return list(csv.DictReader(handle))
+
+    assert [row["public_invoice_id"] for row in read("invoices.csv")] == invoices
+    assert len(read("invoice_items.csv")) == report.items == 13
+    assert len(read("invoice_taxes.csv")) == report.taxes == 3
+
+
+@pytest.mark.commits
+def test_export_columnar_row_groups(session, invoices, tmp_path):
+    path = tmp_path / "invoices.columnar"
+    export_invoices(str(path), fmt="columnar", chunk_size=4, **YEAR)
+
+    groups = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(groups) == 2
+    assert groups[0]["invoices"]["public_invoice_id"] == invoices[:4]
+    assert groups[1]["invoice_taxes"]["tax_amount"] == ["1.50"]
+    assert set(groups[0]["invoice_items"]["invoice_fk_id"]) == set(groups[0]["invoices"]["id"])
+
+
+def test_export_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_invoices(str(tmp_path / "x"), fmt="xlsx")
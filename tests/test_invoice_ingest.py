@@ -0,0 +1,121 @@
+#!/bin/env python
+
+'''
+Tests for the bulk invoice ingestion service (app/services/invoice_ingest.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Payloads reference customers and products by their public ids.
+'''
+
+import pytest
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.products import Product
+from app.services.invoice_ingest import bulk_create_invoices
+
+
+@pytest.fixture
+def catalog(session):
+    """One customer and one product for the test."""
+    customer = session.query(Customer).filter_by(customer_id="CUST-BULK-001").first()
+    product = session.query(Product).filter_by(public_product_id="PID-BULK-001").first()
+    if customer is not None:
+        return customer, product
+
+    customer = Customer(
+        customer_id="CUST-BULK-001",
+        customer_name="Bulk Customer",
+        customer_address="1 Bulk St",
+    )
+    product = Product(
+        public_product_id="PID-BULK-001",
+        product_name="Bulk Product",
+        sku="SKU-BULK-001",
+        brand="Brand",
+        product_category="Category",
+        product_description="For bulk ingestion tests",
+    )
+    session.add_all([customer, product])
+    session.commit()
+    return customer, product
+
+
+def _payload(public_invoice_id, customer_id="CUST-BULK-001", product_id="PID-BULK-001"):
+    return {
+        "public_invoice_id": public_invoice_id,
+        "customer_id": customer_id,
+        "invoice_due_date": datetime.now(timezone.utc) + timedelta(days=30),
+        "shipping_amount": "5.00",
+        "items": [
+            {"public_product_id": product_id, "quantity": 2, "unit_price": "10.10"},
+        ],
+        "taxes": [{"tax_rate_percent": "5.00"}],
+    }
+
+
+def test_bulk_create_invoices_with_items_and_taxes(session, catalog):
+    """Invoices, items and taxes are written and header amounts derived."""
+    customer, product = catalog
+    result = bulk_create_invoices(
+        [_payload("INV-BULK-001"), _payload("INV-BULK-002")], session=session
+    )
+
+    assert result.created == ["INV-BULK-001", "INV-BULK-002"]
+    assert result.failures == []
+
+    invoice = session.query(Invoice).filter_by(public_invoice_id="INV-BULK-001").one()
+    assert invoice.customer_fk_id == customer.id
+    assert invoice.subtotal == Decimal("20.20")
+    assert invoice.tax_amount == Decimal("1.01")
+    assert invoice.total_amount == Decimal("26.21")
+    assert invoice.outstanding_balance == Decimal("26.21")
+
+    item = session.query(InvoiceItem).filter_by(invoice_fk_id=invoice.id).one()
+    assert item.product_fk_id == product.id
+    assert item.line_total == Decimal("20.20")
+    tax = session.query(InvoiceTax).filter_by(invoice_fk_id=invoice.id).one()
+    assert tax.tax_amount == Decimal("1.01")
+
+
+def test_bulk_create_reports_row_failures(session, catalog):
+    """Bad rows are reported by index while the rest of the batch is written."""
+    bad_quantity = _payload("INV-BULK-013")
+    bad_quantity["items"][0]["quantity"] = 0
+    tax_amount_sent = _payload("INV-BULK-014")
+    tax_amount_sent["taxes"][0]["tax_amount"] = "1.01"
+
+    result = bulk_create_invoices(
+        [
+            _payload("INV-BULK-010"),
+            _payload("INV-BULK-011", customer_id="CUST-MISSING"),
+            _payload("INV-BULK-012", product_id="PID-MISSING"),
+            bad_quantity,
+            _payload("INV-BULK-010"),
+            {"customer_id": "CUST-BULK-001"},
+            tax_amount_sent,
+        ],
+        session=session,
+    )
+
+    assert result.created == ["INV-BULK-010"]
+    assert [failure.index for failure in result.failures] == [1, 2, 3, 4, 5, 6]
+    assert "unknown customer" in result.failures[0].reason
+    assert "unknown product" in result.failures[1].reason
+    assert "duplicate" in result.failures[3].reason
+    assert "tax_amount" in result.failures[5].reason
+    assert session.query(Invoice).filter_by(public_invoice_id="INV-BULK-010").count() == 1
+
+
+def test_bulk_create_skips_existing_invoice(session, catalog):
+    """An id that is already stored is a duplicate, the stored invoice is not touched."""
+    bulk_create_invoices([_payload("INV-BULK-020")], session=session)
+    result = bulk_create_invoices(
+        [_payload("INV-BULK-020"), _payload("INV-BULK-021")], session=session
+    )
+
+    assert result.created == ["INV-BULK-021"]
+    assert result.duplicates == ["INV-BULK-020"]
+    assert result.failures == []
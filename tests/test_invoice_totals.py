@@ -0,0 +1,154 @@
+#!/bin/env python
+
+'''
+Tests for the set based invoice totals engine (app/services/invoice_totals.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Amounts are checked to the exact cent.
+'''
+
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product
+from app.services.invoice_totals import recalculate_totals, tax_cents
+
+
+def _customer(session, customer_id):
+    customer = Customer(
+        customer_id=customer_id,
+        customer_name="Totals Customer",
+        customer_address="1 Totals St",
+    )
+    session.add(customer)
+    session.commit()
+    return customer
+
+
+def _product(session, suffix):
+    product = Product(
+        public_product_id=f"PID-TOT-{suffix}",
+        product_name=f"Totals Product {suffix}",
+        sku=f"SKU-TOT-{suffix}",
+        brand="Brand",
+        product_category="Category",
+        product_description="For totals tests",
+    )
+    session.add(product)
+    session.commit()
+    return product
+
+
+def _invoice(session, customer, public_invoice_id, product, lines, rates, **kwargs):
+    invoice = Invoice(
+        public_invoice_id=public_invoice_id,
+        customer_fk_id=customer.id,
+        invoice_due_date=datetime.now(timezone.utc) + timedelta(days=30),
+        **kwargs,
+    )
+    session.add(invoice)
+    session.flush()
+    for quantity, unit_price in lines:
+        session.add(InvoiceItem(
+            invoice_fk_id=invoice.id,
+            product_fk_id=product.id,
+            quantity=quantity,
+            unit_price=Decimal(unit_price),
+            line_total=Decimal(unit_price) * quantity,
+        ))
+    for rate in rates:
+        session.add(InvoiceTax(
+            invoice_fk_id=invoice.id,
+            tax_rate_percent=Decimal(rate),
+            tax_amount=Decimal("0.00"),
+        ))
+    session.commit()
+    return invoice
+
+
+def test_tax_cents_rounds_half_up():
+    """Half a cent rounds away from zero."""
+    assert tax_cents(1010, 500) == 51  # 10.10 * 5% = 0.505
+    assert tax_cents(1005, 850) == 85  # 10.05 * 8.5% = 0.85425
+    assert tax_cents(-1010, 500) == -51
+    assert tax_cents(0, 1300) == 0
+
+
+def test_recalculate_totals_for_invoices(session):
+    """Subtotal, taxes, total and outstanding balance are recomputed to the cent."""
+    customer = _customer(session, "CUST-TOT-001")
+    product = _product(session, "001")
+    invoice = _invoice(
+        session, customer, "INV-TOT-001", product,
+        lines=[(3, "0.29"), (1, "9.23")], rates=["5.00", "8.50"],
+        shipping_amount=Decimal("4.99"),
+    )
+    session.add(Payment(
+        public_payment_id="PAY-TOT-001",
+        invoice_fk_id=invoice.id,
+        payment_amount=Decimal("5.00"),
+        payment_reference="REF-TOT-001",
+        payment_method="card",
+    ))
+    session.commit()
+
+    assert recalculate_totals(session, invoice_ids=[invoice.id]) == 1
+
+    session.expire_all()
+    # subtotal 10.10, taxes 0.505 -> 0.51 and 0.8585 -> 0.86
+    assert invoice.subtotal == Decimal("10.10")
+    assert invoice.tax_amount == Decimal("1.37")
+    assert invoice.total_amount == Decimal("16.46")
+    assert invoice.outstanding_balance == Decimal("11.46")
+    assert sorted(tax.tax_amount for tax in invoice.taxes) == [Decimal("0.51"), Decimal("0.86")]
+
+
+def test_recalculate_totals_by_customer_and_date_range(session):
+    """A customer or date range pass leaves other invoices untouched."""
+    customer = _customer(session, "CUST-TOT-002")
+    other = _customer(session, "CUST-TOT-003")
+    product = _product(session, "002")
+    old = _invoice(
+        session, customer, "INV-TOT-002", product, lines=[(2, "1.50")], rates=[],
+        invoice_date=datetime(2024, 1, 15),
+    )
+    new = _invoice(
+        session, customer, "INV-TOT-003", product, lines=[(1, "7.00")], rates=["10.00"],
+        invoice_date=datetime(2024, 3, 15),
+    )
+    untouched = _invoice(session, other, "INV-TOT-004", product, lines=[(1, "1.00")], rates=[])
+
+    assert recalculate_totals(
+        session, customer_fk_id=customer.id, date_from=datetime(2024, 3, 1)
+    ) == 1
+    session.expire_all()
+    assert new.total_amount == Decimal("7.70")
+    assert old.total_amount == Decimal("0.00")
+
+    assert recalculate_totals(session, customer_fk_id=customer.id, chunk_size=1) == 2
+    session.expire_all()
+    assert old.total_amount == Decimal("3.00")
+    assert untouched.total_amount == Decimal("0.00")
+
+
+def test_outstanding_balance_never_negative(session):
+    """An overpaid invoice has a zero outstanding balance."""
+    customer = _customer(session, "CUST-TOT-005")
+    product = _product(session, "005")
+    invoice = _invoice(session, customer, "INV-TOT-005", product, lines=[(1, "2.00")], rates=[])
+    session.add(Payment(
+        public_payment_id="PAY-TOT-005",
+        invoice_fk_id=invoice.id,
+        payment_amount=Decimal("3.00"),
+        payment_reference="REF-TOT-005",
+        payment_method="card",
+    ))
+    session.commit()
+
+    recalculate_totals(session, invoice_ids=[invoice.id])
+    session.expire_all()
+    assert invoice.total_amount == Decimal("2.00")
+    assert invoice.outstanding_balance == Decimal("0.00")
@@ -0,0 +1,56 @@
+#!/bin/env python
+
+'''
+Tests for the test database lifecycle itself (tests/conftest.py, tests/database.py).
+
+- The first test commits a customer, the second checks it was rolled back.
+  Under pytest-xdist they can land on different workers, the second one then only
+  checks what its own worker did.
+'''
+
+from sqlalchemy import select
+
+from app.models.customers import Customer
+from tests.database import database_uri
+
+_committed = []
+
+
+def test_commit_inside_test(session):
+    session.add(Customer(customer_id="CUST-ISO-001", customer_name="Iso", customer_address="Iso St"))
+    session.commit()
+    assert session.scalar(select(Customer.id).where(Customer.customer_id == "CUST-ISO-001"))
+    _committed.append(True)
+
+
+def test_commit_rolled_back_after_test(session):
+    if _committed:
+        assert session.scalar(select(Customer.id).where(Customer.customer_id == "CUST-ISO-001")) is None
+
+
+def test_nested_savepoint_rollback_keeps_outer_rows(session):
+    """begin_nested works inside the wrapper, bulk ingest and inventory rely on it."""
+    session.add(Customer(customer_id="CUST-ISO-002", customer_name="Iso", customer_address="Iso St"))
+    session.flush()
+    nested = session.begin_nested()
+    session.add(Customer(customer_id="CUST-ISO-003", customer_name="Iso", customer_address="Iso St"))
+    session.flush()
+    nested.rollback()
+    session.commit()
+
+    ids = set(session.scalars(select(Customer.customer_id).where(Customer.customer_id.like("CUST-ISO-00%"))))
+    assert ids == {"CUST-ISO-002"}
+
+
+def test_template_mode_copies_per_worker(app, monkeypatch, tmp_path):
+    from app.extensions import db
+
+    monkeypatch.setenv("TEST_DB_MODE", "template")
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw7")
+    monkeypatch.setattr("tempfile.gettempdir", lambda: str(tmp_path))
+    uri, cleanup = database_uri(db.metadata)
+
+    assert uri.startswith(f"sqlite:///{tmp_path}/erp_test_gw7_")
+    assert len(list(tmp_path.glob("erp_test_template_*.db"))) == 1
+    cleanup()
+    assert not list(tmp_path.glob("erp_test_gw7_*"))
@@ -0,0 +1,115 @@
+#!/bin/env python
+
+'''
+Tests for the keyset paginated customer and invoice list endpoints and the NDJSON exports.
+
+- Rows committed by other tests stay in the database, so every request is
+  scoped with a cursor or a filter to the rows created here.
+'''
+
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceStatus
+
+
+@pytest.fixture
+def listed_customers(session):
+    customers = session.query(Customer).filter(Customer.customer_id.like("LIST-CUST-%")).all()
+    if customers:
+        return customers
+
+    customers = [
+        Customer(
+            customer_id=f"LIST-CUST-{i:03d}",
+            customer_name=f"Listed Customer {i}",
+            customer_address="List St",
+        )
+        for i in range(1, 6)
+    ]
+    session.add_all(customers)
+    session.commit()
+    due = datetime.now(timezone.utc) + timedelta(days=30)
+    session.add_all([
+        Invoice(
+            public_invoice_id=f"LIST-INV-{i:03d}",
+            customer_fk_id=customers[0].id,
+            invoice_due_date=due,
+            status=InvoiceStatus.paid.value if i == 3 else InvoiceStatus.pending.value,
+        )
+        for i in range(1, 5)
+    ])
+    session.commit()
+    return customers
+
+
+def test_customers_keyset_pages(client, listed_customers):
+    """Pages follow the cursor on customer_id without gaps or repeats."""
+    first = client.get("/customers?order=customer_id&after=LIST-CUST-000&limit=2").get_json()
+    assert [c["customer_id"] for c in first["items"]] == ["LIST-CUST-001", "LIST-CUST-002"]
+    assert first["next_after"] == "LIST-CUST-002"
+
+    second = client.get(
+        f"/customers?order=customer_id&after={first['next_after']}&limit=2"
+    ).get_json()
+    assert [c["customer_id"] for c in second["items"]] == ["LIST-CUST-003", "LIST-CUST-004"]
+
+
+def test_customers_last_page_by_id(client, listed_customers):
+    """The last page has no next cursor."""
+    last_id = listed_customers[-1].id
+    body = client.get(f"/customers?after={last_id - 1}&limit=5").get_json()
+    assert [c["id"] for c in body["items"]] == [last_id]
+    assert body["next_after"] is None
+
+
+def test_customers_bad_arguments(client, listed_customers):
+    assert client.get("/customers?limit=0").status_code == 400
+    assert client.get("/customers?order=customer_name").status_code == 400
+    assert client.get("/customers?after=abc").status_code == 400
+
+
+def test_invoices_filtered_by_customer_and_status(client, listed_customers):
+    """Invoice pages can be filtered by public customer id and status."""
+    body = client.get("/invoices?customer=LIST-CUST-001&status=pending&limit=2").get_json()
+    assert [i["public_invoice_id"] for i in body["items"]] == ["LIST-INV-001", "LIST-INV-002"]
+    assert body["items"][0]["customer_id"] == "LIST-CUST-001"
+
+    rest = client.get(
+        f"/invoices?customer=LIST-CUST-001&status=pending&after={body['next_after']}"
+    ).get_json()
+    assert [i["public_invoice_id"] for i in rest["items"]] == ["LIST-INV-004"]
+    assert rest["next_after"] is None
+
+
+def test_invoice_export_ndjson(client, listed_customers):
+    """The export streams one JSON document per line."""
+    response = client.get("/invoices/export.ndjson?customer=LIST-CUST-001")
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["public_invoice_id"] for line in lines] == [
+        "LIST-INV-001", "LIST-INV-002", "LIST-INV-003", "LIST-INV-004",
+    ]
+
+
+def test_customer_export_ndjson(client, listed_customers):
+    response = client.get("/customers/export.ndjson")
+    ids = {json.loads(line)["customer_id"] for line in response.get_data(as_text=True).splitlines()}
+    assert {c.customer_id for c in listed_customers} <= ids
+
+
+def test_detail_routes(client, listed_customers):
+    customer = client.get("/customers/LIST-CUST-001").get_json()
+    assert customer["customer_name"] == "Listed Customer 1"
+    assert customer["total_outstanding"] == "0.00"
+
+    invoice = client.get("/invoices/LIST-INV-003").get_json()
+    assert invoice["customer_id"] == "LIST-CUST-001" and invoice["status"] == "paid"
+    assert invoice["items"] == [] and invoice["payments"] == []
+
+    assert client.get("/customers/LIST-CUST-999").status_code == 404
+    assert client.get("/invoices/LIST-INV-999").status_code == 404
+    assert client.get("/products?limit=0").status_code == 400
+    assert "items" in client.get("/products?limit=5").get_json()
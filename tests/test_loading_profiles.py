@@ -0,0 +1,152 @@
+#!/bin/env python
+
+'''
+Tests for the query profiles (app/models/loading.py) and the write only Customer.invoices.
+
+- The number of SQL statements each profile emits is asserted, so a relationship
+  that starts loading eagerly again fails here.
+'''
+
+import pytest
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import InvalidRequestError
+
+from app.instrumentation import capture_queries
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceTax, InvoiceStatus
+from app.models.loading import customer_query, invoice_query
+from app.models.payments import Payment
+from app.models.products import Product
+
+
+@pytest.fixture
+def account(session):
+    """A customer with two open invoices and one paid invoice, each with children."""
+    customer = session.query(Customer).filter_by(customer_id="CUST-LOAD-001").first()
+    if customer is not None:
+        return customer
+
+    customer = Customer(
+        customer_id="CUST-LOAD-001",
+        customer_name="Loader Customer",
+        customer_address="Loader St",
+    )
+    product = Product(
+        public_product_id="PID-LOAD-001",
+        product_name="Loader Product",
+        sku="SKU-LOAD-001",
+        brand="Brand",
+        product_category="Category",
+        product_description="For loader tests",
+    )
+    session.add_all([customer, product])
+    session.commit()
+
+    due = datetime.now(timezone.utc) + timedelta(days=30)
+    statuses = [InvoiceStatus.pending, InvoiceStatus.overdue, InvoiceStatus.paid]
+    for i, status in enumerate(statuses, start=1):
+        invoice = Invoice(
+            public_invoice_id=f"INV-LOAD-00{i}",
+            customer_fk_id=customer.id,
+            invoice_due_date=due,
+            status=status.value,
+        )
+        session.add(invoice)
+        session.flush()
+        session.add_all([
+            InvoiceItem(invoice_fk_id=invoice.id, product_fk_id=product.id, quantity=1,
+                        unit_price=Decimal("1.00"), line_total=Decimal("1.00")),
+            InvoiceTax(invoice_fk_id=invoice.id, tax_rate_percent=Decimal("10.00"),
+                       tax_amount=Decimal("0.10")),
+            Payment(public_payment_id=f"PAY-LOAD-00{i}", invoice_fk_id=invoice.id,
+                    payment_amount=Decimal("0.50"), payment_reference=f"REF-LOAD-00{i}",
+                    payment_method="card"),
+        ])
+    session.commit()
+    return customer
+
+
+def _load(session, profile):
+    session.expunge_all()
+    return session.scalars(
+        customer_query(profile).where(Customer.customer_id == "CUST-LOAD-001")
+    ).one()
+
+
+def test_summary_profile(session, account):
+    """summary is a single SELECT and relationships raise instead of loading."""
+    with capture_queries() as statements:
+        customer = _load(session, "summary")
+    assert len(statements) == 1
+    with pytest.raises(InvalidRequestError):
+        customer.open_invoices
+
+
+def test_with_open_invoices_profile(session, account):
+    """Open invoices come with one extra query, their children are not loaded."""
+    with capture_queries() as statements:
+        customer = _load(session, "with_open_invoices")
+        ids = sorted(invoice.public_invoice_id for invoice in customer.open_invoices)
+    assert len(statements) == 2
+    assert ids == ["INV-LOAD-001", "INV-LOAD-002"]
+    with pytest.raises(InvalidRequestError):
+        customer.open_invoices[0].payments
+
+
+def test_full_profile(session, account):
+    """full loads items, payments and taxes with one query per relationship."""
+    with capture_queries() as statements:
+        customer = _load(session, "full")
+        for invoice in customer.open_invoices:
+            assert len(invoice.items) == 1
+            assert len(invoice.payments) == 1
+            assert len(invoice.taxes) == 1
+    assert len(statements) == 5
+
+
+def test_full_profile_many_customers_no_n_plus_one(session, account, max_queries):
+    """The number of queries does not grow with the number of customers loaded."""
+    session.expunge_all()
+    with max_queries(5):
+        customers = session.scalars(customer_query("full").limit(50)).all()
+        for customer in customers:
+            for invoice in customer.open_invoices:
+                invoice.items, invoice.payments, invoice.taxes
+
+
+def test_invoice_profiles(session, account):
+    """Invoice profiles pick their relationships the same way."""
+    session.expunge_all()
+    with capture_queries() as statements:
+        invoice = session.scalars(
+            invoice_query("with_payments").where(Invoice.public_invoice_id == "INV-LOAD-001")
+        ).one()
+        assert invoice.payments[0].public_payment_id == "PAY-LOAD-001"
+    assert len(statements) == 2
+    with pytest.raises(InvalidRequestError):
+        invoice.taxes
+
+    with pytest.raises(ValueError):
+        invoice_query("everything")
+
+
+def test_customer_invoices_write_only(session, account):
+    """Customer.invoices never loads, it is filtered and paginated in SQL."""
+    customer = _load(session, "summary")
+    paid = session.scalars(
+        customer.invoices.select().where(Invoice.status == InvoiceStatus.paid.value)
+    ).all()
+    assert [invoice.public_invoice_id for invoice in paid] == ["INV-LOAD-003"]
+
+    page = session.scalars(
+        customer.invoices.select().order_by(Invoice.id).limit(2).offset(1)
+    ).all()
+    assert [invoice.public_invoice_id for invoice in page] == ["INV-LOAD-002", "INV-LOAD-003"]
+
+    total = session.scalar(
+        select(func.count()).select_from(customer.invoices.select().subquery())
+    )
+    assert total == 3
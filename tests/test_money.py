@@ -0,0 +1,107 @@
+#!/bin/env python
+
+'''
+Tests for the integer cent money type (app/money.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Rounding is checked against the decimal module on the same inputs.
+'''
+
+import pickle
+import random
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+
+import pytest
+from sqlalchemy import select, type_coerce, update
+from sqlalchemy.exc import StatementError
+
+from app.models.products import Product, ProductVariant
+from app.money import (
+    Currency,
+    CurrencyMismatchError,
+    Money,
+    MoneyType,
+    rate_hundredths,
+    round_div,
+)
+
+
+def test_arithmetic_and_immutability():
+    price = Money.from_decimal(Decimal("19.98"))
+    assert price == Money(1998, "USD")
+    assert price * 3 == Money(5994)
+    assert sum([price, price, Money(4)]) == Money(4000)
+    assert Money.total([price] * 1000).to_decimal() == Decimal("19980.00")
+    assert -price < Money.zero() < price
+    assert str(price) == "19.98 USD" and repr(price) == "Money('19.98', 'USD')"
+    assert pickle.loads(pickle.dumps(price)) == price
+    assert len({Money(1), Money(1), Money(1, "EUR")}) == 2
+
+    with pytest.raises(AttributeError):
+        price.minor = 1
+    with pytest.raises(TypeError):
+        price * Decimal("1.5")
+    with pytest.raises(TypeError):
+        Money(Decimal("19.98"))
+
+
+def test_currencies():
+    assert Money.from_decimal("1500", "JPY").minor == 1500
+    assert Money.from_decimal("1500.00", "JPY").to_decimal() == Decimal("1500")
+    with pytest.raises(CurrencyMismatchError):
+        Money(1, "USD") + Money(1, "EUR")
+    with pytest.raises(CurrencyMismatchError):
+        Money.total([Money(1, "EUR")], "USD")
+    with pytest.raises(ValueError, match="unknown currency"):
+        Money(1, "XXX")
+    with pytest.raises(ValueError, match="registered with exponent"):
+        Money(1, Currency("USD", 3))
+    with pytest.raises(ValueError, match="more precision"):
+        Money.from_decimal("0.005")
+    assert Money.from_decimal("0.005", rounding=ROUND_HALF_UP) == Money(1)
+
+
+@pytest.mark.parametrize("rounding", [ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN])
+def test_round_div_matches_decimal(rounding):
+    rng = random.Random(3)
+    for _ in range(2000):
+        numerator, denominator = rng.randint(-10**9, 10**9), rng.choice([10, 100, 10000, 7])
+        expected = (Decimal(numerator) / Decimal(denominator)).to_integral_value(rounding=rounding)
+        assert round_div(numerator, denominator, rounding) == int(expected), (numerator, denominator)
+    assert round_div(25, 10, ROUND_HALF_EVEN) == 2 and round_div(35, 10, ROUND_HALF_EVEN) == 4
+
+
+def test_tax_rules():
+    """Tax of the subtotal at tax_rate_percent, half up to the cent, like the totals engine."""
+    assert Money(1010).tax("5") == Money(51) # 0.505
+    assert Money(1005).tax(Decimal("8.50")) == Money(85) # 0.85425
+    assert Money(1010).tax("5", rounding=ROUND_HALF_EVEN) == Money(50)
+    assert Money(-1010).tax("5") == Money(-51)
+    assert rate_hundredths("13") == 1300
+    with pytest.raises(ValueError, match="two decimals"):
+        Money(100).tax("8.125")
+
+
+def test_money_type_round_trips_numeric_columns(session):
+    product = Product(
+        public_product_id="PID-MONEY-1", product_name="Money", sku="SKU-MONEY-1",
+        brand="Brand", product_category="Category", product_description="For money tests",
+    )
+    prices = [Decimal("0.29"), Decimal("19.98"), Decimal("99999999.99"), Decimal("-0.01"), Decimal("0.00")]
+    product.children_variants = [ProductVariant(price=price, inventory_stock=0) for price in prices]
+    session.add(product)
+    session.commit()
+
+    price = type_coerce(ProductVariant.price, MoneyType())
+    query = select(price).where(ProductVariant.product_fk_id == product.id).order_by(ProductVariant.id)
+    assert [money.to_decimal() for money in session.scalars(query)] == prices
+
+    session.execute(
+        update(ProductVariant).where(ProductVariant.product_fk_id == product.id)
+        .values(price=type_coerce(Money(1234567), MoneyType()))
+    )
+    session.expire_all()
+    assert {variant.price for variant in product.children_variants} == {Decimal("12345.67")}
+
+    with pytest.raises(StatementError, match="EUR amount for a USD column"):
+        session.execute(update(ProductVariant).values(price=type_coerce(Money(1, "EUR"), MoneyType())))
@@ -0,0 +1,92 @@
+#!/bin/env python
+
+'''
+Tests for the overdue sweeper (app/services/overdue_sweeper.py).
+
+- Invoices here are due in 2001 and the sweep runs "as of" mid 2001, so rows
+  left by @pytest.mark.commits tests are never candidates.
+'''
+
+import itertools
+import pytest
+from datetime import datetime
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.jobs import JobCheckpoint
+from app.services import overdue_sweeper
+from app.services.overdue_sweeper import CHECKPOINT_NAME, sweep_overdue
+
+AS_OF = datetime(2001, 6, 1)
+
+
+@pytest.fixture
+def old_invoices(session, request):
+    tag = request.node.name[-12:]
+    customer = Customer(
+        customer_id=f"CUST-SWEEP-{tag}",
+        customer_name="Sweep Customer",
+        customer_address="Sweep St",
+    )
+    session.add(customer)
+    session.commit()
+
+    def invoice(suffix, due, status=InvoiceStatus.pending):
+        return Invoice(
+            public_invoice_id=f"INV-SWEEP-{tag}-{suffix}",
+            customer_fk_id=customer.id,
+            invoice_due_date=due,
+            status=status.value,
+        )
+
+    overdue = [invoice(f"00{i}", datetime(2001, 1, i)) for i in range(1, 6)]
+    not_due = invoice("010", datetime(2001, 12, 1))
+    paid = invoice("011", datetime(2001, 1, 1), InvoiceStatus.paid)
+    session.add_all(overdue + [not_due, paid])
+    session.commit()
+    return overdue, not_due, paid
+
+
+def _statuses(session, invoices):
+    session.expire_all()
+    return [invoice.status for invoice in invoices]
+
+
+def test_sweep_marks_only_pending_past_due(session, old_invoices):
+    overdue, not_due, paid = old_invoices
+    report = sweep_overdue(session, now=AS_OF, chunk_size=2)
+
+    assert report.rows_updated == 5
+    assert report.completed
+    assert report.rows_per_second > 0
+    assert _statuses(session, overdue) == [InvoiceStatus.overdue.value] * 5
+    assert _statuses(session, [not_due, paid]) == [
+        InvoiceStatus.pending.value, InvoiceStatus.paid.value,
+    ]
+    assert session.get(JobCheckpoint, CHECKPOINT_NAME).position == 0
+
+
+def test_sweep_resumes_after_time_budget(session, old_invoices, monkeypatch):
+    """A run out of time stores its checkpoint and the next run continues from it."""
+    overdue, _, _ = old_invoices
+    clock = itertools.count()
+    monkeypatch.setattr(overdue_sweeper, "perf_counter", lambda: next(clock))
+
+    first = sweep_overdue(session, now=AS_OF, chunk_size=1, time_budget=2.5)
+    assert first.rows_updated == 2
+    assert not first.completed
+    assert session.get(JobCheckpoint, CHECKPOINT_NAME).position == overdue[1].id
+    assert _statuses(session, overdue).count(InvoiceStatus.overdue.value) == 2
+
+    second = sweep_overdue(session, now=AS_OF, chunk_size=1)
+    assert second.rows_updated == 3
+    assert second.completed
+    assert _statuses(session, overdue) == [InvoiceStatus.overdue.value] * 5
+    assert session.get(JobCheckpoint, CHECKPOINT_NAME).position == 0
+
+
+def test_sweep_command(app, db_):
+    result = app.test_cli_runner().invoke(args=["invoices", "sweep-overdue", "--chunk-size", "100"])
+    assert result.exit_code == 0, result.output
+    assert "rows/s" in result.output
+    assert "pass complete" in result.output
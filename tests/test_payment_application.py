@@ -0,0 +1,177 @@
+#!/bin/env python
+
+'''
+Tests for payment application (app/services/payment_application.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Every test uses its own customer, invoices and payment ids.
+'''
+
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus
+from app.models.payments import Payment
+from app.models.products import Product
+from app.services.invoice_totals import recalculate_totals, refresh_balances
+from app.services.payment_application import apply_payments, apply_settlement_file
+
+
+def _invoice(session, suffix, amount, due_in_days=30, status=InvoiceStatus.pending.value):
+    customer = session.scalar(select(Customer).where(Customer.customer_id == f"CUST-PAY-{suffix}"))
+    if customer is None:
+        customer = Customer(
+            customer_id=f"CUST-PAY-{suffix}",
+            customer_name="Payment Customer",
+            customer_address="1 Payment St",
+        )
+        product = Product(
+            public_product_id=f"PID-PAY-{suffix}",
+            product_name=f"Payment Product {suffix}",
+            sku=f"SKU-PAY-{suffix}",
+            brand="Brand",
+            product_category="Category",
+            product_description="For payment tests",
+        )
+        session.add_all([customer, product])
+        session.flush()
+    product = session.scalar(select(Product).where(Product.public_product_id == f"PID-PAY-{suffix}"))
+
+    count = session.scalar(select(func.count(Invoice.id)).where(Invoice.customer_fk_id == customer.id))
+    invoice = Invoice(
+        public_invoice_id=f"INV-PAY-{suffix}-{count}",
+        customer_fk_id=customer.id,
+        status=status,
+        invoice_due_date=datetime.now(timezone.utc) + timedelta(days=due_in_days),
+    )
+    session.add(invoice)
+    session.flush()
+    session.add(InvoiceItem(
+        invoice_fk_id=invoice.id,
+        product_fk_id=product.id,
+        quantity=1,
+        unit_price=Decimal(amount),
+        line_total=Decimal(amount),
+    ))
+    session.commit()
+    recalculate_totals(session, invoice_ids=[invoice.id])
+    return invoice
+
+
+def _payment(public_payment_id, invoice, amount, **kwargs):
+    payload = {
+        "public_payment_id": public_payment_id,
+        "payment_reference": f"REF-{public_payment_id}",
+        "public_invoice_id": invoice.public_invoice_id,
+        "payment_amount": amount,
+        "payment_method": "bank_transfer",
+    }
+    payload.update(kwargs)
+    return payload
+
+
+def test_partial_and_full_payments_settle_invoices(session):
+    """Balances drop by the payments; a settled invoice is paid on its last payment date."""
+    partly = _invoice(session, "001", "100.00")
+    settled = _invoice(session, "001", "40.00")
+    paid_on = datetime(2025, 5, 2, 10, 30)
+
+    result = apply_payments([
+        _payment("PAY-001-A", partly, "30.00"),
+        _payment("PAY-001-B", settled, "15.00", payment_date=datetime(2025, 5, 1)),
+        _payment("PAY-001-C", settled, "25.00", payment_date=paid_on.isoformat()),
+    ], session=session)
+
+    assert result.applied == ["PAY-001-A", "PAY-001-B", "PAY-001-C"]
+    assert result.failures == [] and result.duplicates == []
+    assert result.invoices_updated == 2
+
+    session.expire_all()
+    assert partly.outstanding_balance == Decimal("70.00")
+    assert partly.status == InvoiceStatus.pending.value
+    assert partly.date_fully_paid is None
+    assert settled.outstanding_balance == Decimal("0.00")
+    assert settled.status == InvoiceStatus.paid.value
+    assert settled.date_fully_paid == paid_on
+
+
+def test_duplicates_are_skipped_in_batch_and_against_database(session):
+    """Re-applying a file records nothing twice, by public id or by bank reference."""
+    invoice = _invoice(session, "002", "50.00")
+    first = apply_payments([_payment("PAY-002-A", invoice, "10.00")], session=session)
+    assert first.applied == ["PAY-002-A"]
+
+    result = apply_payments([
+        _payment("PAY-002-A", invoice, "10.00"),
+        _payment("PAY-002-B", invoice, "10.00", payment_reference="REF-PAY-002-A"),
+        _payment("PAY-002-C", invoice, "5.00"),
+        _payment("PAY-002-C", invoice, "5.00"),
+    ], session=session)
+
+    assert result.applied == ["PAY-002-C"]
+    assert sorted(result.duplicates) == ["PAY-002-A", "PAY-002-B", "PAY-002-C"]
+    session.expire_all()
+    assert invoice.outstanding_balance == Decimal("35.00")
+    assert session.scalar(
+        select(func.count(Payment.id)).where(Payment.invoice_fk_id == invoice.id)
+    ) == 2
+
+
+def test_bad_rows_are_reported_not_applied(session):
+    """Invalid amounts, unknown and cancelled invoices fail without aborting the batch."""
+    invoice = _invoice(session, "003", "20.00")
+    cancelled = _invoice(session, "003", "20.00", status=InvoiceStatus.cancelled.value)
+
+    result = apply_payments([
+        _payment("PAY-003-A", invoice, "-1.00"),
+        _payment("PAY-003-B", invoice, "abc"),
+        {**_payment("PAY-003-C", invoice, "1.00"), "public_invoice_id": "INV-PAY-NOPE"},
+        _payment("PAY-003-D", cancelled, "1.00"),
+        _payment("PAY-003-E", invoice, "20.00"),
+    ], session=session)
+
+    assert result.applied == ["PAY-003-E"]
+    assert [failure.index for failure in result.failures] == [0, 1, 2, 3]
+    assert "unknown invoice" in result.failures[2].reason
+    assert "cancelled" in result.failures[3].reason
+    session.expire_all()
+    assert invoice.status == InvoiceStatus.paid.value
+    assert cancelled.status == InvoiceStatus.cancelled.value
+
+
+def test_refresh_balances_reopens_paid_invoice(session):
+    """A paid invoice whose payment is removed goes back to overdue past its due date."""
+    invoice = _invoice(session, "004", "10.00", due_in_days=-5)
+    apply_payments([_payment("PAY-004-A", invoice, "10.00")], session=session)
+    session.expire_all()
+    assert invoice.status == InvoiceStatus.paid.value
+
+    session.delete(session.scalar(select(Payment).where(Payment.public_payment_id == "PAY-004-A")))
+    session.commit()
+    assert refresh_balances(session, invoice_ids=[invoice.id]) == 1
+
+    session.expire_all()
+    assert invoice.status == InvoiceStatus.overdue.value
+    assert invoice.outstanding_balance == Decimal("10.00")
+    assert invoice.date_fully_paid is None
+
+
+def test_apply_settlement_file_in_batches(session, tmp_path):
+    """A CSV is applied batch by batch and failure indexes point at file rows."""
+    invoice = _invoice(session, "005", "30.00")
+    path = tmp_path / "settlement.csv"
+    lines = ["public_payment_id,payment_reference,public_invoice_id,payment_amount,payment_date,payment_method"]
+    for i in range(5):
+        amount = "0" if i == 3 else "5.00"
+        lines.append(f"PAY-005-{i},REF-005-{i},{invoice.public_invoice_id},{amount},2025-06-0{i + 1},ach")
+    path.write_text("\n".join(lines) + "\n")
+
+    result = apply_settlement_file(str(path), batch_size=2, session=session)
+
+    assert len(result.applied) == 4
+    assert [failure.index for failure in result.failures] == [3]
+    session.expire_all()
+    assert invoice.outstanding_balance == Decimal("10.00")
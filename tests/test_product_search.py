@@ -0,0 +1,102 @@
+#!/bin/env python
+
+'''
+Tests for the product full text search (app/services/product_search.py).
+
+- Runs on the sqlite FTS5 table, the mysql FULLTEXT path is checked by compiling its query.
+- Products use made up words so rows of other tests never match.
+'''
+
+import pytest
+from decimal import Decimal
+
+from sqlalchemy.dialects import mysql
+
+from app.models.products import Product, ProductVariant
+from app.services.product_search import query_terms, search_products, search_query
+
+
+def _product(session, number, name, description, active=True, variants=()):
+    product = Product(
+        public_product_id=f"FTS-PID-{number:03d}",
+        product_name=name,
+        sku=f"FTS-SKU-{number:03d}",
+        brand="Zorblax",
+        product_category="Quillwear",
+        product_description=description,
+        is_active=active,
+    )
+    session.add(product)
+    session.flush()
+    for color, size in variants:
+        session.add(ProductVariant(
+            product_fk_id=product.id, color=color, size=size, price=Decimal("10.00"), inventory_stock=1,
+        ))
+    return product
+
+
+@pytest.fixture
+def catalog(session):
+    products = [
+        _product(session, 1, "Vermilion Flannel Shirt", "a warm shirt", variants=[("vermilion", "M"), ("navy", "L")]),
+        _product(session, 2, "Navy Trousers", "goes with a vermilion flannel shirt", variants=[("navy", "M")]),
+        _product(session, 3, "Vermilion Scarf", "retired", active=False, variants=[("vermilion", "S")]),
+    ]
+    session.commit()
+    return products
+
+
+def _names(results):
+    return [result["product_name"] for result in results]
+
+
+def test_ranked_prefix_search(session, catalog):
+    # all terms must match, a name match ranks above a description match
+    assert _names(search_products(session, "vermilion flannel")) == ["Vermilion Flannel Shirt", "Navy Trousers"]
+    # the last term is a prefix
+    assert _names(search_products(session, "flannel shi")) == ["Vermilion Flannel Shirt", "Navy Trousers"]
+    # brand and category are searched too
+    assert len(search_products(session, "zorblax quillw")) == 2
+    assert search_products(session, "  ...  ") == []
+
+
+def test_filters(session, catalog):
+    assert _names(search_products(session, "vermilion")) == ["Vermilion Flannel Shirt", "Navy Trousers"]
+    # bm25 favours the shorter name
+    assert _names(search_products(session, "vermilion", active=None)) == [
+        "Vermilion Scarf", "Vermilion Flannel Shirt", "Navy Trousers",
+    ]
+    assert _names(search_products(session, "vermilion", active=False)) == ["Vermilion Scarf"]
+    assert _names(search_products(session, "vermilion", color="navy")) == ["Vermilion Flannel Shirt", "Navy Trousers"]
+    assert _names(search_products(session, "vermilion", color="navy", size="L")) == ["Vermilion Flannel Shirt"]
+    with pytest.raises(ValueError):
+        search_products(session, "vermilion", limit=0)
+
+
+def test_index_follows_writes(session, catalog):
+    """The triggers keep the index in step with updates and deletes."""
+    shirt, trousers, _ = catalog
+    shirt.product_name = "Crimson Flannel Shirt"
+    session.delete(trousers)
+    session.commit()
+
+    assert _names(search_products(session, "crimson")) == ["Crimson Flannel Shirt"]
+    assert _names(search_products(session, "vermilion")) == []
+
+
+def test_search_route(client, catalog):
+    response = client.get("/products/search?q=vermilion&color=vermilion&active=all")
+    assert response.status_code == 200
+    items = response.get_json()["items"]
+    assert [item["public_product_id"] for item in items] == ["FTS-PID-003", "FTS-PID-001"]
+    assert items[0]["score"] >= items[1]["score"]
+    assert client.get("/products/search?q=vermilion&active=maybe").status_code == 400
+    assert client.get("/products/search?q=vermilion&offset=5000").status_code == 400
+
+
+def test_mysql_query():
+    assert query_terms("Red RED shirt, M") == ["red", "shirt", "m"]
+    sql = str(search_query("mysql", "red shi").compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "AGAINST ('+red +shi*' IN BOOLEAN MODE)" in sql
+    with pytest.raises(ValueError):
+        search_query("postgresql", "red")
@@ -0,0 +1,207 @@
+#!/bin/env python
+
+'''
+Tests for the ETag response cache of invoice and product documents (app/services/response_cache.py).
+
+- Requests go through the flask test client, the shared response_cache serves them.
+- Stores are also tested on their own, the shared store with a fake clock.
+'''
+
+import pytest
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.payments import Payment
+from app.models.products import Product, ProductVariant
+from app.services.invoice_archive import archive_closed_invoices
+from app.services.response_cache import LocalSharedClient, LRUStore, SharedStore, response_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def invoice(session):
+    customer = Customer(customer_id="ETAG-CUST-001", customer_name="Etag Customer", customer_address="Etag St")
+    session.add(customer)
+    session.flush()
+    invoice = Invoice(
+        public_invoice_id="ETAG-INV-001",
+        customer_fk_id=customer.id,
+        invoice_due_date=datetime.now(timezone.utc) + timedelta(days=30),
+        status=InvoiceStatus.pending.value,
+        total_amount=Decimal("50.00"),
+        outstanding_balance=Decimal("50.00"),
+    )
+    session.add(invoice)
+    session.commit()
+    return invoice
+
+
+@pytest.fixture
+def product(session):
+    product = Product(
+        public_product_id="ETAG-PID-001",
+        product_name="Etag Product",
+        sku="ETAG-SKU-001",
+        brand="Brand",
+        product_category="Category",
+        product_description="For response cache tests",
+    )
+    session.add(product)
+    session.flush()
+    session.add(ProductVariant(product_fk_id=product.id, price=Decimal("9.90"), inventory_stock=5, has_stock=True))
+    session.commit()
+    return product
+
+
+def test_conditional_get_returns_304(client, invoice):
+    first = client.get("/invoices/ETAG-INV-001")
+    assert first.status_code == 200
+    assert first.get_json()["public_invoice_id"] == "ETAG-INV-001"
+    etag = first.headers["ETag"]
+
+    not_modified = response_cache.not_modified
+    again = client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == etag
+    assert response_cache.not_modified == not_modified + 1
+    # weak comparison, as browsers send them
+    assert client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    assert client.get("/invoices/ETAG-INV-999").status_code == 404
+    assert client.get("/products/ETAG-PID-999").status_code == 404
+
+
+def test_body_cached_until_a_write(client, session, invoice):
+    """The second fetch comes from the store, a payment drops it and changes the ETag."""
+    first = client.get("/invoices/ETAG-INV-001")
+    hits = response_cache.hits
+    cached = client.get("/invoices/ETAG-INV-001")
+    assert response_cache.hits == hits + 1
+    assert cached.data == first.data
+
+    session.add(Payment(
+        public_payment_id="ETAG-PAY-001", invoice_fk_id=invoice.id, payment_amount=Decimal("10.00"),
+        payment_reference="ETAG-REF-001", payment_method="card",
+    ))
+    session.commit()
+    assert response_cache.store.get(f"invoice:{invoice.id}") is None
+
+    after = client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert [p["public_payment_id"] for p in after.get_json()["payments"]] == ["ETAG-PAY-001"]
+
+
+def test_bulk_update_is_not_served_stale(client, session, invoice):
+    """Core updates skip the session events, the version query still sees them."""
+    first = client.get("/invoices/ETAG-INV-001")
+    session.execute(update(Invoice).where(Invoice.id == invoice.id).values(status=InvoiceStatus.overdue.value))
+    session.commit()
+
+    after = client.get("/invoices/ETAG-INV-001")
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert after.get_json()["status"] == "overdue"
+
+
+def test_invoice_etag_follows_taxes_and_payment_amounts(client, session, invoice):
+    """A tax row or a payment amount edited alone, within the same second, changes the ETag."""
+    session.add(InvoiceTax(invoice_fk_id=invoice.id, tax_rate_percent=Decimal("5.00"), tax_amount=Decimal("2.38")))
+    session.add(Payment(
+        public_payment_id="ETAG-PAY-002", invoice_fk_id=invoice.id, payment_amount=Decimal("10.00"),
+        payment_reference="ETAG-REF-002", payment_method="card",
+    ))
+    session.commit()
+    etag = client.get("/invoices/ETAG-INV-001").headers["ETag"]
+
+    for statement in (
+        update(InvoiceTax).where(InvoiceTax.invoice_fk_id == invoice.id).values(tax_amount=Decimal("2.50")),
+        update(Payment).where(Payment.invoice_fk_id == invoice.id).values(payment_amount=Decimal("12.00")),
+    ):
+        session.execute(statement)
+        session.commit()
+        after = client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        etag = after.headers["ETag"]
+
+    body = after.get_json()
+    assert body["taxes"][0]["tax_amount"] == "2.50"
+    assert body["payments"][0]["payment_amount"] == "12.00"
+
+
+def test_invoice_etag_follows_line_products(client, session, invoice, product):
+    """The document shows each line's sku, a product edit is not answered with 304."""
+    session.add(InvoiceItem(
+        invoice_fk_id=invoice.id, product_fk_id=product.id, quantity=1,
+        unit_price=Decimal("9.90"), line_total=Decimal("9.90"),
+    ))
+    session.commit()
+    first = client.get("/invoices/ETAG-INV-001")
+    assert first.get_json()["items"][0]["sku"] == "ETAG-SKU-001"
+
+    product.sku = "ETAG-SKU-002"
+    session.commit()
+
+    after = client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.get_json()["items"][0]["sku"] == "ETAG-SKU-002"
+
+
+def test_archived_invoice_is_served(client, session, invoice):
+    invoice_id = invoice.id
+    session.execute(update(Invoice).where(Invoice.id == invoice_id).values(
+        status=InvoiceStatus.paid.value, outstanding_balance=Decimal("0.00"), date_fully_paid=datetime(2001, 1, 1),
+    ))
+    session.commit()
+    live = client.get("/invoices/ETAG-INV-001")
+    archive_closed_invoices(session, cutoff=datetime(2002, 1, 1))
+    assert session.scalar(select(Invoice.id).where(Invoice.id == invoice_id)) is None
+
+    archived = client.get("/invoices/ETAG-INV-001")
+    assert archived.status_code == 200
+    assert archived.get_json() == live.get_json()
+    again = client.get("/invoices/ETAG-INV-001", headers={"If-None-Match": archived.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_product_etag_follows_variants(client, session, product):
+    first = client.get("/products/ETAG-PID-001")
+    assert first.get_json()["variants"][0]["inventory_stock"] == 5
+
+    variant = session.query(ProductVariant).filter_by(product_fk_id=product.id).one()
+    variant.inventory_stock = 4
+    session.commit()
+
+    after = client.get("/products/ETAG-PID-001", headers={"If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.get_json()["variants"][0]["inventory_stock"] == 4
+
+
+def test_stores():
+    lru = LRUStore(maxsize=2)
+    lru.set("a", '"1"', b"a")
+    lru.set("b", '"2"', b"b")
+    lru.get("a")  # b is now least recently used
+    lru.set("c", '"3"', b"c")
+    assert lru.get("b") is None and lru.get("a") == ('"1"', b"a")
+    assert lru.stats()["evictions"] == 1
+
+    clock = FakeClock()
+    shared = SharedStore(LocalSharedClient(clock=clock), ttl=30)
+    shared.set("invoice:1", '"abc"', b'{"id": 1}\n')
+    assert shared.get("invoice:1") == ('"abc"', b'{"id": 1}\n')
+    shared.delete(["invoice:1"])
+    assert shared.get("invoice:1") is None
+    shared.set("invoice:1", '"abc"', b"{}")
+    clock.now = 31
+    assert shared.get("invoice:1") is None
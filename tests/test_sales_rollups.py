@@ -0,0 +1,189 @@
+#!/bin/env python
+
+'''
+Tests for the daily sales rollups (app/services/sales_rollups.py).
+
+- Use the session fixture; do not use db.session directly in tests.
+- Invoices are dated in 2003 and checked through their own customer, products and tax
+  rate, rows of other tests never land on those keys.
+- Rollup totals are compared with raw_summary(), the same numbers from the invoice tables.
+'''
+
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.models.customers import Customer
+from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, InvoiceTax
+from app.models.products import Product
+from app.models.sales import SalesStaleDay
+from app.services.invoice_archive import archive_closed_invoices
+from app.services.sales_rollups import catch_up, raw_summary, rebuild_rollups, sales_by_day, sales_summary
+
+FIRST, LAST = date(2003, 3, 1), date(2003, 3, 31)
+RATE = Decimal("7.25")
+
+
+@pytest.fixture
+def shop(session):
+    customer = Customer(customer_id="CUST-SALES-001", customer_name="Sales Customer", customer_address="Sales St")
+    products = [
+        Product(
+            public_product_id=f"SALES-PID-{number}", product_name=f"Sales Product {number}", sku=f"SALES-SKU-{number}",
+            brand="Sales", product_category="Sales", product_description="rollup test product",
+        )
+        for number in (1, 2)
+    ]
+    session.add_all([customer, *products])
+    session.commit()
+    return customer, products
+
+
+def _invoice(session, customer, number, day, lines, status=InvoiceStatus.pending, **fields):
+    invoice = Invoice(
+        public_invoice_id=f"INV-SALES-{number:03d}",
+        customer_fk_id=customer.id,
+        invoice_date=datetime.combine(day, datetime.min.time()).replace(hour=15),
+        invoice_due_date=datetime(2003, 4, 30),
+        status=status.value,
+        **fields,
+    )
+    subtotal = Decimal("0.00")
+    for product, quantity, unit_price in lines:
+        line_total = quantity * Decimal(unit_price)
+        subtotal += line_total
+        invoice.items.append(InvoiceItem(
+            product_fk_id=product.id, quantity=quantity, unit_price=Decimal(unit_price), line_total=line_total,
+        ))
+    invoice.taxes.append(InvoiceTax(tax_rate_percent=RATE, tax_amount=(subtotal * RATE / 100).quantize(Decimal("0.01"))))
+    session.add(invoice)
+    return invoice
+
+
+def _summaries(session, customer, products):
+    keys = {"product": [product.id for product in products], "customer": [customer.id], "tax_rate": [RATE]}
+    return {
+        by: (
+            sales_summary(by, FIRST, LAST, keys=keys[by], session=session),
+            raw_summary(by, FIRST, LAST, keys=keys[by], session=session),
+        )
+        for by in keys
+    }
+
+
+def _assert_rollups_match(session, customer, products):
+    for by, (rollup, raw) in _summaries(session, customer, products).items():
+        assert [tuple(row) for row in rollup] == [tuple(row) for row in raw], by
+
+
+def test_catch_up_builds_rollups(session, shop):
+    customer, (shirt, scarf) = shop
+    _invoice(session, customer, 1, date(2003, 3, 1), [(shirt, 2, "10.00"), (scarf, 1, "5.00")])
+    _invoice(session, customer, 2, date(2003, 3, 1), [(shirt, 1, "10.00")])
+    _invoice(session, customer, 3, date(2003, 3, 2), [(scarf, 3, "5.00")])
+    _invoice(session, customer, 4, date(2003, 3, 2), [(shirt, 9, "10.00")], status=InvoiceStatus.cancelled)
+    session.commit()
+
+    report = catch_up(session)
+
+    assert report.completed and report.days >= 2
+    assert session.scalar(select(SalesStaleDay.day).where(SalesStaleDay.day.between(FIRST, LAST))) is None
+    products = sales_summary("product", FIRST, LAST, keys=[shirt.id, scarf.id], session=session)
+    # cancelled invoices do not count, best seller first
+    assert [tuple(row) for row in products] == [
+        (shirt.id, 3, Decimal("30.00"), 2, 2),
+        (scarf.id, 4, Decimal("20.00"), 2, 2),
+    ]
+    [(customer_id, invoices, revenue, tax)] = sales_summary("customer", FIRST, LAST, keys=[customer.id], session=session)
+    assert (customer_id, invoices, revenue, tax) == (customer.id, 3, Decimal("50.00"), Decimal("3.62"))
+    assert [tuple(row)[:3] for row in sales_by_day(FIRST, LAST, session=session)] == [
+        (date(2003, 3, 1), 2, Decimal("35.00")),
+        (date(2003, 3, 2), 1, Decimal("15.00")),
+    ]
+    # one day of the range
+    assert sales_summary("product", date(2003, 3, 2), date(2003, 3, 2), keys=[shirt.id], session=session) == []
+    _assert_rollups_match(session, customer, [shirt, scarf])
+
+
+def test_changes_are_caught_up(session, shop):
+    """Bulk updates through the watermark, deletes, moves and line edits through the queue."""
+    customer, (shirt, scarf) = shop
+    first = _invoice(session, customer, 10, date(2003, 3, 5), [(shirt, 1, "10.00")])
+    moved = _invoice(session, customer, 11, date(2003, 3, 5), [(scarf, 2, "5.00")])
+    deleted = _invoice(session, customer, 12, date(2003, 3, 6), [(shirt, 4, "10.00")])
+    cancelled = _invoice(session, customer, 13, date(2003, 3, 7), [(scarf, 1, "5.00")])
+    session.commit()
+    catch_up(session)
+
+    first.items[0].quantity, first.items[0].line_total = 3, Decimal("30.00")
+    moved.invoice_date = datetime(2003, 3, 20, 9)
+    session.delete(deleted)
+    session.commit()
+    # Core writes skip the session events, the watermark sees the new updated stamp
+    session.execute(
+        update(Invoice).where(Invoice.id == cancelled.id).values(status=InvoiceStatus.cancelled.value)
+    )
+    session.commit()
+
+    catch_up(session)
+
+    assert [tuple(row)[:2] for row in sales_by_day(FIRST, LAST, session=session)] == [
+        (date(2003, 3, 5), 1),
+        (date(2003, 3, 20), 1),
+    ]
+    _assert_rollups_match(session, customer, [shirt, scarf])
+
+
+def test_archived_invoices_stay_counted(session, shop):
+    customer, (shirt, scarf) = shop
+    _invoice(
+        session, customer, 20, date(2003, 3, 10), [(shirt, 1, "10.00")],
+        status=InvoiceStatus.paid, date_fully_paid=datetime(2003, 3, 15),
+    )
+    live = _invoice(session, customer, 21, date(2003, 3, 10), [(scarf, 1, "5.00")])
+    session.commit()
+    archive_closed_invoices(session, cutoff=datetime(2004, 1, 1))
+
+    # the day is recomputed after the archiver moved one of its invoices
+    live.items[0].quantity, live.items[0].line_total = 2, Decimal("10.00")
+    session.commit()
+    catch_up(session)
+
+    [(_, invoices, revenue, _)] = sales_by_day(date(2003, 3, 10), date(2003, 3, 10), session=session)
+    assert (invoices, revenue) == (2, Decimal("20.00"))
+    assert rebuild_rollups(session) >= 1
+    _assert_rollups_match(session, customer, [shirt, scarf])
+
+
+def test_time_budget_leaves_days_queued(session, shop):
+    customer, (shirt, _) = shop
+    _invoice(session, customer, 30, date(2003, 3, 25), [(shirt, 1, "10.00")])
+    session.commit()
+
+    report = catch_up(session, time_budget=0)
+
+    assert not report.completed and report.days == 0
+    assert session.get(SalesStaleDay, date(2003, 3, 25)) is not None
+    assert catch_up(session).completed
+    assert session.get(SalesStaleDay, date(2003, 3, 25)) is None
+
+
+def test_sales_routes(client, session, shop):
+    customer, (shirt, scarf) = shop
+    _invoice(session, customer, 40, date(2003, 3, 28), [(shirt, 1, "10.00"), (scarf, 1, "5.00")])
+    session.commit()
+    catch_up(session)
+
+    response = client.get("/analytics/sales?by=product&from=2003-03-28&to=2003-03-28")
+    assert response.status_code == 200
+    items = response.get_json()["items"]
+    assert [(item["public_product_id"], item["revenue"]) for item in items[:2]] == [
+        ("SALES-PID-1", "10.00"), ("SALES-PID-2", "5.00"),
+    ]
+    daily = client.get("/analytics/sales/daily?from=2003-03-28&to=2003-03-28").get_json()["items"]
+    assert daily == [{"day": "2003-03-28", "invoices": 1, "revenue": "15.00", "tax_amount": "1.09"}]
+    assert client.get("/analytics/sales?by=region&from=2003-03-01&to=2003-03-31").status_code == 400
+    assert client.get("/analytics/sales?from=2003-03-31&to=2003-03-01").status_code == 400
+    assert client.get("/analytics/sales?from=2003-03-01").status_code == 400